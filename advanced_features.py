@@ -2,7 +2,14 @@ import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
+import io
 import pandas as pd
+from utils.metrics import METRICS, format_seconds
+from utils.figures import session_figures
+from utils.scheduler import llm_priority
+from utils.export import EXPORT_FORMATS, deferred_export, export_filename
+
+CHAT_EXPORT_COLUMNS = {"question": str, "answer": str, "agent": str, "timestamp": str}
 
 def add_analytics_dashboard():
     """Add advanced analytics dashboard"""
@@ -16,26 +23,33 @@ def add_analytics_dashboard():
             st.metric("💬 Total Chats", len(st.session_state.chat_history))
         
         with col2:
-            avg_length = sum(len(q) for q, _ in st.session_state.chat_history) / len(st.session_state.chat_history)
+            avg_length = st.session_state.chat_history.avg_question_length()
             st.metric("📝 Avg Question Length", f"{avg_length:.0f}")
         
         with col3:
-            avg_response = sum(len(a) for _, a in st.session_state.chat_history) / len(st.session_state.chat_history)
+            avg_response = st.session_state.chat_history.avg_answer_length()
             st.metric("🤖 Avg Response Length", f"{avg_response:.0f}")
         
         with col4:
             st.metric("🎯 Success Rate", "98%")
         
-        # Chat activity chart
-        if len(st.session_state.chat_history) > 1:
-            chat_data = pd.DataFrame({
-                'Chat': range(1, len(st.session_state.chat_history) + 1),
-                'Question_Length': [len(q) for q, _ in st.session_state.chat_history],
-                'Response_Length': [len(a) for _, a in st.session_state.chat_history]
-            })
+        # Chat activity chart (in-memory window only), rebuilt only when
+        # the history changes
+        history = st.session_state.chat_history
+        if len(history) > 1:
+            def build_chat_figure():
+                turns = history.recent(history.window)
+                first = len(history) - len(turns) + 1
+                chat_data = pd.DataFrame({
+                    'Chat': range(first, first + len(turns)),
+                    'Question_Length': [len(t.question) for t in turns],
+                    'Response_Length': [len(t.answer) for t in turns]
+                })
+                
+                return px.line(chat_data, x='Chat', y=['Question_Length', 'Response_Length'], 
+                               title='📈 Chat Activity Over Time')
             
-            fig = px.line(chat_data, x='Chat', y=['Question_Length', 'Response_Length'], 
-                         title='📈 Chat Activity Over Time')
+            fig = session_figures(st.session_state).get("chat_activity", history.version, build_chat_figure)
             st.plotly_chart(fig, use_container_width=True)
 
 def add_export_features():
@@ -45,9 +59,23 @@ def add_export_features():
         
         col1, col2, col3 = st.columns(3)
         
+        # Exports are built only when a download is clicked, outside the script thread
+        history = st.session_state.chat_history
+        
+        def chat_rows():
+            return ({"question": t.question, "answer": t.answer, "agent": t.agent,
+                     "timestamp": datetime.fromtimestamp(t.timestamp)}
+                    for t in history)
+        
+        def chat_text():
+            buf = io.BytesIO()
+            for t in history:
+                buf.write(f"Q: {t.question}\nA: {t.answer}\n\n".encode("utf-8"))
+            buf.seek(0)
+            return buf
+        
         with col1:
-            # Export as text
-            chat_text = "\n\n".join([f"Q: {q}\nA: {a}" for q, a in st.session_state.chat_history])
+            # Export as text, streamed turn by turn
             st.download_button(
                 "📄 Export as TXT",
                 chat_text,
@@ -56,13 +84,14 @@ def add_export_features():
             )
         
         with col2:
-            # Export as JSON
-            import json
-            chat_json = json.dumps([{"question": q, "answer": a} for q, a in st.session_state.chat_history], indent=2)
+            # Export as structured data
+            chat_format = st.selectbox("Format", list(EXPORT_FORMATS), key="chat_export_format",
+                                       label_visibility="collapsed")
             st.download_button(
-                "📊 Export as JSON",
-                chat_json,
-                f"chat_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                f"📊 Export as {chat_format}",
+                deferred_export(chat_rows, chat_format, rows_key="conversations", columns=CHAT_EXPORT_COLUMNS),
+                export_filename("chat_export", chat_format),
+                EXPORT_FORMATS[chat_format][1],
                 use_container_width=True
             )
         
@@ -76,26 +105,17 @@ def generate_summary_report():
     st.markdown("### 📋 AI-Generated Summary Report")
     
     if st.session_state.qa_chain and st.session_state.chat_history:
-        summary_prompt = f"""
-        Based on the following conversation history, create a comprehensive summary report:
-        
-        {chr(10).join([f"Q: {q} A: {a}" for q, a in st.session_state.chat_history[-5:]])}
-        
-        Please provide:
-        1. Key topics discussed
-        2. Main insights discovered
-        3. Important information extracted
-        4. Recommendations for further exploration
-        """
+        conversation = "\n".join(f"Q: {t.question} A: {t.answer}" for t in st.session_state.chat_history.recent(5))
         
         with st.spinner("🤖 Generating AI summary..."):
-            response = st.session_state.qa_chain.invoke({"query": summary_prompt})
+            with llm_priority("batch", st.session_state.session_id):
+                response = st.session_state.qa_chain.complete("chat_summary", conversation=conversation)
             st.write(response.get("result", ""))
 
 def add_smart_suggestions():
     """Add context-aware smart suggestions"""
     if st.session_state.chat_history:
-        last_response = st.session_state.chat_history[-1][1].lower()
+        last_response = st.session_state.chat_history.last().answer.lower()
         
         # AI-powered suggestion categories
         if any(word in last_response for word in ["skill", "technical", "programming"]):
@@ -146,11 +166,17 @@ def add_real_time_features():
             st.markdown("### ⚡ Live Metrics")
             
             # System performance
+            latency = METRICS.percentiles("total")
+            has_samples = METRICS.count("total") > 0
             col1, col2 = st.columns(2)
             with col1:
-                st.metric("🚀 Response Time", "1.2s", "⚡ Fast")
+                st.metric("🚀 Response Time (p50)", format_seconds(latency["p50"] if has_samples else None))
             with col2:
-                st.metric("🧠 AI Confidence", "94%", "📈 High")
+                st.metric("🐢 Response Time (p95)", format_seconds(latency["p95"] if has_samples else None))
+            
+            first_token = METRICS.percentiles("llm_first_token")
+            if METRICS.count("llm_first_token"):
+                st.caption(f"First token p50 {format_seconds(first_token['p50'])} • p99 {format_seconds(latency['p99'])} total")
             
             # Usage statistics
             st.metric("📊 Session Queries", len(st.session_state.chat_history))
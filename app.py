@@ -8,10 +8,29 @@ import json
 import time
 import random
 import uuid
+from contextlib import nullcontext
 from dotenv import load_dotenv
 from langchain_core.documents import Document
-from utils.loader import load_documents
+from utils.loader import load_documents, extract_text
 from utils.rag import build_vectorstore, load_vectorstore, build_qa_chain
+from utils.metrics import METRICS, QUERY_STAGES, INDEX_STAGES, TOKEN_STAGES, format_seconds
+from utils.scheduler import SCHEDULER, QUEUE_STAGES, llm_priority
+from utils.prompts import PROMPTS, hr_persona
+from utils.telemetry import traced
+from utils import memory
+from utils.history import ChatHistory
+from utils import events
+from utils.figures import SHARED_FIGURES
+from utils.export import EXPORT_FORMATS, deferred_export, export_filename
+from utils.screening import job_profile, score_resume
+from utils.prefilter import parse_keywords, prefilter
+from utils.categorize import classify as classify_query
+from utils.candidates import EXPORT_COLUMNS, STAGES as CANDIDATE_STAGES, get_candidate_store, requisition_title
+from utils.questions import QuestionSampler, get_generated_questions, get_question_bank
+from utils.onboarding import get_generated_plans, get_onboarding_plans
+from utils.handbook import get_handbook_links
+from utils.progress import employee_id, get_progress_store, task_id
+from utils.interviews import DIMENSION_LABELS, InterviewAggregate, TranscriptItem, evaluate_response, evaluate_transcript
 
 load_dotenv()
 
@@ -23,380 +42,170 @@ def save_uploaded_files(uploaded_files, data_dir="data"):
 
 def init_state():
     defaults = {
+        "session_id": str(uuid.uuid4()),
         "vectorstore": None,
         "qa_chain": None,
         "docs_loaded": False,
-        "chat_history": [],
         "session_start": datetime.now(),
         "current_agent": "HR Assistant",
         "candidate_data": {},
         "interview_scores": {},
-        "onboarding_progress": {},
-        "resume_rankings": [],
+        "current_requisition": None,
         "notifications": [],
         "user_profile": {"name": "", "role": "HR Manager", "department": "Human Resources"},
         "analytics_data": [],
-        "performance_metrics": {"queries_resolved": 0, "avg_satisfaction": 4.8, "response_time": 1.2},
+        "performance_metrics": {"queries_resolved": 0, "avg_satisfaction": 4.8, "response_time": 0.0},
         "active_sessions": 1,
         "system_health": 98.5
     }
     for key, value in defaults.items():
         if key not in st.session_state:
             st.session_state[key] = value
+    if "chat_history" not in st.session_state:
+        st.session_state.chat_history = ChatHistory(st.session_state.session_id)
 
-def create_real_time_dashboard():
-    """Create advanced real-time analytics dashboard"""
-    # Generate sample data for demo
-    dates = pd.date_range(start=datetime.now() - timedelta(days=30), end=datetime.now(), freq='D')
-    
-    # HR Queries Over Time
+def notify(message, kind="success"):
+    """Show a notification in this session and persist it as an event"""
+    st.session_state.notifications.append({
+        "type": kind,
+        "message": message,
+        "timestamp": datetime.now()
+    })
+    del st.session_state.notifications[:-50]
+    events.record("notification", session_id=st.session_state.session_id, type=kind, message=message)
+
+def create_real_time_dashboard(days=30):
+    """Build dashboard data from the persistent analytics event store"""
+    store = events.get_event_store()
+    start = datetime.combine((datetime.now() - timedelta(days=days - 1)).date(), datetime.min.time())
+    dates = pd.date_range(start=start, periods=days, freq='D')
+    
+    # HR Queries Over Time (value = end-to-end latency in seconds)
+    queries = {pd.Timestamp.fromtimestamp(r["bucket_start"]).normalize(): r
+               for r in store.series("hr_query", start.timestamp())}
+    feedback = {pd.Timestamp.fromtimestamp(r["bucket_start"]).normalize(): r
+                for r in store.series("feedback", start.timestamp())}
     hr_data = pd.DataFrame({
         'Date': dates,
-        'Queries': [random.randint(15, 45) for _ in dates],
-        'Resolutions': [random.randint(12, 42) for _ in dates],
-        'Satisfaction': [random.uniform(4.2, 4.9) for _ in dates]
+        'Queries': [queries[d]["count"] if d in queries else 0 for d in dates],
+        'Avg_Latency': [queries[d]["avg"] if d in queries else None for d in dates],
+        'Satisfaction': [feedback[d]["avg"] * 5 if d in feedback else None for d in dates]
     })
     
-    # Interview Performance
+    # Interview Performance (most recent completed sessions)
+    sessions = store.query("interview_session", limit=10, newest_first=True)
     interview_data = pd.DataFrame({
-        'Candidate': [f'Candidate {i+1}' for i in range(10)],
-        'Technical': [random.randint(6, 10) for _ in range(10)],
-        'Behavioral': [random.randint(5, 9) for _ in range(10)],
-        'Overall': [random.randint(6, 9) for _ in range(10)]
+        'Candidate': [e.get("candidate") or f"Session {i+1}" for i, e in enumerate(sessions)],
+        'Overall': [e["value"] for e in sessions]
     })
     
     return hr_data, interview_data
 
+@traced("hr_assistant_agent")
 def hr_assistant_agent(query):
     """Enhanced HR Assistant with sentiment analysis and priority routing"""
-    # Analyze query priority and sentiment
-    priority_keywords = ["urgent", "emergency", "asap", "immediate", "critical"]
-    is_urgent = any(keyword in query.lower() for keyword in priority_keywords)
-    
-    # Enhanced prompts with context
-    hr_prompts = {
-        "policy": f"As a Senior HR Assistant with 10+ years experience, provide comprehensive policy information. Query urgency: {'HIGH' if is_urgent else 'NORMAL'}. Include relevant policy sections, exceptions, and next steps.",
-        "leave": f"As an HR Leave Specialist, explain leave policies with specific procedures, approval workflows, and important deadlines. Priority: {'URGENT' if is_urgent else 'STANDARD'}.",
-        "benefits": f"As an HR Benefits Coordinator, provide detailed benefits information including eligibility, enrollment periods, and contact information for follow-up.",
-        "compliance": "As an HR Compliance Officer, address legal and regulatory questions with current guidelines and required documentation.",
-        "general": f"As an experienced HR Generalist, provide helpful guidance and direct to appropriate resources. Handle with {'immediate attention' if is_urgent else 'standard care'}."
-    }
-    
-    # Smart categorization
-    if any(word in query.lower() for word in ["policy", "policies", "rule", "regulation", "handbook"]):
-        prompt_type = "policy"
-    elif any(word in query.lower() for word in ["leave", "vacation", "sick", "time off", "pto", "fmla"]):
-        prompt_type = "leave"
-    elif any(word in query.lower() for word in ["benefit", "insurance", "retirement", "401k", "health", "dental"]):
-        prompt_type = "benefits"
-    elif any(word in query.lower() for word in ["compliance", "legal", "law", "regulation", "audit"]):
-        prompt_type = "compliance"
-    else:
-        prompt_type = "general"
-    
-    enhanced_query = f"{hr_prompts[prompt_type]} Employee Query: {query}"
+    # Analyze query priority and category in one pass
+    classification = classify_query(query)
+    is_urgent = classification.urgent
+    prompt_type = classification.category
+    
+    with llm_priority("urgent" if is_urgent else "interactive", st.session_state.session_id):
+        result = st.session_state.qa_chain.invoke({
+            "query": query,
+            "instructions": hr_persona(prompt_type, is_urgent),
+            "chat_history": st.session_state.chat_history.recent(6),
+        })
+    events.record("hr_query", value=result.get("timings", {}).get("total"),
+                  session_id=st.session_state.session_id,
+                  category=prompt_type, urgent=is_urgent, resolved=bool(result.get("result")))
     
     # Track metrics
     st.session_state.performance_metrics["queries_resolved"] += 1
+    st.session_state.performance_metrics["response_time"] = METRICS.percentiles("total")["p50"]
     
-    return st.session_state.qa_chain.invoke({"query": enhanced_query})
+    return result
 
-def advanced_resume_screening(job_description, resume_text, candidate_name):
-    """Advanced AI-powered resume screening with detailed analysis"""
-    screening_prompt = f"""
-    As an Expert Talent Acquisition Specialist with AI-powered analysis capabilities, perform comprehensive resume evaluation:
-    
-    CANDIDATE: {candidate_name}
-    
-    JOB REQUIREMENTS: {job_description}
-    
-    RESUME CONTENT: {resume_text}
-    
-    PROVIDE DETAILED ANALYSIS:
-    1. MATCH SCORE (0-100) with breakdown by category
-    2. TECHNICAL SKILLS ASSESSMENT (Rate each required skill 1-10)
-    3. EXPERIENCE RELEVANCE (Years of relevant experience vs requirements)
-    4. EDUCATION ALIGNMENT (Degree requirements vs candidate education)
-    5. SOFT SKILLS INDICATORS (Leadership, communication, teamwork evidence)
-    6. RED FLAGS OR CONCERNS (Employment gaps, job hopping, etc.)
-    7. UNIQUE VALUE PROPOSITIONS (What makes this candidate stand out)
-    8. INTERVIEW FOCUS AREAS (Key areas to explore in interview)
-    9. SALARY EXPECTATION RANGE (Based on experience level)
-    10. FINAL RECOMMENDATION (Hire/Interview/Hold/Reject with reasoning)
-    
-    Format as structured analysis with clear sections.
-    """
-    
-    result = st.session_state.qa_chain.invoke({"query": screening_prompt})
-    
-    # Advanced scoring algorithm
-    base_score = random.randint(60, 95)
-    
-    # Adjust score based on various factors
-    if "senior" in job_description.lower() and "senior" in resume_text.lower():
-        base_score += 5
-    if "bachelor" in job_description.lower() and "bachelor" in resume_text.lower():
-        base_score += 3
-    if len(resume_text) > 1000:  # Detailed resume
-        base_score += 2
-    
-    final_score = min(100, base_score)
-    
-    # Determine recommendation
-    if final_score >= 85:
-        recommendation = "STRONG HIRE"
-        priority = "High"
-    elif final_score >= 75:
-        recommendation = "INTERVIEW"
-        priority = "Medium"
-    elif final_score >= 65:
-        recommendation = "CONSIDER"
-        priority = "Low"
-    else:
-        recommendation = "REJECT"
-        priority = "None"
-    
-    return {
-        "candidate_name": candidate_name,
-        "score": final_score,
-        "analysis": result.get("result", ""),
-        "recommendation": recommendation,
-        "priority": priority,
-        "timestamp": datetime.now(),
-        "categories": {
-            "technical": random.randint(6, 10),
-            "experience": random.randint(5, 9),
-            "education": random.randint(6, 9),
-            "soft_skills": random.randint(5, 8)
-        }
-    }
+@traced("advanced_resume_screening")
+def advanced_resume_screening(job, resume_text, candidate_name, weights=None, use_llm=True, features=None):
+    """Structured resume scoring: local feature pre-score plus a cached JSON LLM assessment.
+    `job` is the job description or its parsed JobProfile."""
+    chain = st.session_state.qa_chain if use_llm else None
+    # Bulk screening yields to employees' questions in the LLM scheduler
+    with llm_priority("batch", st.session_state.session_id):
+        result = score_resume(job, resume_text, candidate_name, llm=chain.llm if chain else None,
+                              weights=weights, features=features,
+                              context_cache=chain.context_cache if chain else None)
+    result["timestamp"] = datetime.now()
+    events.record("screening", value=result["score"], session_id=st.session_state.session_id,
+                  candidate=candidate_name, cached=result["cached"])
+    return result
 
-def intelligent_interview_agent(question_type="technical", experience_level="mid", role_type="general"):
-    """AI-powered interview question generation based on role and experience"""
-    
-    question_banks = {
-        "technical": {
-            "junior": [
-                "Explain the difference between supervised and unsupervised learning.",
-                "How would you debug a program that's running slowly?",
-                "What is version control and why is it important?",
-                "Describe the software development lifecycle."
-            ],
-            "mid": [
-                "Design a system to handle 1 million concurrent users.",
-                "Explain microservices architecture and its benefits.",
-                "How would you optimize a database query that's performing poorly?",
-                "Describe your approach to code reviews and testing."
-            ],
-            "senior": [
-                "How would you architect a globally distributed system?",
-                "Explain your strategy for technical debt management.",
-                "How do you mentor junior developers and build technical teams?",
-                "Describe a complex technical decision you made and its impact."
-            ]
-        },
-        "behavioral": {
-            "junior": [
-                "Tell me about a time you had to learn something completely new.",
-                "Describe a situation where you made a mistake and how you handled it.",
-                "How do you prioritize tasks when everything seems urgent?",
-                "Give an example of when you received constructive feedback."
-            ],
-            "mid": [
-                "Describe a time you had to influence others without authority.",
-                "Tell me about a project where you had to work with difficult stakeholders.",
-                "How do you handle competing priorities from different managers?",
-                "Describe a time you had to make a decision with incomplete information."
-            ],
-            "senior": [
-                "Tell me about a time you had to drive organizational change.",
-                "Describe how you've built and led high-performing teams.",
-                "How do you balance innovation with business constraints?",
-                "Give an example of a strategic decision you made and its long-term impact."
-            ]
-        },
-        "situational": {
-            "junior": [
-                "How would you approach a project with an unrealistic deadline?",
-                "What would you do if you disagreed with your manager's technical approach?",
-                "How would you handle a situation where you're stuck on a problem?",
-                "What steps would you take to learn a new technology quickly?"
-            ],
-            "mid": [
-                "How would you handle a critical production issue at 2 AM?",
-                "What would you do if a team member consistently missed deadlines?",
-                "How would you approach refactoring a legacy system?",
-                "What's your strategy for managing technical risk in projects?"
-            ],
-            "senior": [
-                "How would you handle a situation where the business wants to cut engineering quality for speed?",
-                "What would you do if you inherited a team with low morale and poor performance?",
-                "How would you approach building a new engineering culture?",
-                "What's your strategy for balancing technical innovation with business needs?"
-            ]
-        }
-    }
-    
-    questions = question_banks.get(question_type, {}).get(experience_level, [])
-    if not questions:
-        questions = question_banks["technical"]["mid"]
-    
-    return random.choice(questions)
+def intelligent_interview_agent(question_type="technical", experience_level="mid", role_type="general",
+                                prefer_generated=False):
+    """Next question for the interview session: role-aware and never repeated within the session.
+    Falls back to cached LLM-generated questions once the bank is exhausted; None if nothing is left."""
+    sampler = st.session_state.interview_session["sampler"]
+    generate = None
+    if st.session_state.qa_chain is not None:
+        def generate(qtype, level, role):
+            with llm_priority("interactive", st.session_state.session_id):
+                return get_generated_questions().get(st.session_state.qa_chain, qtype, level, role)
+    return sampler.next(question_type, experience_level, role_type,
+                        generate=generate, prefer_generated=prefer_generated)
 
+@traced("evaluate_interview_response")
 def evaluate_interview_response(question, response, question_type="technical"):
-    """Advanced AI evaluation of interview responses"""
-    evaluation_prompt = f"""
-    As a Senior Technical Interviewer and HR Assessment Specialist, evaluate this candidate response:
-    
-    QUESTION TYPE: {question_type.upper()}
-    QUESTION: {question}
-    CANDIDATE RESPONSE: {response}
-    
-    PROVIDE COMPREHENSIVE EVALUATION:
-    
-    1. CONTENT QUALITY (1-10): Accuracy, depth, and completeness of the answer
-    2. COMMUNICATION SKILLS (1-10): Clarity, structure, and articulation
-    3. PROBLEM-SOLVING APPROACH (1-10): Logical thinking and methodology
-    4. EXPERIENCE DEMONSTRATION (1-10): Evidence of real-world application
-    5. CULTURAL FIT INDICATORS (1-10): Values alignment and team compatibility
-    
-    DETAILED FEEDBACK:
-    - STRENGTHS: What the candidate did well
-    - AREAS FOR IMPROVEMENT: Specific gaps or weaknesses
-    - FOLLOW-UP QUESTIONS: Suggested probing questions
-    - RED FLAGS: Any concerning aspects
-    - OVERALL ASSESSMENT: Summary and recommendation
-    
-    SCORING RATIONALE: Explain the reasoning behind each score
-    INTERVIEW RECOMMENDATION: Continue/Proceed with caution/End interview
-    """
-    
-    result = st.session_state.qa_chain.invoke({"query": evaluation_prompt})
-    
-    # Advanced scoring with multiple factors
-    base_scores = {
-        "content": random.randint(6, 10),
-        "communication": random.randint(5, 9),
-        "problem_solving": random.randint(6, 9),
-        "experience": random.randint(5, 8),
-        "cultural_fit": random.randint(6, 9)
-    }
-    
-    # Adjust based on response length and quality indicators
-    response_length = len(response.split())
-    if response_length < 20:
-        for key in base_scores:
-            base_scores[key] = max(1, base_scores[key] - 2)
-    elif response_length > 100:
-        for key in base_scores:
-            base_scores[key] = min(10, base_scores[key] + 1)
-    
-    overall_score = sum(base_scores.values()) / len(base_scores)
-    
-    if overall_score >= 8:
-        recommendation = "EXCELLENT - Strong candidate"
-    elif overall_score >= 7:
-        recommendation = "GOOD - Proceed to next round"
-    elif overall_score >= 6:
-        recommendation = "AVERAGE - Consider with reservations"
-    else:
-        recommendation = "BELOW EXPECTATIONS - Not recommended"
-    
+    """Rubric scores parsed from a structured AI evaluation, cached per (question, response, model)"""
+    with llm_priority("interactive", st.session_state.session_id):
+        evaluation = evaluate_response(st.session_state.qa_chain, question, response, question_type)
+    evaluation["timestamp"] = datetime.now()
+    return evaluation
+
+def add_interview_evaluation(evaluation):
+    """Store an evaluated answer with the session and fold it into the running aggregate"""
+    session = st.session_state.interview_session
+    session["responses_evaluated"].append(evaluation)
+    session["aggregate"].add(evaluation)
+    events.record("interview_eval", value=evaluation["overall_score"], session_id=st.session_state.session_id,
+                  question_type=evaluation["question_type"])
+
+def evaluate_recorded_responses():
+    """Score all recorded (not yet evaluated) answers of the session in one batched call.
+    Answers the batch reply leaves out (or a failed batch) are evaluated on their own;
+    each answer leaves the pending list only once its evaluation is stored."""
+    session = st.session_state.interview_session
+    pending = list(session["pending"])
+    if not pending:
+        return
+    with llm_priority("interactive", st.session_state.session_id):
+        evaluations = evaluate_transcript(st.session_state.qa_chain, pending)
+    for item, evaluation in zip(pending, evaluations):
+        if evaluation is None:
+            evaluation = evaluate_interview_response(item.question, item.response, item.question_type)
+        else:
+            evaluation["timestamp"] = datetime.now()
+        add_interview_evaluation(evaluation)
+        session["pending"].pop(0)
+
+def new_interview_session(candidate_name="", started=None):
     return {
-        "overall_score": round(overall_score, 1),
-        "detailed_scores": base_scores,
-        "evaluation": result.get("result", ""),
-        "recommendation": recommendation,
-        "timestamp": datetime.now(),
-        "question_type": question_type
+        "questions_asked": [],
+        "responses_evaluated": [],
+        "pending": [],
+        "aggregate": InterviewAggregate(),
+        "session_start": started,
+        "candidate_name": candidate_name,
+        "sampler": QuestionSampler(get_question_bank()),
     }
 
-def smart_onboarding_agent(stage="welcome", employee_role="Software Engineer", department="Engineering"):
-    """Intelligent onboarding with role-specific customization"""
-    
-    base_stages = {
-        "welcome": {
-            "title": "🎉 Welcome to Our Company!",
-            "info": f"Welcome to the {department} team! We're excited to have you as our new {employee_role}.",
-            "tasks": [
-                "Complete personal information and emergency contacts",
-                "Review and acknowledge employee handbook",
-                "Set up company email and communication accounts",
-                "Schedule IT equipment pickup and setup"
-            ]
-        },
-        "documentation": {
-            "title": "📋 Essential Documentation",
-            "info": "Let's get your paperwork completed for a smooth start.",
-            "tasks": [
-                "Submit I-9 employment verification documents",
-                "Complete federal and state tax withholding forms (W-4)",
-                "Enroll in health, dental, and vision insurance",
-                "Sign confidentiality and non-disclosure agreements"
-            ]
-        },
-        "training": {
-            "title": "🎓 Learning & Development",
-            "info": f"Time to learn about our company culture and {department}-specific processes.",
-            "tasks": [
-                "Attend company-wide orientation session",
-                "Complete mandatory compliance and safety training",
-                "Meet with your direct manager and team members",
-                "Review department-specific procedures and tools"
-            ]
-        },
-        "setup": {
-            "title": "⚙️ Workspace & System Setup",
-            "info": f"Let's get your {employee_role} workspace optimized for productivity.",
-            "tasks": [
-                "Configure development environment and tools",
-                "Access company systems, repositories, and databases",
-                "Set up security credentials and VPN access",
-                "Complete ergonomic workspace assessment"
-            ]
-        }
-    }
-    
-    # Role-specific customizations
-    role_customizations = {
-        "Software Engineer": {
-            "setup": {
-                "tasks": [
-                    "Set up development environment (IDE, Git, Docker)",
-                    "Access code repositories and development tools",
-                    "Configure security keys and SSH access",
-                    "Join engineering Slack channels and meetings"
-                ]
-            }
-        },
-        "Data Scientist": {
-            "setup": {
-                "tasks": [
-                    "Set up data science environment (Python, R, Jupyter)",
-                    "Access data warehouses and analytics platforms",
-                    "Configure ML model deployment tools",
-                    "Join data science community and resources"
-                ]
-            }
-        },
-        "Product Manager": {
-            "setup": {
-                "tasks": [
-                    "Access product management tools (Jira, Confluence)",
-                    "Review product roadmaps and documentation",
-                    "Set up analytics and user research tools",
-                    "Schedule stakeholder introduction meetings"
-                ]
-            }
-        }
-    }
-    
-    # Apply customizations
-    stage_info = base_stages.get(stage, base_stages["welcome"]).copy()
-    if employee_role in role_customizations and stage in role_customizations[employee_role]:
-        stage_info.update(role_customizations[employee_role][stage])
-    
-    return stage_info
+def smart_onboarding_agent(stage="welcome", employee_role="Software Engineer", department="Engineering",
+                           tailored=False):
+    """Onboarding stage plan from the compiled (role, department, stage) table, or the
+    cached AI-tailored plan for the role when `tailored` is set and a model is available"""
+    if tailored and st.session_state.qa_chain is not None:
+        with llm_priority("interactive", st.session_state.session_id):
+            return get_generated_plans().get(st.session_state.qa_chain, employee_role, department)[stage]
+    return get_onboarding_plans().get(employee_role, department, stage)
 
 def main():
     st.set_page_config(
@@ -406,6 +215,12 @@ def main():
         initial_sidebar_state="expanded"
     )
     init_state()
+    memory.sample_session(
+        st.session_state.session_id,
+        st.session_state,
+        user=st.session_state.user_profile.get("name") or "anonymous",
+        agent=st.session_state.current_agent,
+    )
     
     # Inline CSS for Streamlit Cloud compatibility
     st.markdown("""
@@ -717,13 +532,17 @@ def main():
         cols = [col1, col2, col3, col4, col5, col6]
     
     # Generate real-time metrics
-    hr_data, interview_data = create_real_time_dashboard()
+    store_version = events.get_event_store().version
+    hr_data, interview_data = SHARED_FIGURES.get(
+        "dashboard_frames", store_version, create_real_time_dashboard
+    )
     
     metrics = [
         ("🎯", "Success Rate", f"{st.session_state.performance_metrics['avg_satisfaction']*20:.1f}%", "↗️ +2.3%"),
-        ("⚡", "Avg Response", f"{st.session_state.performance_metrics['response_time']:.1f}s", "↗️ Fast"),
+        ("⚡", "p50 Response", format_seconds(METRICS.percentiles("total")["p50"] if METRICS.count("total") else None),
+         f"p95 {format_seconds(METRICS.percentiles('total')['p95'])}" if METRICS.count("total") else None),
         ("👥", "Active Users", f"{st.session_state.active_sessions}", "↗️ +12%"),
-        ("📊", "Queries Today", f"{st.session_state.performance_metrics['queries_resolved']}", "↗️ +8%"),
+        ("📊", "Queries Today", f"{int(hr_data['Queries'].iloc[-1])}", f"{st.session_state.performance_metrics['queries_resolved']} this session"),
         ("🏆", "Satisfaction", f"{st.session_state.performance_metrics['avg_satisfaction']:.1f}/5", "↗️ Excellent"),
         ("🔧", "System Health", f"{st.session_state.system_health:.1f}%", "↗️ Optimal")
     ]
@@ -766,6 +585,73 @@ def main():
         st.markdown("### ⚙️ Display Settings")
         mobile_view = st.checkbox("📱 Mobile Layout", value=st.session_state.get('mobile_view', False))
         st.session_state.mobile_view = mobile_view
+        
+        # Admin: memory accounting
+        with st.expander("🧠 Memory Usage (Admin)"):
+            # Sampled footprint; walking the whole session state on every rerun would add latency
+            refresh = st.button("🔄 Measure Session Now", use_container_width=True)
+            session_mem = memory.sample_session(st.session_state.session_id, st.session_state, force=refresh)
+            process_mem = memory.process_footprint()
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("This Session", memory.format_bytes(session_mem["total_bytes"]))
+            with col2:
+                st.metric("Process RSS", memory.format_bytes(process_mem["rss_bytes"]))
+            
+            st.caption(
+                f"Index {memory.format_bytes(session_mem['index_bytes'])} • "
+                f"Docstore {memory.format_bytes(session_mem['docstore_bytes'])} • "
+                f"History {memory.format_bytes(session_mem['history_bytes'])} • "
+                f"Cached {memory.format_bytes(session_mem['cached_objects_bytes'])}"
+            )
+            
+            sessions = memory.sessions_report()
+            st.markdown(f"**Live sessions:** {len(sessions)}")
+            st.dataframe(pd.DataFrame([
+                {"Session": s["session_id"][:8], "User": s.get("user", ""), "Agent": s.get("agent", ""),
+                 "Total": memory.format_bytes(s["total_bytes"]), "Index": memory.format_bytes(s["index_bytes"]),
+                 "History": memory.format_bytes(s["history_bytes"])}
+                for s in sessions[:10]
+            ]), hide_index=True, use_container_width=True)
+            
+            # Allocation tracing slows every allocation in the process, so it only runs between Start and Stop
+            if not memory.tracing_active():
+                if st.button("▶️ Start Allocation Tracing", use_container_width=True):
+                    memory.start_tracing()
+                    st.rerun()
+            else:
+                st.caption("Allocation tracing is on for the whole process; stop it when done.")
+                col1, col2 = st.columns(2)
+                with col1:
+                    if st.button("📸 Snapshot", use_container_width=True):
+                        st.session_state.memory_snapshot = memory.take_snapshot()
+                with col2:
+                    if st.button("⏹️ Stop Tracing", use_container_width=True):
+                        st.session_state.memory_snapshot = memory.stop_tracing()
+                        st.rerun()
+            
+            snapshot = st.session_state.get("memory_snapshot")
+            if snapshot:
+                st.markdown("**Top allocation sites:**")
+                st.dataframe(pd.DataFrame(snapshot["top"]), hide_index=True, use_container_width=True)
+                if snapshot["growth"]:
+                    st.markdown("**Growth since tracing started:**")
+                    st.dataframe(pd.DataFrame(snapshot["growth"]), hide_index=True, use_container_width=True)
+            
+            st.download_button(
+                "💾 Export Memory Report",
+                json.dumps({
+                    "generated_at": datetime.now().isoformat(),
+                    "session": {"session_id": st.session_state.session_id, **session_mem},
+                    "process": process_mem,
+                    "sessions": sessions,
+                    "snapshot": snapshot,
+                }, indent=2, default=str),
+                f"memory_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                "application/json",
+                use_container_width=True
+            )
     
     # Responsive Main Content Layout
     if mobile_view:
@@ -823,25 +709,33 @@ def main():
                             with st.spinner("🧠 Analyzing HR policies..."):
                                 result = hr_assistant_agent(query)
                                 response = result.get("result", "")
-                                st.session_state.chat_history.append((query, response))
+                                st.session_state.chat_history.append(query, response, "HR Assistant")
                                 
                                 # Add notification
-                                st.session_state.notifications.append({
-                                    "type": "success",
-                                    "message": f"HR query resolved: {query[:30]}...",
-                                    "timestamp": datetime.now()
-                                })
+                                notify(f"HR query resolved: {query[:30]}...")
                                 st.rerun()
                 
                 # ChatGPT-style Chat Interface
                 st.markdown("#### 💬 Intelligent HR Consultation")
                 
-                # Display chat history in ChatGPT style
-                for i, (q, a) in enumerate(st.session_state.chat_history):
+                # Display only one page of chat history so rerun cost stays flat
+                history = st.session_state.chat_history
+                page_size = 10
+                history_page = 0
+                if history.page_count(page_size) > 1:
+                    history_page = st.select_slider(
+                        "🕘 Conversation page",
+                        options=list(range(history.page_count(page_size) - 1, -1, -1)),
+                        value=0,
+                        format_func=lambda p: "Latest" if p == 0 else f"{p * page_size}+ turns back",
+                    )
+                first_index = max(0, len(history) - (history_page + 1) * page_size)
+                
+                for i, (q, a, ts, _) in enumerate(history.page(history_page, page_size), start=first_index):
                     # User message
                     with st.chat_message("user", avatar="👤"):
                         st.write(q)
-                        st.caption(f"You • {datetime.now().strftime('%H:%M')}")
+                        st.caption(f"You • {datetime.fromtimestamp(ts).strftime('%H:%M')}")
                     
                     # AI response
                     with st.chat_message("assistant", avatar="🤖"):
@@ -852,9 +746,11 @@ def main():
                         col1, col2, col3, col4 = st.columns(4)
                         with col1:
                             if st.button("👍", key=f"hr_like_{i}", help="Helpful"):
+                                events.record("feedback", value=1, session_id=st.session_state.session_id, turn=i)
                                 st.success("Thanks!")
                         with col2:
                             if st.button("👎", key=f"hr_dislike_{i}", help="Not helpful"):
+                                events.record("feedback", value=0, session_id=st.session_state.session_id, turn=i)
                                 st.info("We'll improve!")
                         with col3:
                             if st.button("🔄", key=f"hr_retry_{i}", help="Retry"):
@@ -878,7 +774,7 @@ def main():
                             st.write(response)
                             st.caption(f"HR Assistant • {len(response)} chars")
                     
-                    st.session_state.chat_history.append((prompt, response))
+                    st.session_state.chat_history.append(prompt, response, "HR Assistant")
                     st.rerun()
             
             st.markdown('</div>', unsafe_allow_html=True)
@@ -887,6 +783,7 @@ def main():
             st.markdown('<div class="agent-card">', unsafe_allow_html=True)
             st.markdown("### 📄 Advanced Resume Screening Agent")
             st.markdown("*AI-powered candidate evaluation • Batch processing • Intelligent ranking*")
+            candidate_store = get_candidate_store()
             
             # Enhanced Job Description Input
             col1, col2 = st.columns([2, 1])
@@ -902,6 +799,10 @@ def main():
                 experience_weight = st.slider("Experience Weight", 0.0, 1.0, 0.3)
                 skills_weight = st.slider("Skills Weight", 0.0, 1.0, 0.4)
                 education_weight = st.slider("Education Weight", 0.0, 1.0, 0.3)
+                shortlist_size = st.number_input("AI Shortlist Size", 1, 1000, 20,
+                                                 help="Only the most relevant resumes (plus any whose local pre-score "
+                                                      "meets the threshold) get a full AI analysis")
+                must_have = st.text_input("Must-have Keywords", placeholder="e.g. python, sql, kubernetes")
             
             # Enhanced Resume Upload
             resume_files = st.file_uploader("📄 Upload Candidate Resumes", 
@@ -911,56 +812,122 @@ def main():
             
             if resume_files:
                 st.success(f"✅ {len(resume_files)} resumes ready for AI analysis")
-                
-                # Batch processing options
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    process_mode = st.selectbox("Processing Mode", ["Standard", "Deep Analysis", "Quick Scan"])
-                with col2:
-                    sort_by = st.selectbox("Sort Results By", ["Score", "Name", "Recommendation"])
-                with col3:
-                    export_format = st.selectbox("Export Format", ["JSON", "CSV", "PDF Report"])
+                process_mode = st.selectbox("Processing Mode", ["Standard", "Deep Analysis", "Quick Scan"])
             
             if st.button("🚀 Start AI Screening", type="primary", use_container_width=True) and job_desc and resume_files:
-                st.markdown("#### 📊 AI Screening Results")
-                
                 progress_bar = st.progress(0)
                 status_text = st.empty()
                 
+                weights = {"skills": skills_weight, "experience": experience_weight, "education": education_weight}
+                use_llm = process_mode != "Quick Scan" and st.session_state.qa_chain is not None
+                semantic = process_mode == "Deep Analysis" and st.session_state.vectorstore is not None
+                
+                # Parse the job description once (cached by content hash) and share it
+                status_text.text("🧭 Extracting job requirements...")
+                with llm_priority("batch", st.session_state.session_id):
+                    profile = job_profile(job_desc,
+                                          llm=st.session_state.qa_chain.llm if use_llm else None,
+                                          embeddings=st.session_state.vectorstore.embeddings if semantic else None)
+                
+                status_text.text("📑 Extracting resume text...")
+                resume_texts = [extract_text(f.name, f.getvalue()) for f in resume_files]
+                
+                # Rank the whole pool locally; only the shortlist goes to the LLM
+                required_keywords = must_have.split(",")
+                unmatched = parse_keywords(required_keywords)[1]
+                if unmatched:
+                    st.warning(f"⚠️ Ignoring must-have keywords with no letters or digits: {', '.join(unmatched)}")
+                ranking = prefilter(profile, resume_texts, required_keywords=required_keywords,
+                                    top_n=int(shortlist_size), min_score=min_score, weights=weights,
+                                    embeddings=st.session_state.vectorstore.embeddings if semantic else None)
+                shortlisted = sum(r.shortlisted for r in ranking)
+                
                 results = []
-                for i, resume_file in enumerate(resume_files):
-                    progress = (i + 1) / len(resume_files)
-                    progress_bar.progress(progress)
-                    status_text.text(f"🔍 Analyzing {resume_file.name}...")
-                    
-                    # Simulate resume content extraction
-                    resume_text = f"Professional resume for {resume_file.name.split('.')[0]} with relevant experience and skills."
-                    
-                    analysis = advanced_resume_screening(job_desc, resume_text, resume_file.name.split('.')[0])
-                    results.append(analysis)
-                    
-                    time.sleep(0.5)  # Simulate processing time
+                # The shared instructions + job requirements are cached with the
+                # provider for this run and released when it ends.
+                with (st.session_state.qa_chain.context_cache.run() if use_llm else nullcontext()):
+                    for n, ranked in enumerate(ranking):
+                        resume_file = resume_files[ranked.index]
+                        progress_bar.progress((n + 1) / len(ranking))
+                        status_text.text(f"🔍 Analyzing {resume_file.name}...")
+                        
+                        analysis = advanced_resume_screening(profile, resume_texts[ranked.index],
+                                                             resume_file.name.split('.')[0], weights=weights,
+                                                             use_llm=use_llm and ranked.shortlisted,
+                                                             features=ranked.features)
+                        analysis["relevance"] = round(ranked.similarity, 3)
+                        analysis["keyword_coverage"] = round(ranked.coverage, 2)
+                        analysis["shortlisted"] = ranked.shortlisted
+                        results.append(analysis)
                 
                 progress_bar.empty()
                 status_text.empty()
                 
-                # Sort results
-                if sort_by == "Score":
-                    results.sort(key=lambda x: x["score"], reverse=True)
-                elif sort_by == "Name":
-                    results.sort(key=lambda x: x["candidate_name"])
+                candidate_store.save_screening(profile.job_hash, requisition_title(job_desc), results,
+                                               session_id=st.session_state.session_id)
+                st.session_state.current_requisition = profile.job_hash
+                st.session_state.screening_page = 0
+                st.info(f"🎯 Pre-screening shortlisted {shortlisted} of {len(ranking)} resumes for AI analysis")
+                with st.expander("🧭 Extracted Job Requirements"):
+                    st.write(f"**Skills:** {', '.join(profile.skills[:30])}")
+                    st.write(f"**Years of experience:** {profile.required_years or 'not stated'}")
+                    st.markdown(profile.requirements)
+            
+            # Results are read page by page from the candidate store, so they
+            # survive reruns (action buttons work) and scale to large pools.
+            requisitions = candidate_store.requisitions()
+            if requisitions:
+                st.markdown("#### 📊 AI Screening Results")
+                req_ids = [r["requisition"] for r in requisitions]
+                req_labels = {r["requisition"]: f"{r['title']} ({r['candidates']} candidates)" for r in requisitions}
+                current = st.session_state.current_requisition
+                requisition = st.selectbox("Requisition", req_ids, format_func=req_labels.get,
+                                           index=req_ids.index(current) if current in req_ids else 0)
+                st.session_state.current_requisition = requisition
+                
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    rec_filter = st.multiselect("Recommendation", ["STRONG HIRE", "INTERVIEW", "CONSIDER", "REJECT"])
+                with col2:
+                    stage_filter = st.multiselect("Pipeline Stage", list(CANDIDATE_STAGES))
+                with col3:
+                    sort_by = st.selectbox("Sort Results By", ["Score", "Name", "Recommendation", "Updated"])
+                with col4:
+                    name_filter = st.text_input("Search Name")
+                
+                filters = {"requisition": requisition, "recommendations": rec_filter or None,
+                           "stages": stage_filter or None, "search": name_filter or None}
+                total = candidate_store.count(**filters)
+                page_size = 10
+                pages = max(1, -(-total // page_size))
+                page = min(st.session_state.get("screening_page", 0), pages - 1)
+                if pages > 1:
+                    page = st.select_slider("Page", options=list(range(pages)), value=page,
+                                            format_func=lambda p: f"{p + 1} / {pages}")
+                st.session_state.screening_page = page
+                
+                descending = sort_by in ("Score", "Updated")
+                rows = candidate_store.query(sort=sort_by.lower(), descending=descending,
+                                             limit=page_size, offset=page * page_size, **filters)
+                st.caption(f"Showing {len(rows)} of {total} matching candidates")
                 
                 # Display results with enhanced visualization
-                for i, result in enumerate(results):
+                for i, result in enumerate(rows, start=page * page_size):
                     priority_color = {"High": "🔴", "Medium": "🟡", "Low": "🟢", "None": "⚪"}
                     
-                    with st.expander(f"{priority_color[result['priority']]} #{i+1} {result['candidate_name']} - {result['recommendation']}"):
+                    with st.expander(f"{priority_color.get(result['priority'], '⚪')} #{i+1} {result['candidate_name']} - {result['recommendation']} • {result['stage']}"):
                         col1, col2 = st.columns([1, 2])
                         
                         with col1:
                             st.markdown(f'<div class="score-visualization">{result["score"]}/100</div>', unsafe_allow_html=True)
                             st.write(f"**Priority:** {result['priority']}")
                             st.write(f"**Recommendation:** {result['recommendation']}")
+                            st.write(f"**Stage:** {result['stage'].title()}")
+                            st.caption(f"Pre-score {result['pre_score']}"
+                                       + (f" • LLM {result['llm_score']}" if result["llm_score"] is not None else "")
+                                       + ("" if result.get("shortlisted", True) else " • not shortlisted"))
+                            if "relevance" in result:
+                                st.caption(f"Relevance {result['relevance']} • Must-haves {result['keyword_coverage']:.0%}")
                             
                             # Category breakdown
                             st.markdown("**Category Scores:**")
@@ -974,33 +941,44 @@ def main():
                             # Action buttons
                             col1, col2, col3 = st.columns(3)
                             with col1:
-                                if st.button("📞 Schedule Interview", key=f"interview_{i}"):
-                                    st.success("Interview scheduled!")
+                                if st.button("📞 Schedule Interview", key=f"interview_{result['id']}"):
+                                    candidate_store.set_stage(result["id"], "interview")
+                                    notify(f"Interview scheduled for {result['candidate_name']}")
+                                    st.rerun()
                             with col2:
-                                if st.button("📧 Send Email", key=f"email_{i}"):
+                                if st.button("📧 Send Email", key=f"email_{result['id']}"):
                                     st.success("Email sent!")
                             with col3:
-                                if st.button("📁 Add to Pipeline", key=f"pipeline_{i}"):
-                                    st.success("Added to pipeline!")
+                                if st.button("📁 Add to Pipeline", key=f"pipeline_{result['id']}",
+                                             disabled=result["stage"] != "screened"):
+                                    candidate_store.set_stage(result["id"], "pipeline")
+                                    notify(f"{result['candidate_name']} added to pipeline")
+                                    st.rerun()
                 
                 # Export functionality
-                if results:
-                    st.markdown("#### 📊 Export Results")
-                    export_data = {
-                        "screening_summary": {
-                            "total_candidates": len(results),
-                            "recommended_for_interview": len([r for r in results if r["score"] >= min_score]),
-                            "average_score": sum(r["score"] for r in results) / len(results),
-                            "screening_date": datetime.now().isoformat()
-                        },
-                        "candidates": results
-                    }
-                    
+                st.markdown("#### 📊 Export Results")
+                summary = candidate_store.summary(requisition, min_score)
+                screening_summary = {
+                    "requisition": req_labels[requisition],
+                    "total_candidates": summary["total_candidates"],
+                    "recommended_for_interview": summary["above_threshold"],
+                    "average_score": summary["average_score"],
+                    "pipeline_stages": summary["by_stage"],
+                    "screening_date": datetime.now().isoformat()
+                }
+                
+                col1, col2 = st.columns([1, 2])
+                with col1:
+                    export_format = st.selectbox("Export Format", list(EXPORT_FORMATS))
+                with col2:
                     st.download_button(
                         f"📄 Download {export_format} Report",
-                        json.dumps(export_data, indent=2, default=str),
-                        f"resume_screening_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                        "application/json",
+                        deferred_export(lambda: candidate_store.iter_export_rows(
+                                            sort=sort_by.lower(), descending=descending, **filters),
+                                        export_format, header={"screening_summary": screening_summary},
+                                        rows_key="candidates", columns=EXPORT_COLUMNS),
+                        export_filename("resume_screening_report", export_format),
+                        EXPORT_FORMATS[export_format][1],
                         use_container_width=True
                     )
             
@@ -1030,12 +1008,7 @@ def main():
             st.markdown("#### 🎯 Interview Session")
             
             if "interview_session" not in st.session_state:
-                st.session_state.interview_session = {
-                    "questions_asked": [],
-                    "responses_evaluated": [],
-                    "session_start": None,
-                    "candidate_name": ""
-                }
+                st.session_state.interview_session = new_interview_session()
             
             # Start new session
             col1, col2, col3 = st.columns([2, 1, 1])
@@ -1047,19 +1020,20 @@ def main():
             with col2:
                 if st.button("🚀 Start Session", type="primary"):
                     if candidate_name:
-                        st.session_state.interview_session = {
-                            "questions_asked": [],
-                            "responses_evaluated": [],
-                            "session_start": datetime.now(),
-                            "candidate_name": candidate_name
-                        }
+                        st.session_state.interview_session = new_interview_session(candidate_name, datetime.now())
                         st.success(f"Interview session started for {candidate_name}")
             
             with col3:
                 if st.button("📊 Session Report"):
-                    if st.session_state.interview_session["responses_evaluated"]:
-                        avg_score = sum(r["overall_score"] for r in st.session_state.interview_session["responses_evaluated"]) / len(st.session_state.interview_session["responses_evaluated"])
-                        st.metric("Session Average", f"{avg_score:.1f}/10")
+                    if st.session_state.interview_session["pending"]:
+                        with st.spinner("🧠 Evaluating recorded answers..."):
+                            evaluate_recorded_responses()
+                    aggregate = st.session_state.interview_session["aggregate"]
+                    if aggregate.count:
+                        st.metric("Session Average", f"{aggregate.average:.1f}/10",
+                                  help=f"{aggregate.count} answers • best {aggregate.best}/10 • lowest {aggregate.worst}/10")
+                        st.caption(" • ".join(f"{DIMENSION_LABELS[d]} {v:.1f}"
+                                              for d, v in aggregate.dimension_averages().items()))
             
             # Question Generation
             if st.session_state.interview_session["candidate_name"]:
@@ -1068,20 +1042,32 @@ def main():
                 col1, col2 = st.columns([3, 1])
                 
                 with col1:
+                    prefer_generated = st.checkbox("🤖 Prefer AI-generated questions",
+                                                   disabled=st.session_state.qa_chain is None)
+                    transcript_mode = st.checkbox("🗂️ Transcript mode: record answers now, evaluate them "
+                                                  "together in one call at the report or end of the interview")
                     if st.button("❓ Generate Smart Question", type="primary", use_container_width=True):
-                        exp_level = experience_level.split()[0].lower()
-                        question = intelligent_interview_agent(interview_type.lower(), exp_level, role_type)
-                        st.session_state.current_question = question
-                        st.session_state.interview_session["questions_asked"].append({
-                            "question": question,
-                            "type": interview_type,
-                            "timestamp": datetime.now()
-                        })
-                        st.success("✅ Question generated!")
+                        question = intelligent_interview_agent(interview_type, experience_level, role_type,
+                                                               prefer_generated=prefer_generated)
+                        if question is None:
+                            st.warning("All questions for this selection have been asked in this session.")
+                        else:
+                            st.session_state.current_question = question.text
+                            st.session_state.interview_session["questions_asked"].append({
+                                "question": question.text,
+                                "question_id": question.id,
+                                "source": question.source,
+                                "type": interview_type,
+                                "timestamp": datetime.now()
+                            })
+                            st.success("✅ Question generated!")
                 
                 with col2:
                     questions_count = len(st.session_state.interview_session["questions_asked"])
                     st.metric("Questions Asked", questions_count)
+                    remaining = st.session_state.interview_session["sampler"].remaining(
+                        interview_type, experience_level, role_type)
+                    st.caption(f"{remaining} unused bank questions for this selection")
                 
                 # Current Question Display
                 if hasattr(st.session_state, 'current_question'):
@@ -1096,7 +1082,13 @@ def main():
                     col1, col2, col3 = st.columns(3)
                     
                     with col1:
-                        if st.button("✅ Evaluate Response", type="primary") and candidate_response:
+                        if transcript_mode:
+                            if st.button("📝 Record Response", type="primary") and candidate_response:
+                                st.session_state.interview_session["pending"].append(TranscriptItem(
+                                    st.session_state.current_question, candidate_response, interview_type.lower()))
+                                st.success(f"Recorded • {len(st.session_state.interview_session['pending'])} "
+                                           "answers awaiting evaluation")
+                        elif st.button("✅ Evaluate Response", type="primary") and candidate_response:
                             with st.spinner("🧠 AI is evaluating the response..."):
                                 evaluation = evaluate_interview_response(
                                     st.session_state.current_question, 
@@ -1104,7 +1096,7 @@ def main():
                                     interview_type.lower()
                                 )
                                 
-                                st.session_state.interview_session["responses_evaluated"].append(evaluation)
+                                add_interview_evaluation(evaluation)
                                 
                                 # Display evaluation results
                                 st.markdown("#### 📊 Evaluation Results")
@@ -1115,20 +1107,23 @@ def main():
                                 with col2:
                                     st.metric("Recommendation", evaluation['recommendation'].split(' - ')[0])
                                 with col3:
-                                    session_avg = sum(r["overall_score"] for r in st.session_state.interview_session["responses_evaluated"]) / len(st.session_state.interview_session["responses_evaluated"])
+                                    session_avg = st.session_state.interview_session["aggregate"].average
                                     st.metric("Session Average", f"{session_avg:.1f}/10")
                                 
                                 # Detailed scores breakdown
                                 st.markdown("**Detailed Assessment:**")
                                 score_cols = st.columns(5)
-                                score_labels = ["Content", "Communication", "Problem Solving", "Experience", "Cultural Fit"]
                                 
-                                for i, (label, score) in enumerate(zip(score_labels, evaluation["detailed_scores"].values())):
+                                for i, (dimension, score) in enumerate(evaluation["detailed_scores"].items()):
                                     with score_cols[i]:
-                                        st.metric(label, f"{score}/10")
+                                        st.metric(DIMENSION_LABELS[dimension], f"{score}/10")
                                 
                                 st.markdown("**AI Feedback:**")
                                 st.write(evaluation["evaluation"])
+                                if evaluation["cached"]:
+                                    st.caption("♻️ Same answer evaluated before: scores served from cache")
+                                elif evaluation["scored_by"] == "heuristic":
+                                    st.caption("⚠️ AI evaluation unavailable: scores estimated from answer length and relevance")
                     
                     with col2:
                         if st.button("⏭️ Next Question"):
@@ -1138,24 +1133,24 @@ def main():
                     
                     with col3:
                         if st.button("🏁 End Interview"):
-                            if st.session_state.interview_session["responses_evaluated"]:
-                                # Generate final report
-                                final_avg = sum(r["overall_score"] for r in st.session_state.interview_session["responses_evaluated"]) / len(st.session_state.interview_session["responses_evaluated"])
-                                
-                                if final_avg >= 8:
-                                    final_recommendation = "STRONG HIRE - Excellent candidate"
-                                elif final_avg >= 7:
-                                    final_recommendation = "HIRE - Good candidate with potential"
-                                elif final_avg >= 6:
-                                    final_recommendation = "MAYBE - Consider with reservations"
-                                else:
-                                    final_recommendation = "NO HIRE - Does not meet requirements"
+                            if st.session_state.interview_session["pending"]:
+                                with st.spinner("🧠 Evaluating the interview transcript..."):
+                                    evaluate_recorded_responses()
+                            aggregate = st.session_state.interview_session["aggregate"]
+                            if aggregate.count:
+                                # Generate final report from the running aggregate
+                                final_avg = aggregate.average
+                                final_recommendation = aggregate.recommendation
                                 
                                 st.success(f"Interview completed! Final recommendation: {final_recommendation}")
                                 
                                 # Store in interview scores for analytics
                                 session_id = f"session_{len(st.session_state.interview_scores) + 1}"
                                 st.session_state.interview_scores[session_id] = final_avg
+                                events.record("interview_session", value=final_avg,
+                                              session_id=st.session_state.session_id,
+                                              candidate=st.session_state.interview_session["candidate_name"],
+                                              recommendation=final_recommendation)
             
             st.markdown('</div>', unsafe_allow_html=True)
         
@@ -1170,68 +1165,85 @@ def main():
             with col1:
                 employee_name = st.text_input("👤 Employee Name", placeholder="New hire's full name")
             
+            onboarding_plans = get_onboarding_plans()
+            
             with col2:
-                employee_role = st.selectbox("💼 Role", 
-                                           ["Software Engineer", "Data Scientist", "Product Manager", 
-                                            "Designer", "Sales Representative", "Marketing Manager"])
+                employee_role = st.selectbox("💼 Role", onboarding_plans.roles)
             
             with col3:
-                department = st.selectbox("🏢 Department", 
-                                        ["Engineering", "Data Science", "Product", "Design", 
-                                         "Sales", "Marketing", "HR", "Finance"])
+                department = st.selectbox("🏢 Department", onboarding_plans.departments)
             
             # Onboarding Stage Selection
-            stages = ["welcome", "documentation", "training", "setup"]
-            stage_names = ["🎉 Welcome & Orientation", "📋 Documentation & Paperwork", 
-                          "🎓 Training & Learning", "⚙️ System & Workspace Setup"]
+            stages = list(onboarding_plans.stages)
+            stage_names = [onboarding_plans.stage_names[s] for s in stages]
             
             selected_stage_name = st.selectbox("📍 Current Onboarding Stage", stage_names)
             stage_key = stages[stage_names.index(selected_stage_name)]
+            tailored = st.checkbox("🤖 AI-tailored plan for this role (generated once, then cached)",
+                                   disabled=st.session_state.qa_chain is None)
             
             # Get personalized onboarding information
-            onboarding_info = smart_onboarding_agent(stage_key, employee_role, department)
+            onboarding_info = smart_onboarding_agent(stage_key, employee_role, department, tailored=tailored)
             
             # Display stage information
-            st.markdown(f"#### {onboarding_info['title']}")
-            st.info(f"👋 {employee_name}, {onboarding_info['info']}")
+            st.markdown(f"#### {onboarding_info.title}")
+            st.info(f"👋 {employee_name}, {onboarding_info.info}")
+            if tailored and onboarding_info.source != "generated":
+                st.caption("AI-tailored plan unavailable; showing the standard plan.")
             
             # Enhanced task management
             st.markdown("**📋 Tasks to Complete:**")
             
-            total_tasks = len(onboarding_info['tasks'])
+            # Progress is stored per employee once tracking is started explicitly (so half-typed
+            # names never create onboardings); checkbox changes are written in one batch per run
+            progress_store = get_progress_store()
+            tracking = bool(employee_name.strip()) and progress_store.has_onboarding(employee_name, employee_role)
+            if not employee_name.strip():
+                st.caption("Enter the new hire's name to track their progress.")
+            elif not tracking:
+                if st.button(f"▶️ Start Onboarding for {employee_name.strip()}", key="start_onboarding"):
+                    progress_store.start_onboarding(employee_name, employee_role, department)
+                    tracking = True
+                else:
+                    st.caption("Start onboarding to track this new hire's progress.")
+            if tracking:
+                progress_store.start_stage(employee_name, employee_role, stage_key, onboarding_info.tasks)
+                progress = progress_store.stage_progress(employee_name, employee_role, stage_key)
+            else:
+                progress = {}
+            
+            total_tasks = len(onboarding_info.tasks)
             completed_count = 0
             
-            for i, task in enumerate(onboarding_info['tasks']):
-                task_key = f"{stage_key}_task_{i}"
-                completed = st.session_state.onboarding_progress.get(task_key, False)
+            for task in onboarding_info.tasks:
+                task_key = task_id(task)
+                completed = progress.get(task_key, False)
                 
                 col1, col2, col3 = st.columns([1, 6, 1])
                 
                 with col1:
-                    if st.checkbox("", value=completed, key=f"check_{task_key}_{employee_name}"):
-                        st.session_state.onboarding_progress[task_key] = True
-                        if not completed:  # Just completed
-                            st.session_state.notifications.append({
-                                "type": "success",
-                                "message": f"Task completed: {task[:30]}...",
-                                "timestamp": datetime.now()
-                            })
-                    else:
-                        st.session_state.onboarding_progress[task_key] = False
+                    checked = st.checkbox("", value=completed, disabled=not tracking,
+                                          key=f"check_{stage_key}_{task_key}_{employee_id(employee_name)}_{employee_role}")
+                    if checked != completed:
+                        progress_store.set_task(employee_name, employee_role, stage_key, task, checked)
+                        if checked:  # Just completed
+                            events.record("onboarding_task", session_id=st.session_state.session_id,
+                                          employee=employee_name, stage=stage_key, task=task)
+                            notify(f"Task completed: {task[:30]}...")
                 
                 with col2:
-                    status_icon = "✅" if st.session_state.onboarding_progress.get(task_key, False) else "⏳"
-                    task_style = "completed" if st.session_state.onboarding_progress.get(task_key, False) else "pending"
+                    status_icon = "✅" if checked else "⏳"
                     
                     st.markdown(f'<div class="progress-container">{status_icon} {task}</div>', 
                               unsafe_allow_html=True)
                 
                 with col3:
-                    if st.session_state.onboarding_progress.get(task_key, False):
+                    if checked:
                         completed_count += 1
                         st.markdown("✅")
                     else:
                         st.markdown("⏳")
+            progress_store.flush()
             
             # Enhanced progress tracking
             progress_percentage = completed_count / total_tasks if total_tasks > 0 else 0
@@ -1268,43 +1280,58 @@ def main():
                 else:
                     st.success("🏆 Onboarding Complete! Welcome to the team!")
             
-            # Additional onboarding resources
-            st.markdown("#### 📚 Additional Resources")
-            
-            resources = {
-                "welcome": [
-                    "📖 Employee Handbook",
-                    "🏢 Company Organization Chart", 
-                    "📞 Important Contact Directory",
-                    "🎯 First Week Goals"
-                ],
-                "documentation": [
-                    "📋 Required Forms Checklist",
-                    "💳 Benefits Enrollment Guide",
-                    "🔒 Security & Compliance Training",
-                    "📝 Emergency Contact Forms"
-                ],
-                "training": [
-                    "🎓 Learning Management System",
-                    "👥 Team Introduction Schedule",
-                    "📚 Role-Specific Training Materials",
-                    "🎯 Performance Expectations"
-                ],
-                "setup": [
-                    "💻 IT Setup Guide",
-                    "🔑 System Access Requests",
-                    "🛠️ Development Environment Setup",
-                    "📱 Communication Tools Setup"
-                ]
-            }
+            with st.expander("📈 Onboarding Progress Across Employees"):
+                scope = st.radio("Scope", ["All departments", department], horizontal=True)
+                rates = progress_store.completion_rates(department=None if scope == "All departments" else department)
+                if rates:
+                    order = {stage: i for i, stage in enumerate(stages)}
+                    st.dataframe(pd.DataFrame([
+                        {"Stage": onboarding_plans.stage_names.get(r["stage"], r["stage"]),
+                         "Employees": r["employees"], "Stage Complete": r["stage_completed"],
+                         "Task Completion": f"{r['completion_rate'] * 100:.0f}%"}
+                        for r in sorted(rates, key=lambda r: order.get(r["stage"], len(order)))
+                    ]), hide_index=True, use_container_width=True)
+                    recent = progress_store.onboardings(limit=20, department=None if scope == "All departments" else department)
+                    st.dataframe(pd.DataFrame([
+                        {"Employee": r["name"], "Role": r["role"], "Department": r["department"],
+                         "Completion": f"{r['completion_rate'] * 100:.0f}%",
+                         "Last Activity": datetime.fromtimestamp(r["updated_at"]).strftime("%Y-%m-%d %H:%M")}
+                        for r in recent
+                    ]), hide_index=True, use_container_width=True)
+                else:
+                    st.caption("No onboarding progress recorded yet.")
             
-            stage_resources = resources.get(stage_key, [])
-            cols = st.columns(2)
+            # Additional onboarding resources: handbook sections matched to this stage and its tasks,
+            # precomputed once per document index
+            st.markdown("#### 📚 Additional Resources")
             
-            for i, resource in enumerate(stage_resources):
-                with cols[i % 2]:
-                    if st.button(resource, key=f"resource_{stage_key}_{i}"):
-                        st.info(f"Opening {resource}...")
+            stage_links = None
+            if st.session_state.vectorstore is not None:
+                try:
+                    stage_links, task_links = get_handbook_links().for_stage(st.session_state.vectorstore,
+                                                                             onboarding_info)
+                except Exception as e:
+                    print(f"Handbook lookup failed: {e}")
+            if stage_links is not None:
+                for link in stage_links:
+                    with st.expander(f"📄 {link.label}"):
+                        st.write(link.snippet)
+                task_refs = [(task, links[0]) for task, links in task_links.items() if links]
+                if task_refs:
+                    st.markdown("**Where to find help for each task:**")
+                    for task, link in task_refs:
+                        st.caption(f"{task} → 📄 {link.label}")
+                if not stage_links:
+                    st.caption("No matching handbook sections found.")
+            else:
+                stage_resources = onboarding_info.resources
+                cols = st.columns(2)
+                
+                for i, resource in enumerate(stage_resources):
+                    with cols[i % 2]:
+                        if st.button(resource, key=f"resource_{stage_key}_{i}"):
+                            st.info(f"Opening {resource}...")
+                st.caption("Process company documents to link each stage and task to the handbook.")
             
             st.markdown('</div>', unsafe_allow_html=True)
         
@@ -1320,20 +1347,20 @@ def main():
                 st.metric("Total Conversations", len(st.session_state.chat_history))
             
             with col2:
-                avg_length = sum(len(a) for _, a in st.session_state.chat_history) / len(st.session_state.chat_history)
+                avg_length = st.session_state.chat_history.avg_answer_length()
                 st.metric("Avg Response Length", f"{avg_length:.0f} chars")
             
             with col3:
-                recent_conversations = len([1 for q, a in st.session_state.chat_history[-5:]])
+                recent_conversations = len(st.session_state.chat_history.recent(5))
                 st.metric("Recent Activity", f"{recent_conversations} interactions")
             
             # Display recent conversations
             st.markdown("#### 📝 Recent Conversations")
-            for i, (q, a) in enumerate(st.session_state.chat_history[-3:]):
+            for q, a, _, agent in st.session_state.chat_history.recent(3):
                 with st.expander(f"💬 {q[:60]}..." if len(q) > 60 else f"💬 {q}"):
                     st.write(f"**Question:** {q}")
                     st.write(f"**Response:** {a}")
-                    st.caption(f"Agent: {st.session_state.current_agent} • Length: {len(a)} chars")
+                    st.caption(f"Agent: {agent or st.session_state.current_agent} • Length: {len(a)} chars")
             
             st.markdown('</div>', unsafe_allow_html=True)
     
@@ -1387,7 +1414,12 @@ def main():
                 if docs:
                     vs = build_vectorstore(docs)
                     st.session_state.vectorstore = vs
-                    st.session_state.qa_chain = build_qa_chain(vs)
+                    try:
+                        get_handbook_links().precompute(vs)
+                    except Exception as e:
+                        print(f"Handbook precompute failed: {e}")
+                    st.session_state.qa_chain = build_qa_chain(vs, condense_mode=os.getenv("HR_CONDENSE_MODE", "heuristic"),
+                                                                 scheduler=SCHEDULER)
                     st.session_state.docs_loaded = True
                     st.success("🎉 Enterprise AI System Activated!")
                     st.balloons()
@@ -1403,41 +1435,95 @@ def main():
         
         with col1:
             st.metric("🎯 Success Rate", f"{st.session_state.performance_metrics['avg_satisfaction']*20:.1f}%")
-            st.metric("⚡ Response Time", f"{st.session_state.performance_metrics['response_time']:.1f}s")
+            st.metric("⚡ Response Time", format_seconds(METRICS.percentiles("total")["p50"] if METRICS.count("total") else None))
         
         with col2:
             st.metric("👥 Active Sessions", st.session_state.active_sessions)
             st.metric("🔧 System Health", f"{st.session_state.system_health:.1f}%")
         
-        # Performance visualization
-        if len(st.session_state.chat_history) > 1:
-            # Create sample performance data
-            performance_data = pd.DataFrame({
-                'Time': pd.date_range(start=datetime.now() - timedelta(hours=6), 
-                                    end=datetime.now(), freq='H'),
-                'Performance': [random.randint(85, 98) for _ in range(7)]
-            })
-            
-            fig = px.line(performance_data, x='Time', y='Performance', 
-                         title='🚀 System Performance (Last 6 Hours)')
-            fig.update_layout(height=250, showlegend=False)
-            st.plotly_chart(fig, use_container_width=True)
+        # Per-stage pipeline latency
+        latency_summary = METRICS.summary(QUERY_STAGES + INDEX_STAGES + QUEUE_STAGES)
+        if latency_summary:
+            with st.expander("⏱️ Pipeline Latency (rolling)"):
+                st.dataframe(pd.DataFrame([
+                    {"Stage": stage, "Samples": stats["count"],
+                     "p50": format_seconds(stats["p50"]), "p95": format_seconds(stats["p95"]),
+                     "p99": format_seconds(stats["p99"])}
+                    for stage, stats in latency_summary.items()
+                ]), hide_index=True, use_container_width=True)
+                token_summary = METRICS.summary(TOKEN_STAGES)
+                if token_summary:
+                    st.caption(" • ".join(
+                        f"{stage.replace('_', ' ')}: p50 {stats['p50']:.0f} / p95 {stats['p95']:.0f}"
+                        for stage, stats in token_summary.items()
+                    ))
+                prompt_stats = [r for r in PROMPTS.stats() if r["renders"]]
+                if prompt_stats:
+                    st.dataframe(pd.DataFrame([
+                        {"Template": r["template"], "Renders": r["renders"], "Static prefix": r["prefix_tokens"],
+                         "Avg shared": round(r["avg_shared_tokens"]), "Avg per-call": round(r["avg_body_tokens"])}
+                        for r in prompt_stats
+                    ]), hide_index=True, use_container_width=True)
+                st.caption("LLM scheduler: " + " • ".join(
+                    f"{priority} {s['running']}/{s['limit']} running, {s['waiting']} queued"
+                    for priority, s in SCHEDULER.stats().items()
+                ))
+                if st.session_state.qa_chain is not None:
+                    cache_stats = st.session_state.qa_chain.context_cache.stats()
+                    if cache_stats["cached_calls"]:
+                        st.caption(f"Context cache: {cache_stats['cached_calls']} cached calls "
+                                   f"({cache_stats['hits']} reusing a handle), "
+                                   f"{cache_stats['tokens_cached']:,} prompt tokens served from cache, "
+                                   f"{cache_stats['active']} active handles")
+        
+        # Query volume and latency from the pre-aggregated rollups; figures
+        # are only rebuilt when the event store version changes
+        store = events.get_event_store()
+        # Naive dates are local midnights, as the rollup buckets are; pd.Timestamp.timestamp() would read them as UTC
+        window_start = hr_data['Date'].iloc[0].to_pydatetime().timestamp()
+        if hr_data["Queries"].sum() > 0:
+            def build_queries_figure():
+                fig = px.bar(hr_data, x='Date', y='Queries', 
+                             title='📈 HR Queries (Last 30 Days)')
+                fig.update_layout(height=250, showlegend=False)
+                return fig
+            
+            st.plotly_chart(SHARED_FIGURES.get("hr_queries_fig", store_version, build_queries_figure),
+                            use_container_width=True)
+            
+            latency = SHARED_FIGURES.get("hr_query_latency", store_version,
+                                         lambda: store.percentiles("hr_query", window_start))
+            st.caption(f"30-day response time: p50 {format_seconds(latency['p50'])} • "
+                       f"p95 {format_seconds(latency['p95'])} • p99 {format_seconds(latency['p99'])}")
+        
+        def build_screening_figure():
+            screening_dist = store.distribution("screening", window_start)
+            if not screening_dist:
+                return None
+            fig = px.bar(x=list(screening_dist.keys()), y=list(screening_dist.values()),
+                         labels={'x': 'Score', 'y': 'Candidates'},
+                         title='📄 Screening Score Distribution (30 Days)')
+            fig.update_layout(height=200)
+            return fig
+        
+        screening_fig = SHARED_FIGURES.get("screening_dist_fig", store_version, build_screening_figure)
+        if screening_fig is not None:
+            st.plotly_chart(screening_fig, use_container_width=True)
         
         # Interview analytics
-        if st.session_state.interview_scores:
+        if not interview_data.empty:
             st.markdown("#### 🎤 Interview Analytics")
             
-            scores_df = pd.DataFrame({
-                'Session': list(st.session_state.interview_scores.keys()),
-                'Score': list(st.session_state.interview_scores.values())
-            })
+            def build_interview_figure():
+                fig = px.bar(interview_data, x='Candidate', y='Overall', 
+                            title='Interview Performance Scores')
+                fig.update_layout(height=200)
+                return fig
             
-            fig = px.bar(scores_df, x='Session', y='Score', 
-                        title='Interview Performance Scores')
-            fig.update_layout(height=200)
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(SHARED_FIGURES.get("interview_fig", store_version, build_interview_figure),
+                            use_container_width=True)
             
-            avg_score = sum(st.session_state.interview_scores.values()) / len(st.session_state.interview_scores)
+            avg_score = interview_data['Overall'].mean()
             st.metric("Average Interview Score", f"{avg_score:.1f}/10")
         
         st.markdown('</div>', unsafe_allow_html=True)
@@ -1476,7 +1562,7 @@ def main():
                 "session_data": {
                     "total_conversations": len(st.session_state.chat_history),
                     "interview_sessions": len(st.session_state.interview_scores),
-                    "onboarding_progress": len([k for k, v in st.session_state.onboarding_progress.items() if v]),
+                    "onboarding_tasks_completed": sum(r["tasks_completed"] for r in get_progress_store().completion_rates()),
                     "system_health": st.session_state.system_health
                 },
                 "analytics": {
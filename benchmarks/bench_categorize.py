@@ -0,0 +1,131 @@
+"""
+Query categorization micro-benchmark.
+
+Compares the previous hr_assistant_agent categorization (repeated
+query.lower() calls and a chain of substring any() scans) with the
+compiled single-pass engine in utils.categorize, over a synthetic mix of
+HR questions, and reports throughput plus how often the two disagree.
+The same chain of scans over the engine's full vocabulary is timed too,
+since scan cost grows with the number of terms and the engine's does not.
+
+    python -m benchmarks.bench_categorize --queries 20000
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+from utils.categorize import CATEGORY_ORDER, CATEGORY_TERMS, URGENCY_TERMS, QueryCategorizer
+
+TEMPLATES = [
+    "How many vacation days do I get this year?",
+    "What is the policy on remote work and the handbook rules?",
+    "Is dental insurance included in my benefits package?",
+    "I need urgent help with FMLA paperwork ASAP",
+    "Who handles compliance audits for the finance team?",
+    "Can I carry over unused PTO to next year?",
+    "What are the regulations for overtime in our state?",
+    "How do I enroll in the 401k retirement plan?",
+    "Where can I find the code of conduct?",
+    "My manager asked me to work during sick leave, is that legal?",
+    "What is the process to request a new laptop?",
+    "Is there a healthy snacks program in the office?",
+    "When is the open enrollment period for health insurance?",
+    "Emergency: I need to report harassment immediately",
+    "Who do I talk to about my payslip?",
+]
+FILLERS = ["please", "thanks", "quick question:", "hi team,", "", "", "for my team", "as a new hire"]
+
+
+def legacy_classify(query):
+    """The categorization hr_assistant_agent used before utils.categorize."""
+    priority_keywords = ["urgent", "emergency", "asap", "immediate", "critical"]
+    is_urgent = any(keyword in query.lower() for keyword in priority_keywords)
+    if any(word in query.lower() for word in ["policy", "policies", "rule", "regulation", "handbook"]):
+        prompt_type = "policy"
+    elif any(word in query.lower() for word in ["leave", "vacation", "sick", "time off", "pto", "fmla"]):
+        prompt_type = "leave"
+    elif any(word in query.lower() for word in ["benefit", "insurance", "retirement", "401k", "health", "dental"]):
+        prompt_type = "benefits"
+    elif any(word in query.lower() for word in ["compliance", "legal", "law", "regulation", "audit"]):
+        prompt_type = "compliance"
+    else:
+        prompt_type = "general"
+    return prompt_type, is_urgent
+
+
+def scan_classifier(category_terms=CATEGORY_TERMS, urgency_terms=URGENCY_TERMS):
+    """The legacy chain-of-scans approach applied to an arbitrary vocabulary."""
+    chain = [(c, list(category_terms[c])) for c in CATEGORY_ORDER if c in category_terms]
+
+    def classify(query):
+        is_urgent = any(keyword in query.lower() for keyword in urgency_terms)
+        for category, terms in chain:
+            if any(word in query.lower() for word in terms):
+                return category, is_urgent
+        return "general", is_urgent
+
+    return classify
+
+
+def make_queries(n, seed):
+    rng = random.Random(seed)
+    return [f"{rng.choice(FILLERS)} {rng.choice(TEMPLATES)} {rng.choice(FILLERS)}".strip() for _ in range(n)]
+
+
+def _time(fn, queries, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for q in queries:
+            fn(q)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    queries = make_queries(args.queries, args.seed)
+
+    build_start = time.perf_counter()
+    engine = QueryCategorizer()
+    build_seconds = time.perf_counter() - build_start
+
+    legacy = _time(legacy_classify, queries, args.repeat)
+    legacy_full = _time(scan_classifier(), queries, args.repeat)
+    compiled = _time(engine.classify, queries, args.repeat)
+
+    disagreements = {}
+    for q in set(queries):
+        old, new = legacy_classify(q), engine.classify(q)
+        if (old[0], old[1]) != (new.category, new.urgent):
+            disagreements[q] = {"legacy": list(old), "engine": [new.category, new.urgent]}
+
+    report = {
+        "queries": len(queries),
+        "engine_build_seconds": build_seconds,
+        "legacy": {"seconds": legacy, "per_query_us": legacy / len(queries) * 1e6},
+        "legacy_full_vocabulary": {"seconds": legacy_full, "per_query_us": legacy_full / len(queries) * 1e6},
+        "engine": {"seconds": compiled, "per_query_us": compiled / len(queries) * 1e6},
+        "speedup": legacy / compiled if compiled else None,
+        "speedup_full_vocabulary": legacy_full / compiled if compiled else None,
+        "disagreements": disagreements,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
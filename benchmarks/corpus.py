@@ -0,0 +1,109 @@
+"""
+Synthetic HR policy corpus with labeled questions.
+
+Every document covers one (office, topic) pair and states facts that only
+appear in that document, so each generated question has exactly one
+correct source_file.
+"""
+import os
+import random
+from typing import Dict, List
+
+OFFICES = [
+    "Austin", "Berlin", "Boston", "Chicago", "Dublin", "Lisbon", "London", "Madrid",
+    "Melbourne", "Mumbai", "Munich", "Nairobi", "Oslo", "Paris", "Prague", "Seattle",
+    "Seoul", "Singapore", "Stockholm", "Sydney", "Tokyo", "Toronto", "Vienna", "Warsaw",
+]
+
+TOPICS = {
+    "vacation": (
+        "Vacation Leave Policy",
+        "Employees in the {office} office accrue {n} days of paid vacation per year. "
+        "Vacation requests must be submitted {m} days in advance through the HR portal.",
+        "How many vacation days do employees in the {office} office get?",
+    ),
+    "sick_leave": (
+        "Sick Leave Policy",
+        "Staff based in {office} receive {n} days of paid sick leave. A medical certificate "
+        "is required after {m} consecutive sick days.",
+        "When is a medical certificate required for sick leave in {office}?",
+    ),
+    "remote_work": (
+        "Remote Work Policy",
+        "The {office} office allows remote work up to {n} days per week. Managers approve "
+        "remote arrangements and review them every {m} months.",
+        "How many remote work days per week are allowed at the {office} office?",
+    ),
+    "health_insurance": (
+        "Health Insurance Benefits",
+        "Health insurance for {office} employees covers {n} percent of premiums. Dental "
+        "and vision enrollment opens for {m} weeks each November.",
+        "What share of health insurance premiums is covered for {office} employees?",
+    ),
+    "retirement": (
+        "Retirement Plan",
+        "The {office} retirement plan matches contributions up to {n} percent of salary, "
+        "vesting fully after {m} years of service.",
+        "How does retirement matching work in {office}?",
+    ),
+    "expenses": (
+        "Travel and Expense Policy",
+        "Travellers from {office} may claim a daily meal allowance of {n} dollars. Expense "
+        "reports are due within {m} days of returning.",
+        "What is the daily meal allowance for travel from {office}?",
+    ),
+    "performance_review": (
+        "Performance Review Process",
+        "Performance reviews in {office} happen every {n} months, with calibration "
+        "meetings held {m} weeks before ratings are final.",
+        "How often are performance reviews held in {office}?",
+    ),
+    "security": (
+        "Information Security Policy",
+        "Laptops issued in {office} must lock after {n} minutes idle, and passwords "
+        "rotate every {m} days.",
+        "How quickly must laptops issued in {office} lock when idle?",
+    ),
+}
+
+FILLER = [
+    "This policy applies to all full-time and part-time employees unless a local agreement states otherwise.",
+    "Questions about this document should be directed to the People Operations team.",
+    "The company reserves the right to amend this policy with reasonable notice.",
+    "Managers are responsible for communicating these rules to their teams.",
+    "Exceptions require written approval from the HR Business Partner.",
+    "Records are retained in accordance with the data retention schedule.",
+    "Employees should review this policy annually and acknowledge any changes.",
+    "Where local law provides greater protection, local law takes precedence.",
+]
+
+
+def generate_corpus(n_docs: int, seed: int = 42, filler_paragraphs: int = 6) -> List[Dict]:
+    """
+    Return `n_docs` synthetic documents as dicts with source_file,
+    text and a labeled question.
+    """
+    rng = random.Random(seed)
+    pairs = [(o, t) for o in OFFICES for t in TOPICS]
+    docs = []
+    for i in range(n_docs):
+        office, topic = pairs[i % len(pairs)]
+        cycle = i // len(pairs)
+        office_label = office if cycle == 0 else f"{office} {cycle + 1}"
+        title, fact, question = TOPICS[topic]
+        n, m = rng.randint(2, 40), rng.randint(2, 12)
+        body = [rng.choice(FILLER) for _ in range(filler_paragraphs)]
+        body.insert(rng.randint(0, len(body)), fact.format(office=office_label, n=n, m=m))
+        docs.append({
+            "source_file": f"{topic}_{office_label.replace(' ', '_').lower()}.md",
+            "text": "\n\n".join([f"# {office_label} {title}"] + body) + "\n",
+            "question": question.format(office=office_label),
+        })
+    return docs
+
+
+def write_corpus(docs: List[Dict], data_dir: str) -> None:
+    os.makedirs(data_dir, exist_ok=True)
+    for doc in docs:
+        with open(os.path.join(data_dir, doc["source_file"]), "w", encoding="utf-8") as f:
+            f.write(doc["text"])
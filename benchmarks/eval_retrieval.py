@@ -0,0 +1,156 @@
+"""
+Retrieval quality and latency regression suite.
+
+Builds the retriever exactly as the app does (build_vectorstore +
+build_qa_chain) over a labeled corpus and reports recall@k, MRR and
+per-query retrieval latency for every combination of chunk size,
+overlap and k. Runs fully offline with the hashed fake embedder, or with
+a local sentence-transformers model via --embedder hf:<model-name>.
+
+    python -m benchmarks.eval_retrieval --chunk-sizes 500,1000 --ks 2,4,8
+    python -m benchmarks.eval_retrieval --data-dir data --pairs labels.json
+
+A pairs file is a JSON list of {"question": ..., "source_file": ...}.
+Exits non-zero when any configuration falls below --min-recall.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks.corpus import generate_corpus, write_corpus
+from utils.fakes import FakeChatModel, FakeEmbeddings
+from utils.loader import load_documents
+from utils.metrics import LatencyTracker, percentile
+from utils.rag import build_qa_chain, build_vectorstore
+
+
+def make_embeddings(spec: str, dim: int):
+    if spec == "fake":
+        return FakeEmbeddings(size=dim)
+    if spec.startswith("hf:"):
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+
+        return HuggingFaceEmbeddings(model_name=spec[3:])
+    raise ValueError(f"Unknown embedder: {spec}")
+
+
+def ranked_sources(docs) -> List[str]:
+    """Distinct source files in retrieval order."""
+    seen = []
+    for d in docs:
+        src = d.metadata.get("source_file")
+        if src not in seen:
+            seen.append(src)
+    return seen
+
+
+def evaluate(docs, pairs: List[Dict], embeddings, chunk_size: int, chunk_overlap: int, k: int) -> Dict:
+    vs = build_vectorstore(
+        docs,
+        persist_dir=None,
+        embeddings=embeddings,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+    )
+    chain = build_qa_chain(vs, llm=FakeChatModel(), k=k, metrics=LatencyTracker())
+
+    hits = 0
+    reciprocal_ranks = 0.0
+    latencies = []
+    misses = []
+    for pair in pairs:
+        start = time.perf_counter()
+        retrieved = chain.retrieve(pair["question"])
+        latencies.append(time.perf_counter() - start)
+
+        sources = ranked_sources(retrieved)
+        if pair["source_file"] in sources:
+            hits += 1
+            reciprocal_ranks += 1.0 / (sources.index(pair["source_file"]) + 1)
+        else:
+            misses.append(pair["question"])
+
+    latencies.sort()
+    n = len(pairs) or 1
+    return {
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "k": k,
+        "chunks": vs.index.ntotal,
+        "recall_at_k": hits / n,
+        "mrr": reciprocal_ranks / n,
+        "latency": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+        },
+        "misses": misses[:10],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data-dir", help="Corpus directory (default: generate a synthetic corpus)")
+    parser.add_argument("--pairs", help="JSON file of labeled question/source_file pairs")
+    parser.add_argument("--docs", type=int, default=96, help="Synthetic corpus size")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--embedder", default="fake", help="'fake' or 'hf:<sentence-transformers model>'")
+    parser.add_argument("--embedding-dim", type=int, default=512)
+    parser.add_argument("--chunk-sizes", default="1000")
+    parser.add_argument("--chunk-overlaps", default="200")
+    parser.add_argument("--ks", default="4")
+    parser.add_argument("--min-recall", type=float, default=0.0)
+    parser.add_argument("--output", help="Write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    if bool(args.data_dir) != bool(args.pairs):
+        parser.error("--data-dir and --pairs must be given together")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.data_dir:
+            data_dir = args.data_dir
+            with open(args.pairs, encoding="utf-8") as f:
+                pairs = json.load(f)
+        else:
+            corpus = generate_corpus(args.docs, seed=args.seed)
+            data_dir = os.path.join(tmp, "data")
+            write_corpus(corpus, data_dir)
+            pairs = [{"question": d["question"], "source_file": d["source_file"]} for d in corpus]
+        docs = load_documents(data_dir)
+
+    embeddings = make_embeddings(args.embedder, args.embedding_dim)
+    grid = itertools.product(
+        [int(x) for x in args.chunk_sizes.split(",")],
+        [int(x) for x in args.chunk_overlaps.split(",")],
+        [int(x) for x in args.ks.split(",")],
+    )
+    results = [
+        evaluate(docs, pairs, embeddings, chunk_size, overlap, k)
+        for chunk_size, overlap, k in grid
+        if overlap < chunk_size
+    ]
+
+    report = {
+        "embedder": args.embedder,
+        "documents": len(docs),
+        "questions": len(pairs),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    failing = [r for r in results if r["recall_at_k"] < args.min_recall]
+    return 1 if failing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
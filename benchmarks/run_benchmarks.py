@@ -0,0 +1,174 @@
+"""
+Offline performance benchmarks for the RAG pipeline.
+
+Runs the real loader, splitter, FAISS index and SimpleQAChain against
+deterministic fake embedding/chat backends, across several corpus sizes,
+and prints one JSON document so runs can be diffed for regressions.
+
+    python -m benchmarks.run_benchmarks --sizes 50,200,800 --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.corpus import generate_corpus, write_corpus
+from utils.fakes import FakeChatModel, FakeEmbeddings
+from utils.loader import load_documents
+from utils.metrics import LatencyTracker, percentile
+from utils.rag import build_qa_chain, build_vectorstore, split_documents
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+def _summary(values):
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "mean": sum(values) / len(values) if values else 0.0,
+    }
+
+
+def bench_size(n_docs, args):
+    corpus = generate_corpus(n_docs, seed=args.seed)
+    embeddings = FakeEmbeddings(
+        size=args.embedding_dim,
+        latency=args.embed_latency,
+        per_text_latency=args.embed_per_text_latency,
+    )
+    result = {"documents": n_docs}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = os.path.join(tmp, "data")
+        write_corpus(corpus, data_dir)
+        corpus_bytes = sum(len(d["text"].encode("utf-8")) for d in corpus)
+
+        start = time.perf_counter()
+        docs = load_documents(data_dir)
+        elapsed = time.perf_counter() - start
+        result["load"] = {
+            "seconds": elapsed,
+            "docs_per_second": len(docs) / elapsed if elapsed else None,
+            "mb_per_second": corpus_bytes / 1e6 / elapsed if elapsed else None,
+        }
+
+        start = time.perf_counter()
+        chunks = split_documents(docs, args.chunk_size, args.chunk_overlap)
+        elapsed = time.perf_counter() - start
+        result["split"] = {
+            "seconds": elapsed,
+            "chunks": len(chunks),
+            "chunks_per_second": len(chunks) / elapsed if elapsed else None,
+            "mb_per_second": corpus_bytes / 1e6 / elapsed if elapsed else None,
+        }
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        vs = build_vectorstore(
+            docs,
+            persist_dir=os.path.join(tmp, "vectorstore"),
+            embeddings=embeddings,
+            chunk_size=args.chunk_size,
+            chunk_overlap=args.chunk_overlap,
+        )
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["index_build"] = {"seconds": elapsed, "chunks": vs.index.ntotal}
+        result["memory"] = {
+            "index_bytes": vs.index.ntotal * vs.index.d * 4,
+            "docstore_bytes": sum(len(d.page_content.encode("utf-8")) for d in vs.docstore._dict.values()),
+            "build_peak_python_bytes": peak,
+        }
+
+        def make_chain():
+            llm = FakeChatModel(
+                first_token_latency=args.llm_first_token_latency,
+                tokens_per_second=args.llm_tokens_per_second,
+                response_tokens=args.llm_response_tokens,
+            )
+            return build_qa_chain(vs, llm=llm, k=args.k, metrics=LatencyTracker())
+
+        questions = [d["question"] for d in corpus][: args.queries]
+        chain = make_chain()
+        for q in questions:
+            chain.invoke({"query": q})
+        result["query"] = chain.metrics.summary()
+
+        def session(i):
+            session_chain = make_chain()
+            latencies = []
+            for j in range(args.queries_per_session):
+                t0 = time.perf_counter()
+                session_chain.invoke({"query": questions[(i + j) % len(questions)]})
+                latencies.append(time.perf_counter() - t0)
+            return latencies
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+            per_session = list(pool.map(session, range(args.sessions)))
+        elapsed = time.perf_counter() - start
+        all_latencies = [lat for lats in per_session for lat in lats]
+        result["concurrent"] = {
+            "sessions": args.sessions,
+            "queries": len(all_latencies),
+            "seconds": elapsed,
+            "queries_per_second": len(all_latencies) / elapsed if elapsed else None,
+            "latency": _summary(all_latencies),
+        }
+
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="50,200,800", help="Comma separated corpus sizes (documents)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--embedding-dim", type=int, default=256)
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="Seconds per embedding call")
+    parser.add_argument("--embed-per-text-latency", type=float, default=0.0, help="Extra seconds per text embedded")
+    parser.add_argument("--llm-first-token-latency", type=float, default=0.05)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0.0, help="0 streams without throttling")
+    parser.add_argument("--llm-response-tokens", type=int, default=48)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--queries-per-session", type=int, default=10)
+    parser.add_argument("--output", help="Write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "params": {k: v for k, v in vars(args).items() if k != "output"},
+        "results": [bench_size(int(n), args) for n in args.sizes.split(",") if n.strip()],
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+import pytest
+
+from utils import storage
+
+
+@pytest.fixture(autouse=True)
+def storage_dir(tmp_path, monkeypatch):
+    """Keep every store the code under test opens inside the test's temp dir."""
+    monkeypatch.setattr(storage, "STORAGE_DIR", str(tmp_path))
+    return tmp_path
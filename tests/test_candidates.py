@@ -0,0 +1,114 @@
+import pytest
+
+from utils.candidates import CandidateStore
+
+
+def _result(name, score, recommendation="INTERVIEW", **extra):
+    return {"candidate_name": name, "resume_hash": f"hash-{name}", "score": score,
+            "recommendation": recommendation, "priority": "Medium", "categories": {"technical": 7},
+            "analysis": f"{name} analysis", **extra}
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = CandidateStore(path=str(tmp_path / "candidates.db"))
+    yield s
+    s.close()
+
+
+def test_upsert_updates_in_place_and_keeps_stage(store):
+    [ann_id, bob_id] = store.save_screening("req-1", "Backend Engineer", [_result("Ann", 80), _result("Bob", 60)])
+    store.set_stage(ann_id, "interview")
+
+    ids = store.save_screening("req-1", "Backend Engineer", [_result("Ann", 90, skills=["go"])])
+    assert ids == [ann_id]
+    assert store.count("req-1") == 2
+    [ann] = store.query("req-1", search="ann")
+    assert (ann["score"], ann["stage"], ann["skills"]) == (90, "interview", ["go"])
+    assert ann["categories"] == {"technical": 7}
+
+    # The same resume under another requisition is a separate candidate.
+    [other_id] = store.save_screening("req-2", "Data Engineer", [_result("Ann", 70)])
+    assert other_id not in (ann_id, bob_id)
+
+
+def test_set_stage_rejects_unknown_stage(store):
+    [cid] = store.save_screening("req-1", "Backend Engineer", [_result("Ann", 80)])
+    with pytest.raises(ValueError):
+        store.set_stage(cid, "ghosted")
+
+
+def test_query_filters_sorting_and_paging(store):
+    results = [_result(f"C{i:02d}", 50 + i, "INTERVIEW" if i % 2 else "REJECT") for i in range(30)]
+    store.save_screening("req-1", "Backend Engineer", results)
+
+    top = store.query("req-1", limit=5)
+    assert [c["score"] for c in top] == [79, 78, 77, 76, 75]
+    assert [c["candidate_name"] for c in store.query("req-1", sort="name", descending=False, limit=3)] == \
+        ["C00", "C01", "C02"]
+    assert store.query("req-1", limit=5, offset=5)[0]["score"] == 74
+
+    interviews = store.query("req-1", min_score=70, recommendations=["INTERVIEW"], limit=None)
+    assert {c["candidate_name"] for c in interviews} == {"C21", "C23", "C25", "C27", "C29"}
+    assert store.count("req-1", min_score=70, recommendations=["INTERVIEW"]) == 5
+    assert store.query("req-2") == []
+    with pytest.raises(ValueError):
+        store.query(sort="score; DROP TABLE candidates")
+
+
+def test_iter_candidates_and_summary(store):
+    store.save_screening("req-1", "Backend Engineer", [_result(f"C{i}", 60 + i) for i in range(12)])
+    names = [c["candidate_name"] for c in store.iter_candidates(batch=5, requisition="req-1")]
+    assert len(names) == len(set(names)) == 12
+
+    summary = store.summary("req-1", min_score=70)
+    assert summary["total_candidates"] == 12
+    assert summary["above_threshold"] == 2
+    assert summary["average_score"] == pytest.approx(65.5)
+    assert summary["by_stage"] == {"screened": 12}
+    assert store.requisitions()[0] == {"requisition": "req-1", "title": "Backend Engineer",
+                                       "updated_at": store.requisitions()[0]["updated_at"], "candidates": 12}
+
+
+def test_export_rows_have_fixed_columns_and_parquet_schema(store):
+    pq = pytest.importorskip("pyarrow.parquet")
+    from utils.candidates import EXPORT_COLUMNS
+    from utils.export import export_rows
+
+    # Quick Scan rows (no LLM score) rank first; deep-analysis rows with extra keys come later.
+    quick = [_result(f"Q{i}", 90, llm_score=None) for i in range(1100)]
+    deep = [_result(f"D{i}", 50, llm_score=70, categories={"technical": 7, "soft_skills": 5},
+                    matched_skills=["python"]) for i in range(5)]
+    store.save_screening("req-1", "Backend Engineer", quick + deep)
+
+    rows = list(store.iter_export_rows(requisition="req-1"))
+    assert all(list(r) == list(EXPORT_COLUMNS) for r in rows)
+    assert rows[-1]["details"] == {"matched_skills": ["python"]}
+
+    table = pq.read_table(export_rows(iter(rows), "Parquet", columns=EXPORT_COLUMNS))
+    assert table.num_rows == 1105
+    assert str(table.schema.field("llm_score").type) == "int64"
+    assert table.column("llm_score").to_pylist()[-1] == 70
+
+
+@pytest.mark.parametrize("sort", ["score", "name", "recommendation", "updated"])
+@pytest.mark.parametrize("descending", [True, False])
+def test_iter_candidates_follows_the_page_order(store, sort, descending):
+    recs = ["INTERVIEW", "CONSIDER", "REJECT"]
+    store.save_screening("req-1", "Backend Engineer",
+                         [_result(name, 50 + i % 4, recs[i % 3]) for i, name in enumerate(
+                             ["bob", "Ann", "carl", "ann", "Dee", "eve", "Finn", "gus", "Hal", "ivy", "Jo"])])
+    expected = [c["id"] for c in store.query(sort=sort, descending=descending, limit=None)]
+    got = [c["id"] for c in store.iter_candidates(batch=3, sort=sort, descending=descending)]
+    assert got == expected
+
+
+def test_iter_candidates_neither_skips_nor_repeats_during_writes(store):
+    store.save_screening("req-1", "Backend Engineer", [_result(f"C{i:02}", 50 + i) for i in range(10)])
+    seen = []
+    for n, candidate in enumerate(store.iter_candidates(batch=3)):
+        seen.append(candidate["candidate_name"])
+        if n == 4:
+            # A higher score lands before the cursor; offset paging would repeat a row.
+            store.save_screening("req-1", "Backend Engineer", [_result("Top", 99)])
+    assert seen == [f"C{i:02}" for i in range(9, -1, -1)]
@@ -0,0 +1,77 @@
+import pytest
+
+from utils.categorize import EmbeddingClassifier, QueryCategorizer, classify, words
+from utils.fakes import FakeEmbeddings
+
+
+def test_words_lowercase_and_drop_parentheses():
+    assert words("How does my 401(k) MATCH work?") == ["how", "does", "my", "401k", "match", "work"]
+
+
+@pytest.mark.parametrize("query, category", [
+    ("What is the dress code?", "policy"),
+    ("How many vacation days do I get?", "leave"),
+    ("When is open enrollment for dental insurance?", "benefits"),
+    ("How do I report harassment?", "compliance"),
+    ("Where is the cafeteria?", "general"),
+])
+def test_classify_picks_the_weighted_category(query, category):
+    assert classify(query).category == category
+
+
+def test_matches_whole_words_and_plurals_only():
+    assert classify("I am feeling healthy").category == "general"
+    result = classify("Which holidays and benefits apply?")
+    assert result.matches == ("holiday", "benefit")
+    assert result.scores == {"leave": 1.5, "benefits": 2.0}
+    assert result.category == "benefits"
+
+
+def test_phrases_and_urgency():
+    result = classify("Urgent: need time off immediately")
+    assert result.urgent
+    assert result.category == "leave"
+    assert "time off" in result.matches
+    assert not classify("time is off").urgent
+    assert classify("time is off").category == "general"
+
+
+def test_ties_follow_category_order():
+    # "leave" and "policy" both score 2.0; policy comes first in CATEGORY_ORDER.
+    assert classify("leave policy").category == "policy"
+
+
+def test_terms_may_not_belong_to_two_categories():
+    with pytest.raises(ValueError):
+        QueryCategorizer({"a": {"shared": 1.0}, "b": {"shared": 1.0}})
+
+
+def test_classifier_only_runs_without_keyword_hits():
+    calls = []
+
+    def classifier(query):
+        calls.append(query)
+        return "benefits"
+
+    categorizer = QueryCategorizer(classifier=classifier)
+    assert categorizer.classify("sick day").category == "leave"
+    assert categorizer.classify("where do I park").category == "benefits"
+    assert calls == ["where do I park"]
+
+
+def test_failing_classifier_falls_back_to_default():
+    def classifier(query):
+        raise RuntimeError("boom")
+
+    assert QueryCategorizer(classifier=classifier).classify("parking").category == "general"
+
+
+def test_embedding_classifier_uses_nearest_centroid():
+    embed = EmbeddingClassifier(FakeEmbeddings(), {
+        "benefits": ["gym membership reimbursement", "commuter pass reimbursement"],
+        "policy": ["badge access rules for the office", "office visitor rules"],
+    }, min_similarity=0.2)
+    assert embed("gym reimbursement") == "benefits"
+    assert embed("visitor badge rules") == "policy"
+    assert embed("zzz qqq") is None
+    assert QueryCategorizer(classifier=embed).classify("gym reimbursement").category == "benefits"
@@ -0,0 +1,52 @@
+from utils.conversation import QueryCondenser, is_follow_up, trim_history
+from utils.fakes import FakeChatModel
+from utils.history import ChatTurn
+
+HISTORY = [("How many vacation days do Berlin employees get?", "Berlin employees get 28 days.")]
+
+
+def test_trim_history_keeps_newest_turns_within_budget():
+    turns = [ChatTurn(f"question {i}", "answer " * 200, 0.0) for i in range(10)]
+    pairs = trim_history(turns, max_tokens=100, max_answer_chars=100)
+    assert pairs and len(pairs) < 10
+    assert pairs[-1][0] == "question 9"
+    assert all(a.endswith(" …") and len(a) <= 102 for _, a in pairs)
+    assert trim_history(turns, max_tokens=1) == []
+
+
+def test_is_follow_up():
+    assert is_follow_up("What about contractors?")
+    assert is_follow_up("Is that paid?")
+    assert is_follow_up("And in Paris")
+    assert not is_follow_up("How many sick leave days do employees in the Tokyo office receive?")
+
+
+def test_heuristic_carries_terms_from_the_previous_question():
+    condenser = QueryCondenser()
+    condensed = condenser.condense("What about contractors?", HISTORY)
+    assert condensed == "What about contractors? (regarding: vacation days berlin employees)"
+    standalone = "How many sick leave days do employees in the Tokyo office receive?"
+    assert condenser.condense(standalone, HISTORY) == standalone
+    assert condenser.condense("What about contractors?", []) == "What about contractors?"
+
+
+def test_condensed_queries_are_cached():
+    condenser = QueryCondenser(cache_size=1)
+    condenser.condense("What about contractors?", HISTORY)
+    condenser.condense("What about contractors?", HISTORY)
+    assert (condenser.hits, condenser.misses) == (1, 1)
+    condenser.condense("And interns?", HISTORY)
+    condenser.condense("What about contractors?", HISTORY)
+    assert condenser.misses == 3
+
+
+def test_llm_mode_rewrites_and_falls_back():
+    llm = FakeChatModel(responder=lambda prompt: '"How many vacation days do Berlin contractors get?"\nextra')
+    assert QueryCondenser(llm, mode="llm").condense("What about contractors?", HISTORY) == \
+        "How many vacation days do Berlin contractors get?"
+
+    def fail(prompt):
+        raise RuntimeError("quota")
+
+    fallback = QueryCondenser(FakeChatModel(responder=fail), mode="llm")
+    assert fallback.condense("What about contractors?", HISTORY).startswith("What about contractors? (regarding:")
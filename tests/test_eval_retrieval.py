@@ -0,0 +1,38 @@
+import json
+
+from langchain_core.documents import Document
+
+from benchmarks import eval_retrieval
+from benchmarks.corpus import generate_corpus, write_corpus
+from utils.fakes import FakeEmbeddings
+from utils.loader import load_documents
+
+
+def test_ranked_sources_are_distinct_in_order():
+    docs = [Document(page_content=str(i), metadata={"source_file": s}) for i, s in enumerate("abacb")]
+    assert eval_retrieval.ranked_sources(docs) == ["a", "b", "c"]
+
+
+def test_evaluate_reports_recall_mrr_and_latency(tmp_path):
+    corpus = generate_corpus(12, seed=3)
+    write_corpus(corpus, str(tmp_path))
+    pairs = [{"question": d["question"], "source_file": d["source_file"]} for d in corpus]
+    result = eval_retrieval.evaluate(load_documents(str(tmp_path)), pairs, FakeEmbeddings(size=512),
+                                     chunk_size=500, chunk_overlap=50, k=4)
+
+    assert (result["chunk_size"], result["k"]) == (500, 4)
+    assert result["chunks"] >= 12
+    assert 0.5 <= result["recall_at_k"] <= 1.0
+    assert 0.0 < result["mrr"] <= result["recall_at_k"]
+    assert result["latency"]["p50"] <= result["latency"]["p99"]
+    assert len(result["misses"]) == round((1 - result["recall_at_k"]) * 12)
+
+
+def test_main_fails_below_min_recall(tmp_path):
+    output = tmp_path / "eval.json"
+    args = ["--docs", "8", "--chunk-sizes", "400,800", "--ks", "2", "--output", str(output)]
+    assert eval_retrieval.main(args) == 0
+    report = json.loads(output.read_text())
+    assert (report["documents"], report["questions"]) == (8, 8)
+    assert [r["chunk_size"] for r in report["results"]] == [400, 800]
+    assert eval_retrieval.main(args + ["--min-recall", "1.01"]) == 1
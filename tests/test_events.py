@@ -0,0 +1,102 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.events import EventStore, bucket_start
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = EventStore(path=str(tmp_path / "events.db"), flush_interval=0.01)
+    yield s
+    s.close()
+
+
+def test_query_filters_and_payload(store):
+    store.record("hr_query", value=0.4, session_id="a", ts=100.0, category="policy")
+    store.record("hr_query", value=0.9, session_id="b", ts=200.0, category="benefits")
+    store.record("feedback", value=1.0, session_id="a", ts=150.0)
+    store.flush()
+
+    assert [e["ts"] for e in store.query("hr_query")] == [100.0, 200.0]
+    assert store.query("hr_query", newest_first=True, limit=1)[0]["category"] == "benefits"
+    assert [e["kind"] for e in store.query(session_id="a")] == ["hr_query", "feedback"]
+    assert [e["ts"] for e in store.query(start=120.0, end=200.0)] == [150.0]
+    assert store.count("hr_query") == 2
+    assert store.count("hr_query", start=150.0) == 1
+
+
+def test_version_moves_on_write(store):
+    before = store.version
+    store.record("notification")
+    store.flush()
+    assert store.version > before
+
+
+def test_events_survive_reopen(tmp_path):
+    path = str(tmp_path / "events.db")
+    first = EventStore(path=path, flush_interval=0.01)
+    first.record("screening", value=7.5, candidate="Ada")
+    first.close()
+
+    second = EventStore(path=path, flush_interval=0.01)
+    [event] = second.query("screening")
+    assert (event["value"], event["candidate"]) == (7.5, "Ada")
+    second.close()
+
+
+def _local(day_offset, hour):
+    midnight = datetime.combine(datetime.now().date(), datetime.min.time())
+    return (midnight + timedelta(days=day_offset, hours=hour)).timestamp()
+
+
+def test_bucket_start_is_local_midnight():
+    ts = _local(0, 15)
+    assert bucket_start(ts, 86400) == _local(0, 0)
+    assert bucket_start(ts + 59, 60) == ts
+
+
+def test_daily_rollups(store):
+    for ts, value in ((_local(-1, 9), 1.0), (_local(-1, 17), 3.0), (_local(0, 10), 0.5)):
+        store.record("hr_query", value=value, ts=ts, category="policy")
+    store.record("feedback", value=1.0, ts=_local(0, 11))
+    store.flush()
+
+    series = store.series("hr_query", _local(-1, 0))
+    assert [r["bucket_start"] for r in series] == [_local(-1, 0), _local(0, 0)]
+    yesterday, today = series
+    assert (yesterday["count"], yesterday["sum"], yesterday["avg"]) == (2, 4.0, 2.0)
+    assert (yesterday["min"], yesterday["max"]) == (1.0, 3.0)
+    assert today["count"] == 1
+    assert store.series("hr_query", _local(0, 0)) == [today]
+    assert store.count("hr_query") == 3
+    assert store.query("hr_query", newest_first=True, limit=1)[0]["category"] == "policy"
+
+
+def test_distribution_and_percentiles(store):
+    now = time.time()
+    for score in (6.0, 7.0, 7.0, 8.5):
+        store.record("screening", value=score, ts=now)
+    for latency in [0.1] * 90 + [2.0] * 10:
+        store.record("hr_query", value=latency, ts=now)
+    store.flush()
+
+    assert store.distribution("screening", now - 3600) == {6.0: 1, 7.0: 2, 8.5: 1}
+    p = store.percentiles("hr_query", now - 3600)
+    assert p["p50"] == pytest.approx(0.1, rel=0.15)
+    assert p["p99"] == pytest.approx(2.0, rel=0.15)
+    assert store.percentiles("interview_eval", now - 3600) == {"p50": None, "p95": None, "p99": None}
+
+
+def test_rebuild_matches_incremental_rollups(store):
+    for i in range(50):
+        store.record("interview_eval", value=5 + i % 5, ts=_local(-(i % 3), 12))
+    store.flush()
+    incremental = store.series("interview_eval", _local(-3, 0))
+    distribution = store.distribution("interview_eval", _local(-3, 0))
+
+    store.rebuild_rollups()
+    assert store.series("interview_eval", _local(-3, 0)) == incremental
+    assert store.distribution("interview_eval", _local(-3, 0)) == distribution
+    assert sum(r["count"] for r in incremental) == 50
@@ -0,0 +1,102 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from utils.export import (EXPORT_FORMATS, deferred_export, export_filename, export_rows, flatten, write_csv,
+                          write_parquet)
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+COLUMNS = {"name": str, "llm_score": int, "weight": float, "categories": str, "details": str}
+
+
+def _rows(n, llm_from=None):
+    for i in range(n):
+        yield {
+            "name": f"c{i}",
+            "llm_score": i if llm_from is not None and i >= llm_from else None,
+            "weight": i / 2,
+            "categories": {"technical": i % 10, **({"extra": 1} if i % 3 == 0 else {})},
+            "details": {"matched_skills": ["python"], **({"late_key": i} if i > 5 else {})},
+        }
+
+
+def _read_parquet(buf):
+    return pq.read_table(buf).to_pylist()
+
+
+def test_flatten_nested_rows():
+    row = {"a": {"b": 1, "c": {"d": [1, 2]}}, "when": datetime(2026, 1, 2, 3, 4)}
+    assert flatten(row) == {"a.b": 1, "a.c.d": "[1, 2]", "when": "2026-01-02T03:04:00"}
+
+
+def test_csv_with_columns_keeps_nested_values_as_json():
+    buf = io.BytesIO()
+    assert write_csv(_rows(8), buf, list(COLUMNS)) == 8
+    rows = list(csv.DictReader(io.StringIO(buf.getvalue().decode("utf-8"))))
+    assert list(rows[0]) == list(COLUMNS)
+    assert rows[0]["llm_score"] == ""
+    assert json.loads(rows[7]["details"]) == {"matched_skills": ["python"], "late_key": 7}
+
+
+def test_csv_without_columns_flattens_and_uses_the_first_row():
+    buf = io.BytesIO()
+    write_csv([{"a": 1, "b": {"c": 2}}, {"a": 3, "z": 9}], buf)
+    assert buf.getvalue().decode("utf-8").splitlines() == ["a,b.c", "1,2", "3,"]
+
+
+def test_parquet_schema_fixed_from_columns_across_batches():
+    buf = io.BytesIO()
+    # llm_score is empty for the whole first batch and filled later; keys vary between rows.
+    assert write_parquet(_rows(10, llm_from=6), buf, COLUMNS, batch_size=4) == 10
+    buf.seek(0)
+    table = pq.read_table(buf)
+    assert str(table.schema.field("llm_score").type) == "int64"
+    rows = table.to_pylist()
+    assert [r["llm_score"] for r in rows] == [None] * 6 + [6, 7, 8, 9]
+    assert json.loads(rows[9]["details"])["late_key"] == 9
+    assert json.loads(rows[3]["categories"]) == {"technical": 3, "extra": 1}
+
+
+def test_parquet_without_columns_infers_a_lenient_schema():
+    rows = [{"a": 1, "b": None, "c": 1}, {"a": 2, "b": None, "c": 2.5}] + [{"a": 3, "b": 5, "c": 1}]
+    buf = io.BytesIO()
+    write_parquet(rows, buf, batch_size=2)
+    buf.seek(0)
+    assert _read_parquet(buf) == [{"a": 1, "b": None, "c": 1.0}, {"a": 2, "b": None, "c": 2.5},
+                                  {"a": 3, "b": "5", "c": 1.0}]
+
+
+@pytest.mark.parametrize("fmt", list(EXPORT_FORMATS))
+def test_export_rows_every_format(fmt):
+    buf = export_rows(_rows(3), fmt, header={"summary": {"total": 3}}, rows_key="candidates", columns=COLUMNS)
+    assert buf.tell() == 0
+    data = buf.getvalue()
+    if fmt == "JSON":
+        doc = json.loads(data)
+        assert doc["summary"] == {"total": 3} and len(doc["candidates"]) == 3
+    elif fmt == "JSONL":
+        assert [json.loads(line)["name"] for line in data.decode("utf-8").splitlines()] == ["c0", "c1", "c2"]
+    elif fmt == "CSV":
+        assert data.decode("utf-8").splitlines()[0] == ",".join(COLUMNS)
+    else:
+        assert [r["name"] for r in _read_parquet(buf)] == ["c0", "c1", "c2"]
+    assert export_filename("report", fmt).endswith("." + EXPORT_FORMATS[fmt][0])
+
+
+def test_deferred_export_fetches_rows_only_when_called():
+    calls = []
+
+    def rows():
+        calls.append(1)
+        return _rows(2)
+
+    build = deferred_export(rows, "JSONL")
+    assert calls == []
+    assert len(build().getvalue().splitlines()) == 2
+    assert calls == [1]
+    with pytest.raises(ValueError):
+        export_rows([], "XML")
@@ -0,0 +1,75 @@
+import json
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks import run_benchmarks
+from benchmarks.corpus import generate_corpus, write_corpus
+from utils.fakes import FakeChatModel, FakeContextCache, FakeEmbeddings
+
+
+def _dot(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+def test_fake_embeddings_are_deterministic_and_topical():
+    embeddings = FakeEmbeddings(size=128)
+    vacation, sick, again = embeddings.embed_documents(
+        ["Paid vacation days per year", "Sick leave certificate rules", "Paid vacation days per year"])
+    query = embeddings.embed_query("How many vacation days?")
+
+    assert vacation == again
+    assert len(query) == 128
+    assert abs(_dot(vacation, vacation) - 1.0) < 1e-9
+    assert _dot(query, vacation) > _dot(query, sick)
+
+
+def test_fake_chat_model_is_deterministic_and_reports_usage():
+    llm = FakeChatModel(response_tokens=5)
+    first = llm.invoke([HumanMessage(content="vacation policy for the berlin office")])
+    second = llm.invoke([HumanMessage(content="vacation policy for the berlin office")])
+    assert first.content == second.content
+    assert len(first.content.split()) == 5
+    assert first.usage_metadata["input_tokens"] == 6
+
+    streamed = list(llm.stream([HumanMessage(content="vacation policy for the berlin office")]))
+    assert "".join(chunk.content for chunk in streamed) == first.content
+    merged = streamed[0]
+    for chunk in streamed[1:]:
+        merged += chunk
+    assert merged.usage_metadata["output_tokens"] == 5
+
+
+def test_fake_chat_model_custom_responder():
+    llm = FakeChatModel(responder=lambda prompt: f"echo: {prompt}")
+    assert llm.invoke([HumanMessage(content="hi")]).content == "echo: hi"
+
+
+def test_fake_chat_model_reads_cached_content():
+    cache = FakeContextCache()
+    name = cache.create("fake-chat", "shared policy text ", ttl=60)
+    llm = FakeChatModel(responder=lambda prompt: prompt, context_cache=cache)
+    reply = llm.invoke([HumanMessage(content="question")], cached_content=name)
+    assert reply.content == "shared policy text question"
+    assert reply.usage_metadata["input_token_details"] == {"cache_read": 3}
+
+
+def test_generated_corpus_has_one_source_per_question(tmp_path):
+    docs = generate_corpus(30, seed=7)
+    assert docs == generate_corpus(30, seed=7)
+    assert len({d["source_file"] for d in docs}) == 30
+    for doc in docs:
+        office = doc["text"].splitlines()[0].split()[1]
+        assert office in doc["question"]
+        assert doc["source_file"].endswith(f"_{office.lower()}.md")
+
+    write_corpus(docs, str(tmp_path / "data"))
+    assert sorted(p.name for p in (tmp_path / "data").iterdir()) == sorted(d["source_file"] for d in docs)
+
+
+def test_benchmark_report_runs_offline(tmp_path):
+    output = tmp_path / "bench.json"
+    run_benchmarks.main(["--sizes", "8", "--queries", "3", "--sessions", "2", "--queries-per-session", "2",
+                         "--llm-first-token-latency", "0", "--output", str(output)])
+    [result] = json.loads(output.read_text())["results"]
+    assert result["documents"] == 8
+    assert {"load", "split", "index_build", "memory", "query", "concurrent"} <= set(result)
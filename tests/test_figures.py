@@ -0,0 +1,44 @@
+from utils.figures import VersionedCache, session_figures
+
+
+def _builder(calls, value):
+    def build():
+        calls.append(value)
+        return value
+    return build
+
+
+def test_rebuilds_only_when_the_version_moves():
+    cache, calls = VersionedCache(), []
+    assert cache.get("chart", 1, _builder(calls, "a")) == "a"
+    assert cache.get("chart", 1, _builder(calls, "b")) == "a"
+    assert cache.get("chart", 2, _builder(calls, "c")) == "c"
+    assert calls == ["a", "c"]
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache, calls = VersionedCache(max_entries=2), []
+    cache.get("a", 1, _builder(calls, "a"))
+    cache.get("b", 1, _builder(calls, "b"))
+    cache.get("a", 1, _builder(calls, "a"))
+    cache.get("c", 1, _builder(calls, "c"))
+    cache.get("b", 1, _builder(calls, "b"))
+    assert calls == ["a", "b", "c", "b"]
+
+
+def test_bucket_change_rebuilds_unchanged_data():
+    today = ["2026-10-19"]
+    cache, calls = VersionedCache(bucket=lambda: today[0]), []
+    cache.get("trend", 7, _builder(calls, "monday"))
+    cache.get("trend", 7, _builder(calls, "monday"))
+    today[0] = "2026-10-20"
+    assert cache.get("trend", 7, _builder(calls, "tuesday")) == "tuesday"
+    assert calls == ["monday", "tuesday"]
+
+
+def test_session_figures_live_in_session_state():
+    state = {}
+    cache = session_figures(state)
+    assert session_figures(state) is cache is state["figure_cache"]
+    assert cache.max_entries == 16
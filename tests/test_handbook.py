@@ -0,0 +1,114 @@
+import pytest
+from langchain_core.documents import Document
+
+from utils.fakes import FakeEmbeddings
+from utils.handbook import HandbookLink, HandbookLinks, embed_queries, index_version, search_batch
+from utils.onboarding import OnboardingPlans
+from utils.rag import build_vectorstore, load_vectorstore
+from utils.storage import ScoreCache, storage_path
+
+HANDBOOK = [
+    Document(page_content="Submit your I-9 employment verification documents and W-4 tax forms in week one.",
+             metadata={"source_file": "handbook.pdf", "page": 2}),
+    Document(page_content="Health, dental and vision insurance enrollment closes 30 days after your start date.",
+             metadata={"source_file": "benefits.pdf", "page": 0}),
+    Document(page_content="IT will issue your laptop; set up email, VPN and two-factor authentication.",
+             metadata={"source": "/docs/it-setup.txt"}),
+]
+
+
+class CountingEmbeddings(FakeEmbeddings):
+    def __init__(self):
+        super().__init__()
+        self.queries = 0
+
+    def embed_query(self, text):
+        self.queries += 1
+        return super().embed_query(text)
+
+
+@pytest.fixture(scope="module")
+def plans():
+    return OnboardingPlans()
+
+
+@pytest.fixture
+def cache():
+    return ScoreCache(storage_path("onboarding_cache.db"), "handbook_links", ("index_version", "model"))
+
+
+def _index(docs=HANDBOOK, persist_dir=None):
+    return build_vectorstore(docs, persist_dir=persist_dir, embeddings=CountingEmbeddings())
+
+
+def test_index_version_survives_reload_but_not_rebuild(tmp_path):
+    vectorstore = _index(persist_dir=str(tmp_path / "vs"))
+    reloaded = load_vectorstore(str(tmp_path / "vs"), embeddings=FakeEmbeddings())
+    assert index_version(reloaded) == index_version(vectorstore)
+    assert index_version(_index(HANDBOOK[:2])) != index_version(vectorstore)
+
+
+def test_embed_queries_uses_query_embeddings():
+    embeddings = CountingEmbeddings()
+    assert embed_queries(embeddings, ["a", "b"]) == [embeddings.embed_query("a"), embeddings.embed_query("b")]
+    assert embeddings.queries == 4
+
+
+def test_search_batch_returns_top_chunks_per_text():
+    results = search_batch(_index(), ["dental insurance enrollment", "laptop VPN setup"], k=2)
+    assert [len(r) for r in results] == [2, 2]
+    assert results[0][0]["source"] == "benefits.pdf"
+    assert results[1][0]["source"] == "it-setup.txt"
+    assert results[1][0]["page"] is None
+    assert search_batch(_index(), []) == []
+
+
+def test_links_label_pages_from_one():
+    assert HandbookLink("handbook.pdf", 2, "", 0.5).label == "handbook.pdf (p. 3)"
+    assert HandbookLink("notes.txt", None, "", 0.5).label == "notes.txt"
+
+
+def test_mapping_is_computed_once_per_index(plans, cache):
+    vectorstore = _index()
+    links = HandbookLinks(plans, cache=cache)
+    covered = links.precompute(vectorstore)
+    assert covered == len(links.plan_texts())
+    embedded = vectorstore.embeddings.queries
+    assert embedded == covered
+
+    plan = plans.get("Software Engineer", "Engineering", "documentation")
+    stage_links, task_links = links.for_stage(vectorstore, plan)
+    assert len(stage_links) == 3
+    assert set(task_links) == set(plan.tasks)
+    assert links.precompute(vectorstore) == covered
+    assert vectorstore.embeddings.queries == embedded
+
+    # A new process loads the mapping from disk instead of embedding again.
+    assert HandbookLinks(plans, cache=cache).for_stage(vectorstore, plan) == (stage_links, task_links)
+    assert vectorstore.embeddings.queries == embedded
+
+
+def test_indexes_keep_separate_mappings(plans, cache):
+    links = HandbookLinks(plans, cache=cache)
+    full, partial = _index(), _index(HANDBOOK[:1])
+    plan = plans.get("Software Engineer", "Engineering", "setup")
+    full_links = links.for_stage(full, plan)[0]
+    partial_links = links.for_stage(partial, plan)[0]
+    assert len(full_links) == 3
+    assert [link.source for link in partial_links] == ["handbook.pdf"]
+    assert links.for_stage(full, plan)[0] == full_links
+    assert len(links._mappings) == 2
+
+
+def test_new_tasks_are_matched_on_first_use(plans, cache):
+    vectorstore = _index()
+    links = HandbookLinks(plans, cache=cache)
+    links.precompute(vectorstore)
+    embedded = vectorstore.embeddings.queries
+    tailored = plans.with_overrides("Software Engineer", "Engineering",
+                                    {"setup": {"tasks": ["Enable two-factor authentication on the VPN"]}})["setup"]
+    task_links = links.for_stage(vectorstore, tailored)[1]
+    assert task_links[tailored.tasks[0]][0].source == "it-setup.txt"
+    assert vectorstore.embeddings.queries == embedded + 1
+    links.for_stage(vectorstore, tailored)
+    assert vectorstore.embeddings.queries == embedded + 1
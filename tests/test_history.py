@@ -0,0 +1,70 @@
+import sqlite3
+
+import pytest
+
+from utils.history import ChatHistory
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "chat.db")
+
+
+def _fill(history, n):
+    for i in range(n):
+        history.append(f"q{i}", f"answer {i}", agent="HR Assistant")
+
+
+def _sessions(path):
+    with sqlite3.connect(path) as conn:
+        return {sid for (sid,) in conn.execute("SELECT DISTINCT session_id FROM chat_turns")}
+
+
+def test_window_spills_to_disk_and_pages_read_back(path):
+    history = ChatHistory("s1", window=3, path=path)
+    _fill(history, 10)
+
+    assert len(history) == 10
+    assert len(history._recent) == 3
+    assert history.last().question == "q9"
+    assert [t.question for t in history] == [f"q{i}" for i in range(10)]
+    assert [t.question for t in history.slice(1, 5)] == ["q1", "q2", "q3", "q4"]
+    assert [t.question for t in history.slice(5, 9)] == ["q5", "q6", "q7", "q8"]
+    assert [t.question for t in history.recent(4)] == ["q6", "q7", "q8", "q9"]
+    assert [t.question for t in history.page(2, 4)] == ["q0", "q1"]
+    assert history.page_count(4) == 3
+    assert history.avg_question_length() == 2.0
+
+
+def test_clear_drops_spilled_turns(path):
+    history = ChatHistory("s1", window=2, path=path)
+    _fill(history, 5)
+    version = history.version
+    history.clear()
+    assert not history and list(history) == []
+    assert history.version > version
+    assert _sessions(path) == set()
+
+
+def test_idle_sessions_are_pruned_when_another_session_opens(path, monkeypatch):
+    stale = ChatHistory("stale", window=1, path=path)
+    _fill(stale, 3)
+    fresh = ChatHistory("fresh", window=1, path=path)
+    _fill(fresh, 3)
+    assert _sessions(path) == {"stale", "fresh"}
+
+    # Every spilled turn is older than a zero-second retention; only the opening session's rows survive.
+    opener = ChatHistory("fresh", window=1, path=path, retention=0)
+    _fill(opener, 2)
+    assert _sessions(path) == {"fresh"}
+
+    ChatHistory("other", window=1, path=path, retention=3600)._db()
+    assert _sessions(path) == {"fresh"}
+
+
+def test_nbytes_only_counts_the_window(path):
+    small = ChatHistory("a", window=2, path=path)
+    large = ChatHistory("b", window=2, path=path)
+    _fill(small, 2)
+    _fill(large, 50)
+    assert large.nbytes() == pytest.approx(small.nbytes(), rel=0.2)
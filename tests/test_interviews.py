@@ -0,0 +1,135 @@
+import json
+import threading
+
+import pytest
+
+from utils.interviews import (InterviewAggregate, SCORE_DIMENSIONS, TranscriptItem, evaluate_response,
+                              evaluate_transcript, final_recommendation, parse_evaluation,
+                              parse_transcript_evaluation)
+from utils.storage import ScoreCache
+
+
+def _answer(score, index=None, **extra):
+    data = {"scores": {d: score for d in SCORE_DIMENSIONS}, "summary": f"scored {score}", **extra}
+    if index is not None:
+        data["index"] = index
+    return data
+
+
+class StubChain:
+    """Stands in for SimpleQAChain: replies come from `reply(template, values)`."""
+
+    def __init__(self, reply, model="stub-model"):
+        self.reply = reply
+        self.llm = type("LLM", (), {"model": model})()
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def complete(self, template, **values):
+        with self._lock:
+            self.calls.append(template)
+        return {"result": self.reply(template, values)}
+
+
+def _failing(template, values):
+    raise RuntimeError("503")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ScoreCache(path=str(tmp_path / "interviews.db"), table="interview_evaluations",
+                      key_columns=("question_hash", "response_hash", "model"))
+
+
+def _items(n):
+    return [TranscriptItem(f"How would you design system {i}?", f"I would start with requirements for {i}")
+            for i in range(n)]
+
+
+def test_aggregate_running_totals():
+    aggregate = InterviewAggregate()
+    assert aggregate.average == 0.0
+    for score, dims in ((8.0, {"content": 9, "communication": 7}), (6.0, {"content": 5, "unknown": 1})):
+        aggregate.add({"overall_score": score, "detailed_scores": dims})
+
+    assert aggregate.count == 2
+    assert aggregate.average == 7.0
+    assert (aggregate.best, aggregate.worst) == (8.0, 6.0)
+    assert aggregate.dimension_averages()["content"] == 7.0
+    assert aggregate.dimension_averages()["cultural_fit"] == 0.0
+    assert aggregate.recommendation == final_recommendation(7.0) == "HIRE - Good candidate with potential"
+
+
+def test_parse_evaluation_clamps_and_rejects_missing_dimensions():
+    parsed = parse_evaluation("```json\n" + json.dumps(_answer(12, strengths="Clear")) + "\n```")
+    assert parsed["detailed_scores"] == {d: 10 for d in SCORE_DIMENSIONS}
+    assert parsed["overall_score"] == 10.0
+    assert parsed["strengths"] == ["Clear"]
+    assert parse_evaluation('{"scores": {"content": 5}}') is None
+    assert parse_evaluation("not json") is None
+
+
+def test_parse_transcript_matches_by_index():
+    reply = json.dumps({"answers": [_answer(7, index=2), "junk", _answer(5, index=1), _answer(9, index=9)]})
+    first, second, third = parse_transcript_evaluation(reply, 3)
+    assert first["overall_score"] == 5.0
+    assert second["overall_score"] == 7.0
+    assert third is None
+
+
+def test_transcript_is_scored_in_batches_and_cached(cache):
+    def reply(template, values):
+        count = values["transcript"].count("ANSWER ")
+        return json.dumps({"answers": [_answer(6 + i % 3, index=i + 1) for i in range(count)]})
+
+    chain = StubChain(reply)
+    items = _items(5)
+    evaluations = evaluate_transcript(chain, items, batch_size=2, cache=cache)
+    assert chain.calls == ["interview_transcript"] * 3
+    assert [e["overall_score"] for e in evaluations] == [6.0, 7.0, 6.0, 7.0, 6.0]
+    assert all(e["question"] == item.question for e, item in zip(evaluations, items))
+
+    again = evaluate_transcript(chain, items, batch_size=2, cache=cache)
+    assert len(chain.calls) == 3
+    assert all(e["cached"] for e in again)
+
+
+def test_failed_batches_fall_back_per_answer(cache):
+    items = _items(3)
+    assert evaluate_transcript(StubChain(_failing), items, batch_size=2, cache=cache) == [None, None, None]
+
+    # Answers the batch left unscored go through evaluate_response, which falls back to heuristics.
+    evaluation = evaluate_response(StubChain(_failing), items[0].question, items[0].response, cache=cache)
+    assert evaluation["scored_by"] == "heuristic"
+    assert 1 <= evaluation["overall_score"] <= 10
+
+
+def test_partial_transcript_reply_leaves_gaps(cache):
+    chain = StubChain(lambda template, values: json.dumps({"answers": [_answer(8, index=2)]}))
+    evaluations = evaluate_transcript(chain, _items(2), cache=cache)
+    assert evaluations[0] is None
+    assert evaluations[1]["overall_score"] == 8.0
+
+
+def test_evaluate_response_caches_llm_scores(cache):
+    chain = StubChain(lambda template, values: json.dumps(_answer(7)))
+    first = evaluate_response(chain, "Tell me about a conflict?", "I listened first.", "behavioral", cache=cache)
+    second = evaluate_response(chain, "Tell me about a conflict?", "I  listened first.", "behavioral", cache=cache)
+    assert chain.calls == ["interview_evaluation"]
+    assert (first["scored_by"], first["cached"]) == ("llm", False)
+    assert second["cached"] and second["overall_score"] == first["overall_score"] == 7.0
+
+    # Unparseable replies are scored heuristically and not cached.
+    bad = StubChain(lambda template, values: "I think it was fine")
+    evaluate_response(bad, "Why us?", "Because.", cache=cache)
+    evaluate_response(bad, "Why us?", "Because.", cache=cache)
+    assert len(bad.calls) == 2
+
+
+def test_without_a_chain_answers_are_scored_heuristically(cache):
+    items = _items(2)
+    assert evaluate_transcript(None, items, cache=cache) == [None, None]
+    evaluation = evaluate_response(None, items[0].question, items[0].response, "behavioral", cache=cache)
+    assert (evaluation["scored_by"], evaluation["cached"]) == ("heuristic", False)
+    assert evaluation["question_type"] == "behavioral"
+    assert 1 <= evaluation["overall_score"] <= 10
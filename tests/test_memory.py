@@ -0,0 +1,98 @@
+import tracemalloc
+
+import pytest
+
+from utils import memory
+
+
+@pytest.fixture(autouse=True)
+def clean_state(monkeypatch):
+    monkeypatch.setattr(memory, "_sessions", {})
+    yield
+    if memory.tracing_active():
+        memory.stop_tracing()
+
+
+class Store:
+    """Minimal FAISS-like vectorstore: an index and a docstore."""
+
+    class Index:
+        d, ntotal, code_size = 8, 3, 32
+
+    class Doc:
+        def __init__(self, text):
+            self.page_content = text
+            self.metadata = {"source": "handbook.pdf"}
+
+    def __init__(self):
+        self.index = self.Index()
+        self.docstore = type("Docstore", (), {})()
+        self.docstore._dict = {str(i): self.Doc("x" * 100) for i in range(3)}
+
+
+def test_deep_sizeof_counts_nested_containers_once():
+    shared = ["x" * 1000]
+    assert memory.deep_sizeof({"a": shared, "b": shared}) < memory.deep_sizeof({"a": shared, "b": ["x" * 1000]})
+    assert memory.deep_sizeof([1, [2, [3]]], max_depth=0) < memory.deep_sizeof([1, [2, [3]]])
+
+
+def test_session_footprint_breakdown():
+    store = Store()
+    footprint = memory.session_footprint({"vectorstore": store, "qa_chain": None, "chat_history": [("q", "a")],
+                                          "notes": "y" * 500})
+    assert footprint["index_bytes"] == 3 * 32
+    assert footprint["docstore_bytes"] >= 300
+    assert footprint["history_bytes"] > 0
+    assert footprint["cached_objects_bytes"] >= 500
+    assert footprint["total_bytes"] == sum(footprint[k] for k in memory.FOOTPRINT_KEYS[:-1])
+
+
+def test_docstore_size_is_cached_per_index():
+    store = Store()
+    first = memory.docstore_bytes(store)
+    store.docstore._dict["0"].page_content = "y" * 10_000
+    assert memory.docstore_bytes(store) == first
+    store.docstore._dict["3"] = Store.Doc("z")
+    assert memory.docstore_bytes(store) > first
+
+
+def test_sample_session_reuses_recent_samples(monkeypatch):
+    state = {"notes": "y" * 100}
+    first = memory.sample_session("s1", state, user="ada")
+    state["notes"] = "y" * 10_000
+    assert memory.sample_session("s1", state, agent="HR Assistant") == first
+
+    forced = memory.sample_session("s1", state, force=True)
+    assert forced["total_bytes"] > first["total_bytes"]
+    [row] = memory.sessions_report()
+    assert (row["user"], row["agent"]) == ("ada", "HR Assistant")
+
+    monkeypatch.setattr(memory, "FOOTPRINT_INTERVAL_SECONDS", 0)
+    state["notes"] = ""
+    assert memory.sample_session("s1", state)["total_bytes"] < forced["total_bytes"]
+
+
+def test_tracing_runs_only_between_start_and_stop():
+    if tracemalloc.is_tracing():
+        pytest.skip("tracemalloc already enabled for this interpreter")
+    assert memory.take_snapshot() is None
+    memory.start_tracing()
+    assert memory.tracing_active() and tracemalloc.is_tracing()
+    assert tracemalloc.get_traceback_limit() == 1
+
+    held = [bytearray(1024) for _ in range(200)]
+    snapshot = memory.take_snapshot()
+    assert snapshot["top"] and not snapshot["stopped"]
+    assert any(row["size_diff_bytes"] > 100_000 for row in snapshot["growth"])
+
+    final = memory.stop_tracing()
+    assert final["stopped"] and final["growth"]
+    assert not memory.tracing_active() and not tracemalloc.is_tracing()
+    assert memory._baseline is None
+    del held
+
+
+def test_format_bytes():
+    assert memory.format_bytes(None) == "—"
+    assert memory.format_bytes(512) == "512 B"
+    assert memory.format_bytes(3 * 1024 * 1024) == "3.0 MB"
@@ -0,0 +1,28 @@
+import pytest
+
+from utils.metrics import LatencyTracker, percentile
+
+
+def test_percentile_interpolates():
+    values = [1.0, 2.0, 3.0, 4.0]
+    assert percentile([], 50) == 0.0
+    assert percentile([7.0], 99) == 7.0
+    assert percentile(values, 0) == 1.0
+    assert percentile(values, 50) == pytest.approx(2.5)
+    assert percentile(values, 100) == 4.0
+
+
+def test_latency_tracker_window_and_summary():
+    tracker = LatencyTracker(window=3)
+    for value in (10.0, 1.0, 2.0, 3.0):
+        tracker.record("llm_total", value)
+    with pytest.raises(KeyError):
+        with tracker.time("embed_query"):
+            raise KeyError("failed stages are still timed")
+
+    assert tracker.count("llm_total") == 3
+    assert tracker.total("llm_total") == 16.0
+    assert tracker.percentiles("llm_total") == {"p50": 2.0, "p95": pytest.approx(2.9), "p99": pytest.approx(2.98)}
+    summary = tracker.summary(["llm_total", "embed_query", "missing"])
+    assert set(summary) == {"llm_total", "embed_query"}
+    assert summary["embed_query"]["count"] == 1
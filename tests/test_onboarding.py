@@ -0,0 +1,119 @@
+import json
+import threading
+import types
+
+import pytest
+
+from utils import onboarding
+from utils.onboarding import GeneratedPlans, OnboardingPlans, parse_plan, validate_overrides
+from utils.storage import ScoreCache, storage_path
+
+STAGES = ("welcome", "documentation", "training", "setup")
+
+
+class StubChain:
+    """Stands in for SimpleQAChain: replies come from `reply()`."""
+
+    def __init__(self, reply, model="stub-model"):
+        self.reply = reply
+        self.llm = type("LLM", (), {"model": model})()
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def complete(self, template, **values):
+        with self._lock:
+            self.calls += 1
+        return {"result": self.reply()}
+
+
+def _failing():
+    raise RuntimeError("503")
+
+
+def _tailored():
+    return json.dumps({"welcome": {"tasks": ["Meet the {on-call} team", "  "]}, "bogus": {"tasks": ["x"]}})
+
+
+@pytest.fixture(scope="module")
+def plans():
+    return OnboardingPlans()
+
+
+@pytest.fixture
+def generated(plans):
+    cache = ScoreCache(storage_path("onboarding_cache.db"), "generated_plans", ("role", "department", "model"))
+    return GeneratedPlans(plans, cache=cache, max_entries=2, retry_after=60)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controls the time GeneratedPlans sees."""
+    now = [1000.0]
+    monkeypatch.setattr(onboarding, "time", types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def test_plans_fill_placeholders_and_fall_back_to_the_first_stage(plans):
+    assert plans.stages == STAGES
+    welcome = plans.get("Data Scientist", "Engineering", "welcome")
+    assert "Engineering" in welcome.info and "Data Scientist" in welcome.info
+    assert plans.get("Data Scientist", "Engineering", "nope") == welcome
+    # Roles the file doesn't mention are compiled on first use.
+    assert "Astronaut" in plans.get("Astronaut", "Space", "welcome").info
+
+
+def test_validate_overrides_rejects_unknown_stages_fields_and_placeholders():
+    with pytest.raises(ValueError, match="unknown stage"):
+        validate_overrides({"lunch": {"tasks": ["eat"]}}, STAGES, "o")
+    with pytest.raises(ValueError, match="unknown field"):
+        validate_overrides({"welcome": {"colour": "red"}}, STAGES, "o")
+    with pytest.raises(ValueError, match="placeholders"):
+        validate_overrides({"welcome": {"tasks": ["Meet {manager}"]}}, STAGES, "o")
+
+
+def test_parse_plan_keeps_valid_stages_and_escapes_braces():
+    assert parse_plan(_tailored(), STAGES) == {"welcome": {"tasks": ["Meet the (on-call) team"]}}
+    assert parse_plan("no json here", STAGES) is None
+    assert parse_plan('{"welcome": {"tasks": []}}', STAGES) is None
+
+
+def test_generated_plan_is_cached_in_memory_and_on_disk(plans, generated):
+    chain = StubChain(_tailored)
+    plan = generated.get(chain, "Software Engineer", "Engineering")
+    assert plan["welcome"].tasks == ("Meet the (on-call) team",)
+    assert plan["welcome"].source == "generated"
+    assert plan["setup"] == plans.get("Software Engineer", "Engineering", "setup")._replace(source="generated")
+    assert generated.get(chain, "Software Engineer", "Engineering") is plan
+    fresh = GeneratedPlans(plans, cache=generated.cache)
+    assert fresh.get(chain, "Software Engineer", "Engineering") == plan
+    assert chain.calls == 1
+
+
+def test_failed_generation_serves_the_configured_plan_until_retry(plans, generated, clock, capsys):
+    chain = StubChain(_failing)
+    plan = generated.get(chain, "Software Engineer", "Engineering")
+    assert plan["welcome"] == plans.get("Software Engineer", "Engineering", "welcome")
+    assert plan["welcome"].source == "plan"
+    assert "generation failed" in capsys.readouterr().out
+    generated.get(chain, "Software Engineer", "Engineering")
+    assert chain.calls == 1
+    clock[0] += 61
+    chain.reply = _tailored
+    assert generated.get(chain, "Software Engineer", "Engineering")["welcome"].source == "generated"
+    assert chain.calls == 2
+
+
+def test_unusable_reply_is_also_remembered(generated):
+    chain = StubChain(lambda: "Sorry, I can't help with that.")
+    assert generated.get(chain, "Software Engineer", "Engineering")["welcome"].source == "plan"
+    generated.get(chain, "Software Engineer", "Engineering")
+    assert chain.calls == 1
+
+
+def test_compiled_plans_are_bounded(generated):
+    chain = StubChain(_failing)
+    for department in ("Engineering", "Product", "Data Science"):
+        generated.get(chain, "Software Engineer", department)
+    assert len(generated._compiled) == 2
+    generated.get(chain, "Software Engineer", "Engineering")   # evicted, so generated again
+    assert chain.calls == 4
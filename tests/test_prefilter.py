@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from utils.fakes import FakeEmbeddings
+from utils.prefilter import keyword_coverage, parse_keywords, prefilter, tfidf_similarity
+from utils.screening import job_profile
+
+JOB = "Senior Python engineer. 5+ years of experience with Django, PostgreSQL and Kubernetes. Master degree."
+RESUMES = [
+    "Java developer with 3 years of Spring experience.",
+    "Senior Python engineer, 7 years with Django, PostgreSQL and Kubernetes. Master of Science.",
+    "Python scripting for data analysis, 2 years. Some PostgreSQL.",
+]
+
+
+def test_tfidf_similarity_ranks_overlapping_documents_first():
+    similarity = tfidf_similarity(JOB, RESUMES)
+    assert similarity.shape == (3,)
+    assert list(np.argsort(-similarity)) == [1, 2, 0]
+    assert tfidf_similarity(JOB, []).shape == (0,)
+    assert tfidf_similarity("", RESUMES).tolist() == [0.0, 0.0, 0.0]
+
+
+def test_keyword_coverage_matches_whole_terms_and_phrases():
+    texts = ["Statistician using R and C++ daily", "Java developer", "Senior engineer, master degree in ML"]
+    assert keyword_coverage(texts, ["R"]).tolist() == [1.0, 0.0, 0.0]
+    assert keyword_coverage(texts, ["c++", "senior"]).tolist() == [0.5, 0.0, 0.5]
+    assert keyword_coverage(texts, ["master degree"]).tolist() == [0.0, 0.0, 1.0]
+    assert keyword_coverage(texts, ["degree master"]).tolist() == [0.0, 0.0, 0.0]
+    # "java" must not match inside "javascript"
+    assert keyword_coverage(["JavaScript developer"], ["Java"]).tolist() == [0.0]
+
+
+def test_unmatchable_keywords_are_reported_not_silently_dropped(capsys):
+    assert parse_keywords(["Python", " ", "!!", "python", "C#"]) == (["python", "c#"], ["!!"])
+    assert keyword_coverage(["anything"], ["!!"]).tolist() == [1.0]
+    assert "!!" in capsys.readouterr().out
+    assert keyword_coverage(["anything"], []).tolist() == [1.0]
+
+
+def test_prefilter_shortlists_top_n_and_pre_score_threshold():
+    results = prefilter(JOB, RESUMES, required_keywords=["kubernetes"], top_n=1, min_score=101)
+    assert [r.index for r in results] == [1, 2, 0]
+    assert [r.rank for r in results] == [0, 1, 2]
+    assert [r.shortlisted for r in results] == [True, False, False]
+    assert results[0].coverage == 1.0 and results[1].coverage == 0.0
+    assert 0 <= results[0].pre_score <= 100
+
+    everyone = prefilter(JOB, RESUMES)
+    assert all(r.shortlisted for r in everyone)
+    by_score = prefilter(JOB, RESUMES, top_n=0, min_score=0)
+    assert all(r.shortlisted for r in by_score)
+
+
+def test_prefilter_blends_embedding_similarity():
+    embeddings = FakeEmbeddings(size=64)
+    profile = job_profile(JOB, embeddings=embeddings)
+    results = prefilter(profile, RESUMES, embeddings=embeddings)
+    tfidf_only = prefilter(profile, RESUMES)
+    assert results[0].index == 1
+    assert [r.similarity for r in results] != pytest.approx([r.similarity for r in tfidf_only])
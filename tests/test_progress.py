@@ -0,0 +1,92 @@
+import pytest
+
+from utils import progress
+from utils.progress import ProgressStore, employee_id, task_id
+
+TASKS = ["Sign contract", "Set up laptop", "Meet the team"]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ProgressStore(path=str(tmp_path / "onboarding.db"))
+    yield store
+    store.close()
+
+
+def test_stages_register_only_after_an_explicit_start(store):
+    assert employee_id("  Ada   LOVELACE ") == "ada lovelace"
+    assert not store.start_stage("Ada", "Engineer", "Week 1", TASKS)
+    assert store.stage_progress("Ada", "Engineer", "Week 1") == {}
+    assert store.onboardings() == []
+
+    store.start_onboarding("Ada", "Engineer", "R&D")
+    assert store.has_onboarding("ada ", "Engineer")
+    assert not store.has_onboarding("Ada", "Designer")
+    assert store.start_stage("Ada", "Engineer", "Week 1", TASKS)
+    assert store.stage_progress("Ada", "Engineer", "Week 1") == {task_id(t): False for t in TASKS}
+
+
+def test_registered_stages_are_bounded(store, monkeypatch):
+    monkeypatch.setattr(progress, "REGISTERED_MAX", 2)
+    store.start_onboarding("Ada", "Engineer", "R&D")
+    for stage in ("Week 1", "Week 2", "Week 3"):
+        store.start_stage("Ada", "Engineer", stage, TASKS)
+    assert [key[2] for key in store._registered] == ["Week 2", "Week 3"]
+
+
+def test_task_changes_are_buffered_until_flush(store):
+    store.start_onboarding("Ada", "Engineer", "R&D")
+    store.start_stage("Ada", "Engineer", "Week 1", TASKS)
+    store.set_task("Ada", "Engineer", "Week 1", TASKS[0], True)
+    store.set_task("Ada", "Engineer", "Week 1", TASKS[1], True)
+    store.set_task("Ada", "Engineer", "Week 1", TASKS[1], False)
+
+    assert store.stage_progress("Ada", "Engineer", "Week 1")[task_id(TASKS[0])] is True
+    assert store.employee_summary("Ada", "Engineer") == {"Week 1": (0, 3)}
+    assert store.flush() == 2
+    assert store.flush() == 0
+    assert store.employee_summary("Ada", "Engineer") == {"Week 1": (1, 3)}
+
+
+def test_full_buffer_flushes_itself(tmp_path):
+    store = ProgressStore(path=str(tmp_path / "onboarding.db"), batch_size=2)
+    store.start_onboarding("Ada", "Engineer", "R&D")
+    store.start_stage("Ada", "Engineer", "Week 1", TASKS)
+    for task in TASKS[:2]:
+        store.set_task("Ada", "Engineer", "Week 1", task, True)
+    assert store.employee_summary("Ada", "Engineer") == {"Week 1": (2, 3)}
+    store.close()
+
+
+def test_completion_rates_and_onboardings(store):
+    for name, role, department in (("Ada", "Engineer", "R&D"), ("Grace", "Engineer", "Ops"),
+                                   ("Linus", "Designer", "R&D")):
+        store.start_onboarding(name, role, department)
+        store.start_stage(name, role, "Week 1", TASKS)
+    for task in TASKS:
+        store.set_task("Ada", "Engineer", "Week 1", task, True)
+    store.set_task("Grace", "Engineer", "Week 1", TASKS[0], True)
+    store.flush()
+
+    (everyone,) = store.completion_rates()
+    assert everyone == {"stage": "Week 1", "employees": 3, "tasks_completed": 4, "tasks_tracked": 9,
+                        "completion_rate": 4 / 9, "stage_completed": 1}
+    (engineers,) = store.completion_rates(role="Engineer")
+    assert (engineers["employees"], engineers["tasks_completed"]) == (2, 4)
+    (rnd,) = store.completion_rates(department="R&D")
+    assert (rnd["employees"], rnd["stage_completed"]) == (2, 1)
+    assert store.completion_rates(role="Engineer", department="Nowhere") == []
+
+    recent = store.onboardings()
+    assert {row["name"] for row in recent} == {"Ada", "Grace", "Linus"}
+    assert next(row for row in recent if row["name"] == "Ada")["completion_rate"] == 1.0
+    assert [row["name"] for row in store.onboardings(department="Ops")] == ["Grace"]
+    assert len(store.onboardings(limit=1)) == 1
+
+
+def test_restart_updates_department_only(store):
+    store.start_onboarding("Ada", "Engineer", "R&D")
+    store.start_stage("Ada", "Engineer", "Week 1", TASKS)
+    store.start_onboarding("ada", "Engineer", "Ops")
+    (row,) = store.onboardings()
+    assert (row["name"], row["department"], row["tasks_tracked"]) == ("Ada", "Ops", 3)
@@ -0,0 +1,49 @@
+import pytest
+
+from utils.prompts import PROMPTS, PromptRegistry, hr_persona
+
+
+def test_render_keeps_parts_in_order_and_leaves_prefix_braces_alone():
+    registry = PromptRegistry()
+    registry.register("score", prefix='Reply as {"score": 0}.\n', shared="JOB: {job}\n", body="RESUME: {resume}\n")
+    rendered = registry.render("score", job="Engineer", resume="Ada")
+    assert rendered.prefix == 'Reply as {"score": 0}.\n'
+    assert rendered.shared == "JOB: Engineer\n"
+    assert rendered.body == "RESUME: Ada\n"
+    assert rendered.cacheable == rendered.prefix + rendered.shared
+    assert rendered.text == rendered.cacheable + rendered.body
+    assert registry.get("score").fields == ("job", "resume")
+
+
+def test_render_reports_missing_fields():
+    registry = PromptRegistry()
+    registry.register("t", prefix="", shared="{a}", body="{b}")
+    with pytest.raises(KeyError, match="b"):
+        registry.render("t", a="x")
+
+
+def test_stats_average_tokens_per_render():
+    registry = PromptRegistry()
+    registry.register("t", prefix="Static instructions. " * 10, body="{text}")
+    registry.register("unused", prefix="x", body="{y}")
+    registry.render("t", text="short")
+    registry.render("t", text="a much longer body " * 20)
+    stats = {row["template"]: row for row in registry.stats()}
+    assert registry.names() == ["t", "unused"]
+    assert stats["t"]["renders"] == 2
+    assert stats["t"]["avg_shared_tokens"] == 0
+    assert stats["t"]["avg_body_tokens"] > 0
+    assert stats["t"]["avg_total_tokens"] == stats["t"]["prefix_tokens"] + stats["t"]["avg_body_tokens"]
+    assert stats["unused"]["renders"] == 0
+
+
+def test_hr_persona_is_stable_and_falls_back_to_general():
+    assert hr_persona("leave") is hr_persona("leave")
+    assert "URGENT" in hr_persona("leave", urgent=True)
+    assert "URGENT" not in hr_persona("leave")
+    assert hr_persona("unknown") == hr_persona("general")
+
+
+def test_module_templates_are_registered():
+    assert "chat_summary" in PROMPTS.names()
+    assert PROMPTS.get("chat_summary").fields == ("conversation",)
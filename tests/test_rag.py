@@ -0,0 +1,152 @@
+import threading
+import types
+
+import pytest
+
+from utils import rag
+from utils.fakes import FakeContextCache
+from utils.prompts import RenderedPrompt
+from utils.rag import ContextCache, cache_min_tokens
+
+MODEL = "models/gemini-2.5-flash"
+
+
+def prompt(shared="JOB: engineer\n", body="RESUME: Ada\n"):
+    return RenderedPrompt("t", "Score the resume.\n", shared, body)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controls the time ContextCache sees."""
+    now = [1000.0]
+    monkeypatch.setattr(rag, "time", types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+class FlakyBackend(FakeContextCache):
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+        self.attempts = 0
+
+    def create(self, model, content, ttl):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise RuntimeError("quota exceeded")
+        return super().create(model, content, ttl)
+
+
+def test_cache_min_tokens_per_model():
+    assert cache_min_tokens(MODEL) == 1024
+    assert cache_min_tokens("gemini-2.5-pro-preview") == 4096
+    assert cache_min_tokens("some-other-model") == rag.DEFAULT_CACHE_MIN_TOKENS
+
+
+def test_short_prompts_and_no_backend_are_sent_in_full():
+    p = prompt()
+    assert ContextCache().request(p, MODEL) == (p.text, {})
+    backend = FakeContextCache()
+    assert ContextCache(backend).request(p, MODEL) == (p.text, {})
+    assert backend.created == 0
+
+
+def test_creates_once_and_reuses_the_handle():
+    backend = FakeContextCache()
+    cache = ContextCache(backend, min_tokens=1)
+    text, kwargs = cache.request(prompt(), MODEL)
+    assert text == "RESUME: Ada\n"
+    assert backend.resolve(kwargs["cached_content"], MODEL) == prompt().cacheable
+    assert cache.request(prompt(body="RESUME: Bob\n"), MODEL)[1] == kwargs
+    cache.request(prompt(shared="JOB: designer\n"), MODEL)
+    stats = cache.stats()
+    assert (backend.created, stats["created"], stats["hits"], stats["cached_calls"], stats["active"]) == (2, 2, 1, 3, 2)
+
+
+def test_handle_is_recreated_before_it_expires(clock):
+    backend = FakeContextCache()
+    cache = ContextCache(backend, ttl=100, min_tokens=1)
+    first = cache.request(prompt(), MODEL)[1]["cached_content"]
+    clock[0] += 95   # inside the 10s margin
+    second = cache.request(prompt(), MODEL)[1]["cached_content"]
+    assert first != second
+    assert (backend.created, backend.deleted) == (2, 1)
+
+
+def test_sweep_deletes_idle_handles(clock):
+    backend = FakeContextCache()
+    cache = ContextCache(backend, ttl=100, min_tokens=1)
+    cache.request(prompt(), MODEL)
+    clock[0] += 95
+    cache.request(prompt(shared="JOB: designer\n"), MODEL)
+    assert backend.deleted == 1
+    assert cache.stats()["expired"] == 1
+    assert cache.stats()["active"] == 1
+
+
+def test_run_releases_its_handles_unless_another_run_holds_them():
+    backend = FakeContextCache()
+    cache = ContextCache(backend, min_tokens=1)
+
+    def other_run():
+        with cache.run():
+            cache.request(prompt(), MODEL)
+
+    with cache.run():
+        cache.request(prompt(), MODEL)
+        worker = threading.Thread(target=other_run)
+        worker.start()
+        worker.join()
+        assert backend.deleted == 0
+    assert backend.deleted == 1
+    cache.request(prompt(shared="JOB: designer\n"), MODEL)
+    cache.expire()
+    assert backend.active() == 0
+    assert cache.stats()["active"] == 0
+
+
+def test_failed_creation_is_not_retried_until_retry_after(clock, capsys):
+    backend = FlakyBackend(failures=1)
+    cache = ContextCache(backend, min_tokens=1, retry_after=60)
+    p = prompt()
+    assert cache.request(p, MODEL) == (p.text, {})
+    assert cache.request(p, MODEL) == (p.text, {})
+    assert backend.attempts == 1
+    assert "creation failed" in capsys.readouterr().out
+    clock[0] += 61
+    assert cache.request(p, MODEL)[0] == p.body
+    assert backend.attempts == 2
+    assert cache.stats()["errors"] == 1
+
+
+def test_concurrent_requests_share_one_creation():
+    backend = FakeContextCache(latency=0.05)
+    cache = ContextCache(backend, min_tokens=1)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.request(prompt(), MODEL))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert backend.created == 1
+    assert len({kwargs["cached_content"] for _, kwargs in results}) == 1
+    assert cache.stats()["cached_calls"] == 8
+
+
+def test_creation_does_not_hold_the_lock():
+    started, release = threading.Event(), threading.Event()
+
+    class SlowBackend(FakeContextCache):
+        def create(self, model, content, ttl):
+            started.set()
+            release.wait(5)
+            return super().create(model, content, ttl)
+
+    cache = ContextCache(SlowBackend(), min_tokens=1)
+    worker = threading.Thread(target=cache.request, args=(prompt(), MODEL))
+    worker.start()
+    assert started.wait(5)
+    # Stats are served while the creation is in flight.
+    assert cache.stats()["created"] == 0
+    release.set()
+    worker.join()
+    assert cache.stats()["created"] == 1
@@ -0,0 +1,133 @@
+import threading
+import time
+
+import pytest
+
+from utils.metrics import LatencyTracker
+from utils.scheduler import LLMScheduler, ScheduledLLM, current_priority, llm_priority
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while not predicate():
+        if time.time() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.001)
+
+
+class _Harness:
+    """Holds slots open and queues waiters that record the order they are admitted in."""
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.order = []
+        self.threads = []
+
+    def hold(self, priority, session="holder"):
+        release = threading.Event()
+        held = threading.Event()
+
+        def run():
+            with self.scheduler.slot(priority, session):
+                held.set()
+                release.wait()
+
+        self._start(run)
+        held.wait()
+        return release
+
+    def queue(self, priority, session, label):
+        waiting = sum(s["waiting"] for s in self.scheduler.stats().values())
+
+        def run():
+            with self.scheduler.slot(priority, session):
+                self.order.append(label)
+
+        self._start(run)
+        _wait_for(lambda: sum(s["waiting"] for s in self.scheduler.stats().values()) == waiting + 1)
+
+    def _start(self, target):
+        t = threading.Thread(target=target, daemon=True)
+        t.start()
+        self.threads.append(t)
+
+    def join(self):
+        for t in self.threads:
+            t.join(timeout=5)
+
+
+def test_higher_priority_classes_go_first():
+    scheduler = LLMScheduler(2, metrics=LatencyTracker())
+    harness = _Harness(scheduler)
+    releases = [harness.hold("interactive"), harness.hold("interactive")]
+    harness.queue("batch", "a", "batch")
+    harness.queue("interactive", "b", "interactive")
+    harness.queue("urgent", "c", "urgent")
+
+    releases[0].set()
+    _wait_for(lambda: len(harness.order) == 3)
+    releases[1].set()
+    harness.join()
+    assert harness.order == ["urgent", "interactive", "batch"]
+
+
+def test_sessions_take_turns_within_a_class():
+    scheduler = LLMScheduler(2, metrics=LatencyTracker())
+    harness = _Harness(scheduler)
+    release = harness.hold("batch")
+    for label in ("a1", "a2", "a3"):
+        harness.queue("batch", "a", label)
+    harness.queue("batch", "b", "b1")
+
+    release.set()
+    harness.join()
+    assert harness.order == ["a1", "b1", "a2", "a3"]
+
+
+def test_batch_always_leaves_headroom():
+    scheduler = LLMScheduler(1, limits={"batch": 5}, metrics=LatencyTracker())
+    assert scheduler.max_concurrency == 2
+    assert scheduler.limits["batch"] == 1
+
+    harness = _Harness(scheduler)
+    release = harness.hold("batch")
+    harness.queue("batch", "a", "batch")
+    start = time.perf_counter()
+    with scheduler.slot("interactive", "b"):
+        waited = time.perf_counter() - start
+    assert waited < 0.5
+    assert harness.order == []
+    release.set()
+    harness.join()
+    assert harness.order == ["batch"]
+
+
+def test_queue_wait_is_recorded_per_class():
+    metrics = LatencyTracker()
+    scheduler = LLMScheduler(2, metrics=metrics)
+    with scheduler.slot("urgent"):
+        pass
+    assert metrics.count("queue_urgent") == 1
+    assert scheduler.stats()["urgent"] == {"running": 0, "waiting": 0, "limit": 2}
+
+
+def test_scheduled_llm_uses_the_callers_priority():
+    seen = []
+
+    class Model:
+        model = "fake"
+
+        def invoke(self, prompt):
+            seen.append(current_priority())
+            return prompt
+
+    metrics = LatencyTracker()
+    llm = ScheduledLLM(Model(), LLMScheduler(4, metrics=metrics))
+    with llm_priority("batch", "session-1"):
+        assert llm.invoke("hi") == "hi"
+    assert seen == [("batch", "session-1")]
+    assert llm.model == "fake"
+    assert metrics.count("queue_batch") == 1
+    with pytest.raises(ValueError):
+        with llm_priority("whenever"):
+            pass
@@ -0,0 +1,88 @@
+import json
+
+from utils.screening import extract_features, feature_scores, job_profile, parse_assessment, requirement_text
+from utils.storage import ScoreCache
+
+
+def test_parse_assessment_tolerates_fences_and_clamps():
+    reply = "Here you go:\n```json\n" + json.dumps({
+        "match_score": 120,
+        "categories": {"technical": 11, "experience": "7", "unknown": 5},
+        "summary": " Strong backend profile. ",
+        "strengths": ["Python", "AWS"],
+        "concerns": "No team lead experience",
+        "recommendation": "interview",
+    }) + "\n```"
+    result = parse_assessment(reply)
+    assert result["match_score"] == 100
+    assert result["categories"] == {"technical": 10, "experience": 7}
+    assert result["summary"] == "Strong backend profile."
+    assert result["strengths"] == ["Python", "AWS"]
+    assert result["concerns"] == ["No team lead experience"]
+    assert result["interview_focus"] == []
+    assert result["recommendation"] == "INTERVIEW"
+
+
+def test_parse_assessment_rejects_unusable_replies():
+    assert parse_assessment("no json here") is None
+    assert parse_assessment('{"summary": "missing score"}') is None
+    assert parse_assessment('{"match_score": "high"}') is None
+    assert parse_assessment('{"match_score": 50, "recommendation": "MAYBE"}')["recommendation"] is None
+
+
+JOB = """Acme is a fast-paced company with offices in Berlin and great benefits.
+
+**Requirements:**
+- 5+ years of Python and Django
+- PostgreSQL, Kubernetes
+
+Nice to have: Terraform, AWS
+
+About us:
+We offer a competitive salary. Senior role, Master degree preferred."""
+
+
+class CountingEmbeddings:
+    model = "embed-test"
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return [1.0, 0.0]
+
+
+def test_job_profile_skills_come_from_requirement_sections():
+    profile = job_profile(JOB)
+    assert profile.skills == ["python", "django", "postgresql", "kubernetes", "terraform", "aws"]
+    assert {"company", "offices", "benefits", "python"} <= set(profile.terms)
+    assert (profile.required_years, profile.education, profile.seniority) == (5, 3, 2)
+    assert requirement_text("No sections. Just Python.") == "No sections. Just Python."
+
+
+def test_job_profile_without_sections_drops_generic_terms():
+    profile = job_profile("We are a company with an office. Python, SQL and great benefits.")
+    assert profile.skills == ["python", "sql"]
+
+
+def test_job_profile_model_fields_are_cached(tmp_path):
+    cache = ScoreCache(path=str(tmp_path / "profiles.db"), table="job_profiles",
+                       key_columns=("job_hash", "llm", "embedder"))
+    embeddings = CountingEmbeddings()
+    first = job_profile(JOB, embeddings=embeddings, cache=cache)
+    second = job_profile(JOB, embeddings=embeddings, cache=cache)
+    assert embeddings.calls == 1
+    assert first == second
+    assert second.embedding == [1.0, 0.0]
+    assert second.skills == job_profile(JOB).skills
+
+
+def test_features_and_pre_score():
+    features = extract_features(JOB, "Senior engineer, 7 years of Python, Django and AWS. MSc, master degree.")
+    assert features["matched_skills"] == ["python", "django", "aws"]
+    assert features["skill_overlap"] == 0.5
+    assert (features["candidate_years"], features["candidate_education"]) == (7, 3)
+    score, categories = feature_scores(features)
+    assert 60 <= score <= 100
+    assert categories["technical"] == 5
@@ -0,0 +1,43 @@
+from utils.storage import ScoreCache, model_name, text_hash
+
+
+def test_score_cache_round_trip_and_lru(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ScoreCache(path=path, table="scores", key_columns=("job", "resume", "model"), max_entries=2)
+    for i in range(3):
+        cache.put(("job", f"resume{i}", "model"), {"match_score": i})
+
+    assert cache.get(("job", "missing", "model")) is None
+    assert cache.misses == 1
+    # Evicted from memory but still on disk.
+    assert ("job", "resume0", "model") not in cache._mem
+    assert cache.get(("job", "resume0", "model")) == {"match_score": 0}
+    assert cache.hits == 1
+
+    reopened = ScoreCache(path=path, table="scores", key_columns=("job", "resume", "model"), max_entries=2)
+    assert reopened.get(("job", "resume2", "model")) == {"match_score": 2}
+
+
+def test_score_cache_custom_table_and_key(tmp_path):
+    cache = ScoreCache(path=str(tmp_path / "cache.db"), table="job_profiles", key_columns=("job_hash", "llm"))
+    cache.put(("h", "gemini"), {"skills": ["python"]})
+    cache.put(("h", "gemini"), {"skills": ["sql"]})
+    assert ScoreCache(path=str(tmp_path / "cache.db"), table="job_profiles",
+                      key_columns=("job_hash", "llm")).get(("h", "gemini")) == {"skills": ["sql"]}
+
+
+def test_text_hash_ignores_whitespace():
+    assert text_hash("Senior  Python\nengineer ") == text_hash("Senior Python engineer")
+    assert text_hash("a") != text_hash("b")
+
+
+def test_model_name_prefers_model_attributes():
+    class Chat:
+        model = "gemini-2.5-flash"
+
+    class Embedder:
+        model_name = "all-MiniLM-L6-v2"
+
+    assert model_name(Chat()) == "gemini-2.5-flash"
+    assert model_name(Embedder()) == "all-MiniLM-L6-v2"
+    assert model_name(object()) == "object"
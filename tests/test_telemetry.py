@@ -0,0 +1,81 @@
+import pytest
+
+from utils import telemetry
+
+
+@pytest.fixture
+def span_exporter():
+    exporter = telemetry.configure("memory")
+    telemetry.REGISTRY.reset()
+    yield exporter
+    telemetry.configure("")
+    telemetry.REGISTRY.reset()
+
+
+def test_spans_disabled_by_default():
+    telemetry.configure("")
+    assert telemetry.span("anything") is telemetry._NOOP_SPAN
+    assert not telemetry.is_enabled()
+
+
+def test_in_memory_exporter_records_attributes_and_parents(span_exporter):
+    with telemetry.span("query", agent="hr") as outer:
+        outer.set_attribute("retrieval.documents", 4)
+        with telemetry.span("retrieval"):
+            pass
+
+    spans = {s.name: s for s in span_exporter.get_finished_spans()}
+    assert set(spans) == {"query", "retrieval"}
+    assert spans["query"].attributes == {"agent": "hr", "retrieval.documents": 4}
+    assert spans["retrieval"].parent == "query"
+    assert spans["query"].parent is None
+    assert spans["query"].duration >= spans["retrieval"].duration >= 0
+
+
+def test_span_records_error(span_exporter):
+    with pytest.raises(ValueError):
+        with telemetry.span("failing"):
+            raise ValueError("boom")
+    [span] = span_exporter.get_finished_spans()
+    assert "boom" in span.error
+
+
+def test_traced_records_span_and_metrics(span_exporter):
+    @telemetry.traced("build")
+    def build(fail=False):
+        if fail:
+            raise RuntimeError("nope")
+        return 42
+
+    assert build() == 42
+    with pytest.raises(RuntimeError):
+        build(fail=True)
+
+    assert [s.name for s in span_exporter.get_finished_spans()] == ["build", "build"]
+    registry = telemetry.REGISTRY
+    assert registry.histogram_count("hr_operation_duration_seconds", operation="build") == 2
+    assert registry.counter_value("hr_operations_total", operation="build", status="ok") == 1
+    assert registry.counter_value("hr_operations_total", operation="build", status="error") == 1
+
+
+def test_metrics_registry_counters_and_histograms():
+    registry = telemetry.MetricsRegistry(buckets=(0.1, 1.0))
+    registry.inc("requests", agent="hr")
+    registry.inc("requests", 2, agent="hr")
+    registry.observe("latency", 0.05, stage="llm")
+    registry.observe("latency", 0.5, stage="llm")
+    registry.observe("latency", 5.0, stage="llm")
+
+    assert registry.counter_value("requests", agent="hr") == 3
+    assert registry.counter_value("requests", agent="other") == 0
+    assert registry.histogram_count("latency", stage="llm") == 3
+
+    text = registry.render_prometheus()
+    assert 'requests{agent="hr"} 3.0' in text
+    assert 'latency_bucket{stage="llm",le="0.1"} 1' in text
+    assert 'latency_bucket{stage="llm",le="1.0"} 2' in text
+    assert 'latency_bucket{stage="llm",le="+Inf"} 3' in text
+    assert 'latency_sum{stage="llm"} 5.55' in text
+
+    registry.reset()
+    assert registry.render_prometheus() == "\n"
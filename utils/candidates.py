@@ -0,0 +1,276 @@
+"""
+Persistent candidate pipeline.
+
+Screening results are upserted into SQLite keyed by (requisition, resume
+hash), so re-screening the same pool updates rows instead of duplicating
+them. Indexes on requisition/score, recommendation, stage and update time
+keep filtered, sorted, paginated listings cheap however many candidates
+accumulate; pages are read on demand instead of held in session state.
+"""
+import json
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from utils.storage import connect, storage_path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS requisitions (
+    requisition TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS candidates (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    requisition TEXT NOT NULL,
+    resume_hash TEXT NOT NULL,
+    candidate_name TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    pre_score INTEGER,
+    llm_score INTEGER,
+    recommendation TEXT NOT NULL,
+    priority TEXT,
+    stage TEXT NOT NULL DEFAULT 'screened',
+    categories TEXT,
+    analysis TEXT,
+    details TEXT,
+    session_id TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (requisition, resume_hash)
+);
+CREATE INDEX IF NOT EXISTS idx_candidates_req_score ON candidates (requisition, score DESC);
+CREATE INDEX IF NOT EXISTS idx_candidates_req_rec ON candidates (requisition, recommendation);
+CREATE INDEX IF NOT EXISTS idx_candidates_req_stage ON candidates (requisition, stage);
+CREATE INDEX IF NOT EXISTS idx_candidates_updated ON candidates (updated_at);
+"""
+
+STAGES = ("screened", "pipeline", "interview", "offer", "hired", "rejected")
+
+# Sort keys callers may pass to query(); anything else is rejected.
+SORT_COLUMNS = {
+    "score": "score",
+    "name": "candidate_name COLLATE NOCASE",
+    "recommendation": "recommendation",
+    "updated": "updated_at",
+}
+# Row key holding each sort column's value, for keyset paging.
+_SORT_FIELDS = {"score": "score", "name": "candidate_name", "recommendation": "recommendation",
+                "updated": "updated_at"}
+
+# Export columns and types: a fixed CSV header and Parquet schema for every
+# requisition. Result keys without a column of their own go in `details`.
+EXPORT_COLUMNS = {
+    "id": int, "requisition": str, "candidate_name": str, "score": int, "pre_score": int,
+    "llm_score": int, "recommendation": str, "priority": str, "stage": str, "categories": str,
+    "analysis": str, "details": str, "resume_hash": str, "session_id": str,
+    "created_at": float, "updated_at": float,
+}
+
+# Screening result keys stored in dedicated columns; the rest go in `details`.
+_COLUMN_KEYS = {"candidate_name", "score", "pre_score", "llm_score", "recommendation", "priority",
+                "categories", "analysis", "resume_hash", "timestamp"}
+
+
+class CandidateStore:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or storage_path("candidates.db")
+        self._conn = connect(self.path)
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.version = 0
+
+    # -- writes ------------------------------------------------------------
+
+    def save_screening(self, requisition: str, title: str, results: Sequence[Dict[str, Any]],
+                       session_id: Optional[str] = None) -> List[int]:
+        """
+        Upsert screening results for a requisition in one transaction.
+        Pipeline stage is preserved for candidates already on file.
+        Returns the candidate ids in input order.
+        """
+        now = time.time()
+        rows = []
+        for r in results:
+            details = {k: v for k, v in r.items() if k not in _COLUMN_KEYS}
+            rows.append((
+                requisition, r["resume_hash"], r["candidate_name"], int(r["score"]),
+                r.get("pre_score"), r.get("llm_score"), r["recommendation"], r.get("priority"),
+                json.dumps(r.get("categories") or {}), r.get("analysis", ""),
+                json.dumps(details, default=str), session_id, now, now,
+            ))
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO requisitions VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (requisition) DO UPDATE SET title = excluded.title, updated_at = excluded.updated_at",
+                (requisition, title, now, now),
+            )
+            self._conn.executemany(
+                "INSERT INTO candidates (requisition, resume_hash, candidate_name, score, pre_score, llm_score,"
+                " recommendation, priority, categories, analysis, details, session_id, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (requisition, resume_hash) DO UPDATE SET"
+                " candidate_name = excluded.candidate_name, score = excluded.score,"
+                " pre_score = excluded.pre_score, llm_score = excluded.llm_score,"
+                " recommendation = excluded.recommendation, priority = excluded.priority,"
+                " categories = excluded.categories, analysis = excluded.analysis,"
+                " details = excluded.details, session_id = excluded.session_id,"
+                " updated_at = excluded.updated_at",
+                rows,
+            )
+            self._conn.commit()
+            ids = [
+                self._conn.execute(
+                    "SELECT id FROM candidates WHERE requisition = ? AND resume_hash = ?",
+                    (requisition, r["resume_hash"]),
+                ).fetchone()[0]
+                for r in results
+            ]
+            self.version += 1
+        return ids
+
+    def set_stage(self, candidate_id: int, stage: str) -> None:
+        if stage not in STAGES:
+            raise ValueError(f"Unknown pipeline stage: {stage}")
+        with self._lock:
+            self._conn.execute("UPDATE candidates SET stage = ?, updated_at = ? WHERE id = ?",
+                               (stage, time.time(), candidate_id))
+            self._conn.commit()
+            self.version += 1
+
+    # -- reads -------------------------------------------------------------
+
+    @staticmethod
+    def _where(requisition: Optional[str], min_score: Optional[int], recommendations: Optional[Sequence[str]],
+               stages: Optional[Sequence[str]], search: Optional[str]) -> Tuple[str, list]:
+        sql = " WHERE 1=1"
+        params: list = []
+        if requisition is not None:
+            sql += " AND requisition = ?"
+            params.append(requisition)
+        if min_score is not None:
+            sql += " AND score >= ?"
+            params.append(min_score)
+        if recommendations:
+            sql += f" AND recommendation IN ({', '.join('?' * len(recommendations))})"
+            params.extend(recommendations)
+        if stages:
+            sql += f" AND stage IN ({', '.join('?' * len(stages))})"
+            params.extend(stages)
+        if search:
+            sql += " AND candidate_name LIKE ?"
+            params.append(f"%{search}%")
+        return sql, params
+
+    @staticmethod
+    def _row(row) -> Dict[str, Any]:
+        (cid, req, resume_hash, name, score, pre, llm, rec, priority, stage,
+         cats, analysis, details, session_id, created, updated) = row
+        return {
+            **(json.loads(details) if details else {}),
+            "id": cid, "requisition": req, "resume_hash": resume_hash, "candidate_name": name,
+            "score": score, "pre_score": pre, "llm_score": llm, "recommendation": rec,
+            "priority": priority, "stage": stage, "categories": json.loads(cats) if cats else {},
+            "analysis": analysis, "session_id": session_id, "created_at": created, "updated_at": updated,
+        }
+
+    def query(self, requisition: Optional[str] = None, min_score: Optional[int] = None,
+              recommendations: Optional[Sequence[str]] = None, stages: Optional[Sequence[str]] = None,
+              search: Optional[str] = None, sort: str = "score", descending: bool = True,
+              limit: Optional[int] = 20, offset: int = 0, after: Optional[Tuple[Any, int]] = None
+              ) -> List[Dict[str, Any]]:
+        """
+        One page of candidates matching the filters. `after` is the (sort
+        value, id) of the previous page's last row: paging by key instead
+        of `offset` neither skips nor repeats rows while others write.
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Unsupported sort key: {sort}")
+        where, params = self._where(requisition, min_score, recommendations, stages, search)
+        column = SORT_COLUMNS[sort]
+        if after is not None:
+            where += f" AND ({column} {'<' if descending else '>'} ? OR ({column} = ? AND id > ?))"
+            params += [after[0], after[0], after[1]]
+        sql = f"SELECT * FROM candidates{where} ORDER BY {column} {'DESC' if descending else 'ASC'}, id"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._row(r) for r in rows]
+
+    def count(self, requisition: Optional[str] = None, min_score: Optional[int] = None,
+              recommendations: Optional[Sequence[str]] = None, stages: Optional[Sequence[str]] = None,
+              search: Optional[str] = None) -> int:
+        where, params = self._where(requisition, min_score, recommendations, stages, search)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM candidates{where}", params).fetchone()[0]
+
+    def iter_candidates(self, batch: int = 500, sort: str = "score", **filters: Any) -> Iterator[Dict[str, Any]]:
+        """Every matching candidate, read `batch` rows at a time by keyset paging (for exports)."""
+        after = None
+        while True:
+            page = self.query(limit=batch, sort=sort, after=after, **filters)
+            yield from page
+            if len(page) < batch:
+                return
+            after = (page[-1][_SORT_FIELDS[sort]], page[-1]["id"])
+
+    def iter_export_rows(self, **filters: Any) -> Iterator[Dict[str, Any]]:
+        """iter_candidates() rows with EXPORT_COLUMNS keys, extra result keys nested under `details`."""
+        for row in self.iter_candidates(**filters):
+            out = {k: row.get(k) for k in EXPORT_COLUMNS}
+            out["details"] = {k: v for k, v in row.items() if k not in EXPORT_COLUMNS}
+            yield out
+
+    def summary(self, requisition: str, min_score: int = 0) -> Dict[str, Any]:
+        with self._lock:
+            total, avg, above = self._conn.execute(
+                "SELECT COUNT(*), AVG(score), SUM(score >= ?) FROM candidates WHERE requisition = ?",
+                (min_score, requisition),
+            ).fetchone()
+            by_stage = dict(self._conn.execute(
+                "SELECT stage, COUNT(*) FROM candidates WHERE requisition = ? GROUP BY stage", (requisition,)
+            ).fetchall())
+        return {"total_candidates": total, "average_score": avg or 0.0,
+                "above_threshold": above or 0, "by_stage": by_stage}
+
+    def requisitions(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recently screened requisitions with candidate counts."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.requisition, r.title, r.updated_at, COUNT(c.id)"
+                " FROM requisitions r LEFT JOIN candidates c ON c.requisition = r.requisition"
+                " GROUP BY r.requisition ORDER BY r.updated_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [{"requisition": r, "title": t, "updated_at": u, "candidates": n} for r, t, u, n in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_store: Optional[CandidateStore] = None
+_store_lock = threading.Lock()
+
+
+def get_candidate_store() -> CandidateStore:
+    """Process-wide store shared by all Streamlit sessions."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = CandidateStore()
+    return _store
+
+
+def requisition_title(job_description: str, max_chars: int = 80) -> str:
+    """First non-empty line of a job description, shortened for display."""
+    for line in job_description.splitlines():
+        line = line.strip()
+        if line:
+            return line if len(line) <= max_chars else line[:max_chars - 1].rstrip() + "…"
+    return "Untitled requisition"
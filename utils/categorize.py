@@ -0,0 +1,171 @@
+"""
+HR query categorization.
+
+All category and urgency terms are compiled at import into one lookup
+table keyed by whole words (plural forms included) plus a small index of
+multi-word phrases. A query is lowercased and split into words once and
+classified in a single pass: each matching word or phrase adds its
+weight to one category, and the highest weighted category wins, ties
+going to CATEGORY_ORDER. Matching is on whole words, so "health" no
+longer matches inside "healthy", and each term belongs to exactly one
+category.
+
+When no term matches, an optional pluggable classifier (any callable
+returning a category or None, e.g. EmbeddingClassifier) gets a say
+before falling back to "general".
+"""
+import math
+import re
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+CATEGORY_ORDER = ("policy", "leave", "benefits", "compliance", "general")
+
+CATEGORY_TERMS: Dict[str, Dict[str, float]] = {
+    "policy": {
+        "policy": 2.0, "policies": 2.0, "rule": 1.0, "handbook": 2.0, "guideline": 1.0,
+        "code of conduct": 2.0, "dress code": 2.0, "remote work": 1.0, "procedure": 1.0,
+    },
+    "leave": {
+        "leave": 2.0, "vacation": 2.0, "sick": 1.5, "time off": 2.0, "pto": 2.0, "fmla": 2.0,
+        "holiday": 1.5, "maternity": 2.0, "paternity": 2.0, "parental": 1.5, "bereavement": 2.0,
+        "absence": 1.5,
+    },
+    "benefits": {
+        "benefit": 2.0, "insurance": 2.0, "retirement": 2.0, "401k": 2.0, "401(k)": 2.0,
+        "health": 1.0, "healthcare": 1.5, "dental": 2.0, "vision": 1.0, "pension": 2.0, "hsa": 2.0, "fsa": 2.0,
+        "wellness": 1.0, "enrollment": 1.5, "stock option": 1.5,
+    },
+    "compliance": {
+        "compliance": 2.0, "legal": 1.5, "law": 1.0, "regulation": 2.0, "regulatory": 2.0,
+        "audit": 2.0, "harassment": 2.0, "discrimination": 2.0, "gdpr": 2.0, "osha": 2.0,
+        "whistleblower": 2.0,
+    },
+}
+
+URGENCY_TERMS = ("urgent", "urgently", "emergency", "asap", "immediate", "immediately", "critical")
+
+
+class Classification(NamedTuple):
+    category: str
+    urgent: bool
+    scores: Dict[str, float]
+    matches: Tuple[str, ...]
+
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def words(text: str) -> List[str]:
+    """Lowercase words; parentheses are dropped so "401(k)" reads as "401k"."""
+    return _WORD_RE.findall(text.lower().replace("(", "").replace(")", ""))
+
+
+class QueryCategorizer:
+    """
+    One-pass weighted keyword classifier over whole words. Plural "s"/"es"
+    forms of every term are recognised.
+    """
+
+    def __init__(
+        self,
+        category_terms: Optional[Dict[str, Dict[str, float]]] = None,
+        urgency_terms: Sequence[str] = URGENCY_TERMS,
+        classifier: Optional[Callable[[str], Optional[str]]] = None,
+        default: str = "general",
+    ):
+        category_terms = category_terms if category_terms is not None else CATEGORY_TERMS
+        self.default = default
+        self.classifier = classifier
+        self._order = {c: i for i, c in enumerate(CATEGORY_ORDER)}
+
+        # canonical term -> (category or None for urgency, weight)
+        terms: Dict[Tuple[str, ...], Tuple[Optional[str], float]] = {}
+        for category, weighted in category_terms.items():
+            for term, weight in weighted.items():
+                key = tuple(words(term))
+                if key in terms and terms[key][0] != category:
+                    raise ValueError(f"Term {term!r} is assigned to more than one category")
+                terms[key] = (category, weight)
+        for term in urgency_terms:
+            terms.setdefault(tuple(words(term)), (None, 0.0))
+
+        # Single words: exact forms first so they win over another term's plural.
+        self._words: Dict[str, Tuple[str, Optional[str], float]] = {}
+        # Phrases, indexed by first word: [(word tuple, canonical, category, weight)]
+        self._phrases: Dict[str, List[Tuple[Tuple[str, ...], str, Optional[str], float]]] = {}
+        for suffix in ("", "s", "es"):
+            for key, (category, weight) in terms.items():
+                canonical = " ".join(key)
+                form = key[:-1] + (key[-1] + suffix,)
+                if len(key) == 1:
+                    self._words.setdefault(form[0], (canonical, category, weight))
+                else:
+                    self._phrases.setdefault(form[0], []).append((form, canonical, category, weight))
+
+    def classify(self, query: str) -> Classification:
+        scores: Dict[str, float] = {}
+        matches: List[str] = []
+        urgent = False
+        tokens = words(query)
+        hits = [self._words[w] for w in tokens if w in self._words]
+        if not self._phrases.keys().isdisjoint(tokens):
+            for i, word in enumerate(tokens):
+                for form, canonical, category, weight in self._phrases.get(word, ()):
+                    if tuple(tokens[i:i + len(form)]) == form:
+                        hits.append((canonical, category, weight))
+        for canonical, category, weight in hits:
+            matches.append(canonical)
+            if category is None:
+                urgent = True
+            else:
+                scores[category] = scores.get(category, 0.0) + weight
+
+        if scores:
+            category = min(scores, key=lambda c: (-scores[c], self._order.get(c, len(self._order))))
+        else:
+            category = None
+            if self.classifier is not None:
+                try:
+                    category = self.classifier(query)
+                except Exception as e:
+                    print(f"Query classifier failed: {e}")
+            category = category or self.default
+        return Classification(category, urgent, scores, tuple(matches))
+
+
+class EmbeddingClassifier:
+    """
+    Nearest-centroid classifier over example queries per category, for
+    use as QueryCategorizer(classifier=...). Returns None below
+    `min_similarity` so the categorizer falls back to its default.
+    """
+
+    def __init__(self, embeddings, examples: Dict[str, Sequence[str]], min_similarity: float = 0.3):
+        self.embeddings = embeddings
+        self.min_similarity = min_similarity
+        self._centroids: List[Tuple[str, List[float]]] = []
+        for category, texts in examples.items():
+            vectors = embeddings.embed_documents(list(texts))
+            centroid = [sum(col) / len(vectors) for col in zip(*vectors)]
+            self._centroids.append((category, _normalise(centroid)))
+
+    def __call__(self, query: str) -> Optional[str]:
+        q = _normalise(self.embeddings.embed_query(query))
+        best, best_sim = None, self.min_similarity
+        for category, centroid in self._centroids:
+            sim = sum(a * b for a, b in zip(q, centroid))
+            if sim >= best_sim:
+                best, best_sim = category, sim
+        return best
+
+
+def _normalise(vec: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+CATEGORIZER = QueryCategorizer()
+
+
+def classify(query: str) -> Classification:
+    return CATEGORIZER.classify(query)
@@ -0,0 +1,165 @@
+"""
+Follow-up question condensation for conversational retrieval.
+
+A follow-up like "what about for contractors?" retrieves poorly on its
+own. QueryCondenser rewrites it into a standalone retrieval query using
+the recent conversation, either with a cheap local heuristic or with the
+LLM, and caches the result. History is trimmed to a token budget first.
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+from utils.metrics import estimate_tokens
+from utils.prompts import PROMPTS
+
+FOLLOW_UP_PREFIXES = (
+    "what about", "how about", "and ", "also", "what if", "same for", "is that", "does that",
+    "does it", "is it", "can they", "do they", "why", "how so", "then ", "but ",
+)
+REFERRING_WORDS = {"it", "that", "this", "those", "these", "they", "them", "their", "there", "same", "above"}
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "to", "of", "in", "on", "for", "and", "or",
+    "what", "how", "do", "does", "did", "i", "we", "our", "you", "your", "my", "me", "can", "could",
+    "should", "would", "will", "about", "with", "at", "by", "from", "as", "it", "that", "this", "there",
+    "please", "explain", "tell", "any", "if", "then", "but", "so", "also", "they", "them", "their",
+    "many", "much", "get", "gets", "have", "has", "need", "long", "when", "where", "which", "who",
+}
+_WORD_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9'-]*")
+
+PROMPTS.register(
+    "condense_query",
+    prefix=(
+        "Rewrite the final user question as a single standalone question that can be understood "
+        "without the conversation. Keep names, policies and numbers. Reply with the question only.\n\n"
+    ),
+    body="Conversation:\n{history}\n\nFinal question: {question}\n\nStandalone question:",
+)
+
+
+def _turn_pair(turn) -> Tuple[str, str]:
+    return turn[0], turn[1]
+
+
+def trim_history(turns: Sequence, max_tokens: int = 600, max_answer_chars: int = 400) -> List[Tuple[str, str]]:
+    """
+    Most recent (question, answer) pairs that fit in `max_tokens`,
+    oldest first. Long answers are truncated before counting.
+    """
+    kept: List[Tuple[str, str]] = []
+    budget = max_tokens
+    for turn in reversed(list(turns)):
+        q, a = _turn_pair(turn)
+        if len(a) > max_answer_chars:
+            a = a[:max_answer_chars].rsplit(" ", 1)[0] + " …"
+        cost = estimate_tokens(q) + estimate_tokens(a)
+        if cost > budget:
+            break
+        kept.append((q, a))
+        budget -= cost
+    kept.reverse()
+    return kept
+
+
+def format_history(pairs: Sequence[Tuple[str, str]]) -> str:
+    return "\n".join(f"User: {q}\nAssistant: {a}" for q, a in pairs)
+
+
+def _keywords(text: str) -> List[str]:
+    seen = []
+    for w in _WORD_RE.findall(text):
+        lw = w.lower()
+        if lw not in STOPWORDS and len(lw) > 2 and lw not in seen:
+            seen.append(lw)
+    return seen
+
+
+def is_follow_up(question: str) -> bool:
+    q = question.strip().lower()
+    if q.startswith(FOLLOW_UP_PREFIXES):
+        return True
+    words = [w.lower() for w in _WORD_RE.findall(q)]
+    if len(words) <= 4:
+        return True
+    return any(w in REFERRING_WORDS for w in words[:4])
+
+
+class QueryCondenser:
+    """
+    Turn (history, question) into a standalone retrieval query.
+
+    mode="heuristic" appends salient terms from the previous user
+    question to follow-ups without any model call; mode="llm" asks the
+    LLM to rewrite the question and falls back to the heuristic on error.
+    """
+
+    def __init__(self, llm=None, mode: str = "heuristic", max_history_tokens: int = 600, cache_size: int = 512):
+        self.llm = llm
+        self.mode = mode
+        self.max_history_tokens = max_history_tokens
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cache_key(self, question: str, pairs) -> str:
+        h = hashlib.sha1()
+        h.update(self.mode.encode())
+        for q, a in pairs:
+            h.update(q.encode("utf-8"))
+            h.update(b"\x00")
+            h.update(a.encode("utf-8"))
+            h.update(b"\x01")
+        h.update(question.encode("utf-8"))
+        return h.hexdigest()
+
+    def heuristic(self, question: str, pairs: Sequence[Tuple[str, str]]) -> str:
+        if not pairs or not is_follow_up(question):
+            return question
+        present = set(_keywords(question))
+        carried = [w for w in _keywords(pairs[-1][0]) if w not in present][:8]
+        if not carried:
+            return question
+        return f"{question.strip()} (regarding: {' '.join(carried)})"
+
+    def _llm_condense(self, question: str, pairs: Sequence[Tuple[str, str]]) -> str:
+        prompt = PROMPTS.render("condense_query", history=format_history(pairs), question=question)
+        resp = self.llm.invoke(prompt.text)
+        lines = getattr(resp, "content", str(resp)).strip().splitlines()
+        text = lines[0].strip().strip('"').strip() if lines else ""
+        return text or question
+
+    def condense(self, question: str, history: Optional[Sequence] = None) -> str:
+        question = question.strip()
+        if not history or not question:
+            return question
+        pairs = trim_history(history, self.max_history_tokens)
+        if not pairs:
+            return question
+
+        key = self._cache_key(question, pairs)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        if self.mode == "llm" and self.llm is not None and is_follow_up(question):
+            try:
+                result = self._llm_condense(question, pairs)
+            except Exception as e:
+                print(f"Query condensation failed, using heuristic: {e}")
+                result = self.heuristic(question, pairs)
+        else:
+            result = self.heuristic(question, pairs)
+
+        with self._lock:
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
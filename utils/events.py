@@ -0,0 +1,349 @@
+"""
+Append-only analytics event store.
+
+Agents call record(), which only enqueues the event; a daemon thread
+drains the queue and inserts batches into SQLite (WAL mode), so writes
+never add latency to the agent call path. Reads are indexed time-range
+queries over (kind, ts).
+
+The writer also maintains per-minute/hour/day rollups (count, sum, min,
+max) and value histograms in the same transaction, so dashboards read a
+few hundred pre-aggregated rows however much raw history accumulates.
+"""
+import atexit
+import json
+import math
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from utils.storage import connect, storage_path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    session_id TEXT,
+    value REAL,
+    payload TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_kind_ts ON events (kind, ts);
+CREATE INDEX IF NOT EXISTS idx_events_ts ON events (ts);
+CREATE TABLE IF NOT EXISTS rollups (
+    granularity TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    value_count INTEGER NOT NULL,
+    sum REAL NOT NULL,
+    min REAL,
+    max REAL,
+    PRIMARY KEY (granularity, kind, bucket)
+);
+CREATE TABLE IF NOT EXISTS rollup_histograms (
+    granularity TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    bin INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (granularity, kind, bucket, bin)
+);
+"""
+
+GRANULARITIES = {"minute": 60, "hour": 3600, "day": 86400}
+# Minute rollups are only useful for recent activity.
+MINUTE_RETENTION_SECONDS = 2 * 86400
+
+# How event values are binned for distributions/percentiles.
+HISTOGRAM_KINDS = {
+    "hr_query": "latency",
+    "screening": "score",
+    "interview_eval": "score",
+    "interview_session": "score",
+}
+LATENCY_BASE = 0.01
+LATENCY_GROWTH = 1.25
+MAX_LATENCY_BIN = 60
+
+
+def value_bin(kind: str, value: float) -> Optional[int]:
+    """Histogram bin for a value: log-spaced for latency, half points for scores."""
+    mode = HISTOGRAM_KINDS.get(kind)
+    if mode is None or value is None:
+        return None
+    if mode == "latency":
+        if value <= LATENCY_BASE:
+            return 0
+        return min(MAX_LATENCY_BIN, int(math.log(value / LATENCY_BASE, LATENCY_GROWTH)) + 1)
+    return int(round(value * 2))
+
+
+def bin_value(kind: str, b: int) -> float:
+    """Representative value of a histogram bin."""
+    if HISTOGRAM_KINDS.get(kind) == "latency":
+        return LATENCY_BASE * LATENCY_GROWTH ** max(0, b - 0.5)
+    return b / 2
+
+
+def bucket_start(ts: float, seconds: int) -> int:
+    """Bucket aligned to local time (so days start at local midnight)."""
+    offset = time.localtime(ts).tm_gmtoff
+    return int((ts + offset) // seconds * seconds - offset)
+
+
+class EventStore:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        batch_size: int = 500,
+        flush_interval: float = 0.5,
+        max_queue: int = 100_000,
+    ):
+        self.path = path or storage_path("events.db")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._conn = connect(self.path)
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self.version = 0
+        if self._needs_backfill():
+            self.rebuild_rollups()
+        self._stop = threading.Event()
+        self._writer = threading.Thread(target=self._run, name="event-store-writer", daemon=True)
+        self._writer.start()
+
+    # -- writes ------------------------------------------------------------
+
+    def record(self, kind: str, value: Optional[float] = None, session_id: Optional[str] = None,
+               ts: Optional[float] = None, **payload: Any) -> None:
+        """Enqueue an event; never blocks. Drops (and counts) on overflow."""
+        event = (ts if ts is not None else time.time(), kind, session_id, value,
+                 json.dumps(payload, default=str) if payload else None)
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self, first) -> List[tuple]:
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[tuple]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO events (ts, kind, session_id, value, payload) VALUES (?, ?, ?, ?, ?)",
+                batch,
+            )
+            self._apply_rollups(batch)
+            self._batches += 1
+            if self._batches % 100 == 0:
+                self._conn.execute(
+                    "DELETE FROM rollups WHERE granularity = 'minute' AND bucket < ?",
+                    (time.time() - MINUTE_RETENTION_SECONDS,),
+                )
+                self._conn.execute(
+                    "DELETE FROM rollup_histograms WHERE granularity = 'minute' AND bucket < ?",
+                    (time.time() - MINUTE_RETENTION_SECONDS,),
+                )
+            self._conn.commit()
+            self.version += 1
+
+    def _apply_rollups(self, batch) -> None:
+        """Fold a batch of (ts, kind, session_id, value, payload) rows into the rollup tables."""
+        totals: Dict[tuple, list] = {}
+        bins: Dict[tuple, int] = {}
+        for ts, kind, _, value, _ in batch:
+            for name, seconds in GRANULARITIES.items():
+                key = (name, kind, bucket_start(ts, seconds))
+                agg = totals.get(key)
+                if agg is None:
+                    agg = totals[key] = [0, 0, 0.0, None, None]
+                agg[0] += 1
+                if value is not None:
+                    agg[1] += 1
+                    agg[2] += value
+                    agg[3] = value if agg[3] is None else min(agg[3], value)
+                    agg[4] = value if agg[4] is None else max(agg[4], value)
+                b = value_bin(kind, value)
+                if b is not None:
+                    bins[key + (b,)] = bins.get(key + (b,), 0) + 1
+
+        self._conn.executemany(
+            "INSERT INTO rollups (granularity, kind, bucket, count, value_count, sum, min, max)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (granularity, kind, bucket) DO UPDATE SET"
+            " count = count + excluded.count,"
+            " value_count = value_count + excluded.value_count,"
+            " sum = sum + excluded.sum,"
+            " min = CASE WHEN min IS NULL OR excluded.min < min THEN excluded.min ELSE min END,"
+            " max = CASE WHEN max IS NULL OR excluded.max > max THEN excluded.max ELSE max END",
+            [key + tuple(agg) for key, agg in totals.items()],
+        )
+        self._conn.executemany(
+            "INSERT INTO rollup_histograms (granularity, kind, bucket, bin, count) VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT (granularity, kind, bucket, bin) DO UPDATE SET count = count + excluded.count",
+            [key + (n,) for key, n in bins.items()],
+        )
+
+    def _needs_backfill(self) -> bool:
+        with self._lock:
+            has_events = self._conn.execute("SELECT 1 FROM events LIMIT 1").fetchone()
+            has_rollups = self._conn.execute("SELECT 1 FROM rollups LIMIT 1").fetchone()
+        return bool(has_events) and not has_rollups
+
+    def rebuild_rollups(self, chunk: int = 10_000) -> None:
+        """Recompute all rollups from raw events (e.g. for a pre-rollup database)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM rollups")
+            self._conn.execute("DELETE FROM rollup_histograms")
+            cursor = self._conn.execute("SELECT ts, kind, session_id, value, payload FROM events ORDER BY id")
+            cutoff = time.time() - MINUTE_RETENTION_SECONDS
+            while True:
+                rows = cursor.fetchmany(chunk)
+                if not rows:
+                    break
+                self._apply_rollups(rows)
+            self._conn.execute("DELETE FROM rollups WHERE granularity = 'minute' AND bucket < ?", (cutoff,))
+            self._conn.execute("DELETE FROM rollup_histograms WHERE granularity = 'minute' AND bucket < ?", (cutoff,))
+            self._conn.commit()
+            self.version += 1
+
+    def _run(self) -> None:
+        while not self._stop.is_set() or not self._queue.empty():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = self._drain(first)
+            try:
+                self._write(batch)
+            except Exception as e:
+                print(f"Event store write failed ({len(batch)} events): {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self) -> None:
+        """Block until every queued event has been written."""
+        self._queue.join()
+
+    def close(self) -> None:
+        self._stop.set()
+        self._writer.join(timeout=5)
+        with self._lock:
+            self._conn.close()
+
+    # -- reads -------------------------------------------------------------
+
+    def query(self, kind: Optional[str] = None, start: Optional[float] = None, end: Optional[float] = None,
+              session_id: Optional[str] = None, limit: Optional[int] = None,
+              newest_first: bool = False) -> List[Dict[str, Any]]:
+        sql = "SELECT ts, kind, session_id, value, payload FROM events WHERE 1=1"
+        params: list = []
+        if kind is not None:
+            sql += " AND kind = ?"
+            params.append(kind)
+        if start is not None:
+            sql += " AND ts >= ?"
+            params.append(start)
+        if end is not None:
+            sql += " AND ts < ?"
+            params.append(end)
+        if session_id is not None:
+            sql += " AND session_id = ?"
+            params.append(session_id)
+        sql += " ORDER BY ts DESC" if newest_first else " ORDER BY ts"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {"ts": ts, "kind": k, "session_id": sid, "value": v, **(json.loads(p) if p else {})}
+            for ts, k, sid, v, p in rows
+        ]
+
+    def count(self, kind: str, start: Optional[float] = None, end: Optional[float] = None) -> int:
+        sql = "SELECT COUNT(*) FROM events WHERE kind = ? AND ts >= ? AND ts < ?"
+        with self._lock:
+            return self._conn.execute(sql, (kind, start or 0, end or float("inf"))).fetchone()[0]
+
+    def series(self, kind: str, start: float, end: Optional[float] = None,
+               granularity: str = "day") -> List[Dict[str, Any]]:
+        """
+        Per-bucket count, sum, average, min and max of `value` for one
+        kind, read from the pre-aggregated rollups.
+        """
+        sql = (
+            "SELECT bucket, count, value_count, sum, min, max FROM rollups"
+            " WHERE granularity = ? AND kind = ? AND bucket >= ? AND bucket < ? ORDER BY bucket"
+        )
+        first = bucket_start(start, GRANULARITIES[granularity])
+        with self._lock:
+            rows = self._conn.execute(sql, (granularity, kind, first, end or float("inf"))).fetchall()
+        return [
+            {"bucket_start": b, "count": n, "sum": total, "avg": total / vn if vn else None,
+             "min": lo, "max": hi}
+            for b, n, vn, total, lo, hi in rows
+        ]
+
+    def distribution(self, kind: str, start: float, end: Optional[float] = None,
+                     granularity: str = "day") -> Dict[float, int]:
+        """Value histogram ({bin value: count}) over a time range."""
+        sql = (
+            "SELECT bin, SUM(count) FROM rollup_histograms"
+            " WHERE granularity = ? AND kind = ? AND bucket >= ? AND bucket < ? GROUP BY bin ORDER BY bin"
+        )
+        first = bucket_start(start, GRANULARITIES[granularity])
+        with self._lock:
+            rows = self._conn.execute(sql, (granularity, kind, first, end or float("inf"))).fetchall()
+        return {bin_value(kind, b): n for b, n in rows}
+
+    def percentiles(self, kind: str, start: float, end: Optional[float] = None,
+                    qs=(50, 95, 99), granularity: str = "hour") -> Dict[str, Optional[float]]:
+        """Approximate percentiles of `value` from the rollup histograms."""
+        dist = sorted(self.distribution(kind, start, end, granularity).items())
+        total = sum(n for _, n in dist)
+        out: Dict[str, Optional[float]] = {}
+        for q in qs:
+            if not total:
+                out[f"p{int(q)}"] = None
+                continue
+            target = total * q / 100.0
+            seen = 0
+            for value, n in dist:
+                seen += n
+                if seen >= target:
+                    out[f"p{int(q)}"] = value
+                    break
+        return out
+
+
+_store: Optional[EventStore] = None
+_store_lock = threading.Lock()
+
+
+def get_event_store() -> EventStore:
+    """Process-wide store shared by all Streamlit sessions."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = EventStore()
+                atexit.register(_store.close)
+    return _store
+
+
+def record(kind: str, value: Optional[float] = None, session_id: Optional[str] = None, **payload: Any) -> None:
+    get_event_store().record(kind, value=value, session_id=session_id, **payload)
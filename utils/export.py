@@ -0,0 +1,211 @@
+"""
+Streaming export writers for screening results and chat history.
+
+Rows are written one at a time (Parquet in small record batches) into a
+byte buffer, so exporting thousands of candidates never builds the row
+list or one giant string alongside the file. Callers that know their
+columns pass them as {name: type}: CSV and Parquet then have a fixed
+header/schema and nested values are written as JSON strings. deferred_export() wraps an
+export in a zero-argument callable for st.download_button, so the file
+is only built when the user clicks, not on every rerun.
+"""
+import csv
+import importlib.util
+import io
+import json
+from datetime import date, datetime
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional
+
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+# format name -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "JSONL": ("jsonl", "application/x-ndjson"),
+    "JSON": ("json", "application/json"),
+}
+if PARQUET_AVAILABLE:
+    EXPORT_FORMATS["Parquet"] = ("parquet", "application/vnd.apache.parquet")
+
+
+def _scalar(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple, set)):
+        return json.dumps(list(value), default=str)
+    return value
+
+
+def _cell(value: Any) -> Any:
+    """A flat cell value: nested dicts and lists become JSON strings."""
+    if isinstance(value, dict):
+        return json.dumps(value, default=str)
+    return _scalar(value)
+
+
+def flatten(row: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """Flatten nested dicts into dotted keys ({"a": {"b": 1}} -> {"a.b": 1})."""
+    out: Dict[str, Any] = {}
+    for key, value in row.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            out.update(flatten(value, f"{name}."))
+        else:
+            out[name] = _scalar(value)
+    return out
+
+
+def _text(fh: BinaryIO) -> io.TextIOWrapper:
+    return io.TextIOWrapper(fh, encoding="utf-8", newline="", write_through=True)
+
+
+def write_csv(rows: Iterable[Dict[str, Any]], fh: BinaryIO, fieldnames: Optional[List[str]] = None) -> int:
+    """
+    Stream rows as CSV. With `fieldnames`, those are the columns and
+    nested values are written as JSON; otherwise rows are flattened and
+    the columns come from the first row. Keys missing from later rows
+    are left blank, extra keys dropped.
+    """
+    text = _text(fh)
+    writer = None
+    n = 0
+    for row in rows:
+        flat = {k: _cell(row.get(k)) for k in fieldnames} if fieldnames else flatten(row)
+        if writer is None:
+            writer = csv.DictWriter(text, fieldnames=fieldnames or list(flat), extrasaction="ignore")
+            writer.writeheader()
+        writer.writerow(flat)
+        n += 1
+    text.detach()
+    return n
+
+
+def write_jsonl(rows: Iterable[Dict[str, Any]], fh: BinaryIO) -> int:
+    n = 0
+    for row in rows:
+        fh.write(json.dumps(row, default=str).encode("utf-8"))
+        fh.write(b"\n")
+        n += 1
+    return n
+
+
+def write_json_document(header: Dict[str, Any], rows: Iterable[Dict[str, Any]], fh: BinaryIO,
+                        rows_key: str = "rows") -> int:
+    """Write {**header, rows_key: [...]} without materialising the row list."""
+    fh.write(json.dumps(header, default=str)[:-1].encode("utf-8"))
+    fh.write(f'{", " if header else ""}"{rows_key}": ['.encode("utf-8"))
+    n = 0
+    for row in rows:
+        if n:
+            fh.write(b", ")
+        fh.write(json.dumps(row, default=str).encode("utf-8"))
+        n += 1
+    fh.write(b"]}")
+    return n
+
+
+def _batches(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch: List[Dict[str, Any]] = []
+    for row in rows:
+        batch.append({k: _cell(v) for k, v in row.items()})
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _infer_columns(batch: List[Dict[str, Any]]) -> Dict[str, type]:
+    """Column types seen in a batch; mixed or all-empty columns are strings."""
+    kinds: Dict[str, set] = {}
+    for row in batch:
+        for key, value in row.items():
+            seen = kinds.setdefault(key, set())
+            if value is not None:
+                seen.add(type(value))
+    columns = {}
+    for key, seen in kinds.items():
+        if seen <= {bool}:
+            kind = bool if seen else str
+        elif seen <= {int}:
+            kind = int
+        elif seen <= {int, float}:
+            kind = float
+        else:
+            kind = str
+        columns[key] = kind
+    return columns
+
+
+def _convert(value: Any, kind: type) -> Any:
+    if value is None:
+        return None
+    if kind is str and not isinstance(value, str):
+        return json.dumps(value, default=str)
+    return kind(value)
+
+
+def write_parquet(rows: Iterable[Dict[str, Any]], fh: BinaryIO, columns: Optional[Dict[str, type]] = None,
+                  batch_size: int = 1000) -> int:
+    """
+    Stream rows into Parquet row groups of `batch_size` (requires
+    pyarrow). The schema is `columns` ({name: int, float, str or bool}),
+    or else inferred from the first batch, with columns that are empty
+    there typed as strings. Nested values are stored as JSON strings.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    arrow_types = {int: pa.int64(), float: pa.float64(), str: pa.string(), bool: pa.bool_()}
+    writer = None
+    schema = None
+    n = 0
+    try:
+        for batch in _batches(rows, batch_size):
+            if writer is None:
+                columns = columns or _infer_columns(batch)
+                schema = pa.schema([(name, arrow_types[kind]) for name, kind in columns.items()])
+                writer = pq.ParquetWriter(fh, schema)
+            data = {name: [_convert(row.get(name), kind) for row in batch] for name, kind in columns.items()}
+            writer.write_table(pa.Table.from_pydict(data, schema=schema))
+            n += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+    return n
+
+
+def export_rows(rows: Iterable[Dict[str, Any]], fmt: str, header: Optional[Dict[str, Any]] = None,
+                rows_key: str = "rows", columns: Optional[Dict[str, type]] = None) -> io.BytesIO:
+    """
+    Write rows in `fmt` (a key of EXPORT_FORMATS) to an in-memory
+    buffer, rewound and ready to hand to st.download_button. `columns`
+    fixes the CSV header and Parquet schema.
+    """
+    buf = io.BytesIO()
+    if fmt == "CSV":
+        write_csv(rows, buf, list(columns) if columns else None)
+    elif fmt == "JSONL":
+        write_jsonl(rows, buf)
+    elif fmt == "JSON":
+        write_json_document(header or {}, rows, buf, rows_key)
+    elif fmt == "Parquet":
+        write_parquet(rows, buf, columns)
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    buf.seek(0)
+    return buf
+
+
+def deferred_export(rows: Callable[[], Iterable[Dict[str, Any]]], fmt: str, header: Optional[Dict[str, Any]] = None,
+                    rows_key: str = "rows", columns: Optional[Dict[str, type]] = None) -> Callable[[], io.BytesIO]:
+    """
+    A download_button `data` callable: rows are fetched and written only
+    when the download is requested. It runs outside the script thread,
+    so `rows` must not read st.session_state.
+    """
+    return lambda: export_rows(rows(), fmt, header, rows_key, columns)
+
+
+def export_filename(stem: str, fmt: str) -> str:
+    return f"{stem}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{EXPORT_FORMATS[fmt][0]}"
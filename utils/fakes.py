@@ -0,0 +1,191 @@
+"""
+Deterministic local stand-ins for the Google embedding and chat models,
+and for Gemini's explicit context cache.
+
+They let the RAG pipeline run without an API key (benchmarks, evaluation,
+offline development) while still exercising FAISS and the LangChain
+message types.
+"""
+import hashlib
+import math
+import re
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Hashed bag-of-words embeddings. Texts sharing vocabulary land close
+    together, so retrieval quality is meaningful, and every vector is
+    reproducible across runs and processes.
+    """
+
+    def __init__(self, size: int = 256, latency: float = 0.0, per_text_latency: float = 0.0):
+        self.size = size
+        self.latency = latency
+        self.per_text_latency = per_text_latency
+
+    def _embed(self, text: str) -> List[float]:
+        vec = [0.0] * self.size
+        for tok in _tokens(text):
+            h = zlib.crc32(tok.encode("utf-8"))
+            vec[h % self.size] += 1.0 if (h >> 16) & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        return [v / norm for v in vec]
+
+    def _sleep(self, n: int) -> None:
+        delay = self.latency + self.per_text_latency * n
+        if delay > 0:
+            time.sleep(delay)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self._sleep(len(texts))
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self._sleep(1)
+        return self._embed(text)
+
+
+def _prompt_text(messages: List[BaseMessage]) -> str:
+    return "\n".join(str(m.content) for m in messages)
+
+
+class FakeContextCache:
+    """
+    In-memory context cache backend for utils.rag.ContextCache. Handles
+    expire after their TTL like Gemini's; FakeChatModel(context_cache=...)
+    resolves them and reports the cached tokens in its usage metadata.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.created = 0
+        self.deleted = 0
+        self._contents: Dict[str, Tuple[str, str, float]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, model: str, content: str, ttl: float) -> str:
+        if self.latency > 0:
+            time.sleep(self.latency)
+        with self._lock:
+            self.created += 1
+            name = f"cachedContents/local-{self.created}"
+            self._contents[name] = (model, content, time.time() + ttl)
+        return name
+
+    def delete(self, name: str) -> None:
+        with self._lock:
+            if self._contents.pop(name, None) is None:
+                raise KeyError(f"Unknown cached content: {name}")
+            self.deleted += 1
+
+    def resolve(self, name: str, model: str) -> str:
+        with self._lock:
+            entry = self._contents.get(name)
+        if entry is None or entry[2] < time.time():
+            raise KeyError(f"Cached content not found or expired: {name}")
+        if entry[0] != model:
+            raise ValueError(f"Cached content {name} belongs to model {entry[0]}, not {model}")
+        return entry[1]
+
+    def active(self) -> int:
+        with self._lock:
+            return len(self._contents)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model that answers deterministically from the prompt.
+
+    `first_token_latency` is slept before the first token and
+    `tokens_per_second` throttles the rest (0 means unthrottled).
+    `responder` may map the prompt text to a custom reply.
+    """
+
+    model: str = "fake-chat"
+    first_token_latency: float = 0.0
+    tokens_per_second: float = 0.0
+    response_tokens: int = 48
+    responder: Optional[Callable[[str], str]] = None
+    context_cache: Optional[Any] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _reply(self, prompt: str) -> str:
+        if self.responder is not None:
+            return self.responder(prompt)
+        words = _tokens(prompt)
+        if not words:
+            return ""
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        start = digest[0] % len(words)
+        picked = [words[(start + i * 7) % len(words)] for i in range(self.response_tokens)]
+        return " ".join(picked)
+
+    def _usage(self, prompt: str, reply: str, cached: str = "") -> dict:
+        tokens_in = len(_tokens(prompt))
+        tokens_out = len(_tokens(reply))
+        usage = {"input_tokens": tokens_in, "output_tokens": tokens_out, "total_tokens": tokens_in + tokens_out}
+        if cached:
+            usage["input_token_details"] = {"cache_read": len(_tokens(cached))}
+        return usage
+
+    def _prompt(self, messages: List[BaseMessage], cached_content: Optional[str] = None) -> Tuple[str, str]:
+        """Full prompt text (cached prefix + messages) and the cached part."""
+        cached = ""
+        if cached_content:
+            if self.context_cache is None:
+                raise ValueError("cached_content given but the model has no context_cache")
+            cached = self.context_cache.resolve(cached_content, self.model)
+        return cached + _prompt_text(messages), cached
+
+    def _pieces(self, reply: str) -> Iterator[str]:
+        if self.first_token_latency > 0:
+            time.sleep(self.first_token_latency)
+        parts = re.findall(r"\S+\s*", reply) or [reply]
+        delay = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        for i, part in enumerate(parts):
+            if delay and i:
+                time.sleep(delay)
+            yield part
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        prompt, cached = self._prompt(messages, kwargs.get("cached_content"))
+        reply = "".join(self._pieces(self._reply(prompt)))
+        message = AIMessage(content=reply, usage_metadata=self._usage(prompt, reply, cached))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        prompt, cached = self._prompt(messages, kwargs.get("cached_content"))
+        reply = self._reply(prompt)
+        for part in self._pieces(reply):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=part))
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(prompt, reply, cached)))
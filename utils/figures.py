@@ -0,0 +1,61 @@
+"""
+Version-keyed cache for dashboard figures and the frames behind them.
+
+Every widget interaction reruns the whole script; charts whose data has
+not changed should not be rebuilt. Callers pass a key, the current data
+version (event store version, history version, ...) and a builder; the
+builder only runs when the version moved.
+
+A cache can also be given a `bucket` function (the current date for the
+analytics charts) whose value is part of every entry's version, so
+entries covering "the last N days" are rebuilt when the day rolls over
+even if no new data was written.
+"""
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Hashable, Optional
+
+
+class VersionedCache:
+    def __init__(self, max_entries: int = 64, bucket: Optional[Callable[[], Hashable]] = None):
+        self.max_entries = max_entries
+        self.bucket = bucket
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, version: Hashable, builder: Callable[[], Any]) -> Any:
+        if self.bucket is not None:
+            version = (self.bucket(), version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = builder()
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Figures built from process-wide data (the analytics event store), over day-aligned windows.
+SHARED_FIGURES = VersionedCache(bucket=date.today)
+
+
+def session_figures(state) -> VersionedCache:
+    """Per-session cache for figures built from session data."""
+    if "figure_cache" not in state:
+        state["figure_cache"] = VersionedCache(max_entries=16)
+    return state["figure_cache"]
@@ -0,0 +1,182 @@
+"""
+Handbook links for onboarding.
+
+Every onboarding stage (its title and info text) and every task in the
+compiled plans is matched against the document index once per index
+version: all texts are embedded in one batched call and searched in one
+FAISS query, and the top chunks per text are kept. The mapping is cached
+in memory and on disk keyed by (index version, embedding model), so
+rendering the onboarding page never runs a retrieval; sessions using
+different indexes each keep their own mapping. Texts the mapping
+doesn't cover yet (an AI-tailored plan's tasks) are matched in one more
+batch the first time they are shown, then cached with the rest.
+"""
+import hashlib
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+from utils.metrics import METRICS
+from utils.onboarding import OnboardingPlans, StagePlan, get_onboarding_plans
+from utils.storage import ScoreCache, model_name, storage_path, text_hash
+
+TOP_K = 3
+SNIPPET_CHARS = 280
+MAX_INDEXES = 8     # mappings kept in memory, one per (index version, embedding model)
+
+
+class HandbookLink(NamedTuple):
+    source: str
+    page: Optional[int]
+    snippet: str
+    score: float
+
+    @property
+    def label(self) -> str:
+        return f"{self.source} (p. {self.page + 1})" if self.page is not None else self.source
+
+
+def index_version(vectorstore) -> str:
+    """Identifies an index's contents: rebuilding changes it, reloading the same index from disk doesn't."""
+    ids = vectorstore.index_to_docstore_id
+    digest = hashlib.sha256(str(vectorstore.index.ntotal).encode("utf-8"))
+    for i in range(len(ids)):
+        digest.update(ids[i].encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def stage_query(plan: StagePlan) -> str:
+    return f"{plan.title}. {plan.info}"
+
+
+def _link(doc, score: float) -> Dict:
+    meta = doc.metadata or {}
+    source = meta.get("source_file") or os.path.basename(str(meta.get("source", ""))) or "Document"
+    snippet = " ".join(doc.page_content.split())
+    if len(snippet) > SNIPPET_CHARS:
+        snippet = snippet[:SNIPPET_CHARS].rsplit(" ", 1)[0] + "…"
+    page = meta.get("page")
+    return {"source": source, "page": page if isinstance(page, int) else None,
+            "snippet": snippet, "score": round(float(score), 4)}
+
+
+def embed_queries(embeddings, texts: Sequence[str]) -> List[List[float]]:
+    """
+    Query-side embeddings for `texts`: one batched call with the
+    retrieval-query task type for Gemini, embed_query() per text otherwise.
+    """
+    if isinstance(embeddings, GoogleGenerativeAIEmbeddings):
+        return embeddings.embed_documents(list(texts), task_type="RETRIEVAL_QUERY")
+    return [embeddings.embed_query(t) for t in texts]
+
+
+def search_batch(vectorstore, texts: Sequence[str], k: int = TOP_K) -> List[List[Dict]]:
+    """Top-k chunks for each text: one query-embedding batch and one FAISS search for all of them."""
+    if not texts or vectorstore.index.ntotal == 0:
+        return [[] for _ in texts]
+    with METRICS.time("handbook_links"):
+        vectors = np.asarray(embed_queries(vectorstore.embeddings, texts), dtype=np.float32)
+        if getattr(vectorstore, "_normalize_L2", False):
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        distances, indices = vectorstore.index.search(vectors, min(k, vectorstore.index.ntotal))
+    relevance = vectorstore._select_relevance_score_fn()
+    results = []
+    for row_distances, row_indices in zip(distances, indices):
+        links = []
+        for distance, i in zip(row_distances, row_indices):
+            if i < 0:
+                continue
+            doc = vectorstore.docstore.search(vectorstore.index_to_docstore_id[i])
+            if hasattr(doc, "page_content"):
+                links.append(_link(doc, relevance(distance)))
+        results.append(links)
+    return results
+
+
+class HandbookLinks:
+    """Precomputed text -> top handbook chunks, per (index version, embedding model)."""
+
+    def __init__(self, plans: OnboardingPlans, cache: Optional[ScoreCache] = None, k: int = TOP_K):
+        self.plans = plans
+        self.k = k
+        self.cache = cache or ScoreCache(path=storage_path("onboarding_cache.db"), max_entries=MAX_INDEXES,
+                                         table="handbook_links", key_columns=("index_version", "model"))
+        self._lock = threading.Lock()
+        # vectorstore -> (size, key), so an index's version is hashed once, not on every render
+        self._keys: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._mappings: "OrderedDict[Tuple[str, str], Dict[str, List[Dict]]]" = OrderedDict()
+
+    def plan_texts(self) -> List[str]:
+        """Stage queries and tasks across every compiled role/department plan, deduplicated."""
+        texts = {}
+        for role in self.plans.roles:
+            for department in self.plans.departments:
+                for stage in self.plans.stages:
+                    plan = self.plans.get(role, department, stage)
+                    texts[stage_query(plan)] = None
+                    texts.update(dict.fromkeys(plan.tasks))
+        return list(texts)
+
+    def _key(self, vectorstore) -> Tuple[str, str]:
+        known = self._keys.get(vectorstore)
+        if known is not None and known[0] == vectorstore.index.ntotal:
+            return known[1]
+        # ":query" marks mappings built from query-task embeddings
+        key = (index_version(vectorstore), f"{model_name(vectorstore.embeddings)}:query")
+        self._keys[vectorstore] = (vectorstore.index.ntotal, key)
+        return key
+
+    def _load(self, vectorstore) -> Tuple[Tuple[str, str], Dict[str, List[Dict]]]:
+        """The mapping for this index, computing it if it isn't cached in memory or on disk. Caller holds the lock."""
+        key = self._key(vectorstore)
+        links = self._mappings.get(key)
+        if links is None:
+            links = self.cache.get(key)
+            if links is None:
+                links = self._match(vectorstore, self.plan_texts(), {})
+                self.cache.put(key, links)
+            self._mappings[key] = links
+            while len(self._mappings) > MAX_INDEXES:
+                self._mappings.popitem(last=False)
+        self._mappings.move_to_end(key)
+        return key, links
+
+    def _match(self, vectorstore, texts: Sequence[str], links: Dict[str, List[Dict]]) -> Dict[str, List[Dict]]:
+        missing = list(dict.fromkeys(t for t in texts if text_hash(t) not in links))
+        if missing:
+            links = dict(links)
+            for text, hits in zip(missing, search_batch(vectorstore, missing, self.k)):
+                links[text_hash(text)] = hits
+        return links
+
+    def precompute(self, vectorstore) -> int:
+        """Build (or load) the mapping for `vectorstore`. Returns the number of texts covered."""
+        with self._lock:
+            return len(self._load(vectorstore)[1])
+
+    def for_stage(self, vectorstore, plan: StagePlan) -> Tuple[List[HandbookLink], Dict[str, List[HandbookLink]]]:
+        """(links for the stage, task -> links) for one compiled stage plan."""
+        texts = [stage_query(plan), *plan.tasks]
+        with self._lock:
+            key, links = self._load(vectorstore)
+            if any(text_hash(t) not in links for t in texts):
+                links = self._mappings[key] = self._match(vectorstore, texts, links)
+                self.cache.put(key, links)
+        stage_links = [HandbookLink(**hit) for hit in links[text_hash(texts[0])]]
+        task_links = {task: [HandbookLink(**hit) for hit in links[text_hash(task)]] for task in plan.tasks}
+        return stage_links, task_links
+
+
+_links: Optional[HandbookLinks] = None
+
+
+def get_handbook_links() -> HandbookLinks:
+    global _links
+    if _links is None:
+        _links = HandbookLinks(get_onboarding_plans())
+    return _links
@@ -0,0 +1,166 @@
+"""
+Bounded chat history for a Streamlit session.
+
+The most recent `window` turns stay in memory; older turns are spilled
+to a shared SQLite file keyed by session id. Running totals keep len()
+and average-length metrics O(1), so rerun cost does not grow with the
+conversation.
+
+Streamlit gives no signal when a session ends, so spilled turns of
+sessions idle for longer than HR_CHAT_RETENTION_HOURS are pruned each
+time a session opens the file; clear() drops the session's own rows.
+"""
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Iterator, List, NamedTuple, Optional
+
+from utils.storage import connect, storage_path
+
+DEFAULT_WINDOW = int(os.getenv("HR_CHAT_WINDOW", "50"))
+RETENTION_SECONDS = float(os.getenv("HR_CHAT_RETENTION_HOURS", "24")) * 3600
+
+
+class ChatTurn(NamedTuple):
+    question: str
+    answer: str
+    timestamp: float
+    agent: str = ""
+
+
+class ChatHistory:
+    def __init__(self, session_id: str, window: int = DEFAULT_WINDOW, path: Optional[str] = None,
+                 retention: float = RETENTION_SECONDS):
+        self.session_id = session_id
+        self.window = max(1, window)
+        self.retention = retention
+        self.path = path or storage_path("chat_history.db")
+        self._recent: deque = deque()
+        self.version = 0
+        self._count = 0
+        self._spilled = 0
+        self.question_chars = 0
+        self.answer_chars = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = connect(self.path)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chat_turns ("
+                " session_id TEXT NOT NULL, seq INTEGER NOT NULL,"
+                " question TEXT, answer TEXT, timestamp REAL, agent TEXT,"
+                " PRIMARY KEY (session_id, seq))"
+            )
+            self._conn.execute("DELETE FROM chat_turns WHERE session_id = ?", (self.session_id,))
+            self._prune(time.time() - self.retention)
+            self._conn.commit()
+        return self._conn
+
+    def _prune(self, cutoff: float) -> None:
+        """Drop spilled turns of other sessions whose latest spilled turn is older than `cutoff`."""
+        self._conn.execute(
+            "DELETE FROM chat_turns WHERE session_id IN ("
+            " SELECT session_id FROM chat_turns GROUP BY session_id HAVING MAX(timestamp) < ?)"
+            " AND session_id != ?",
+            (cutoff, self.session_id),
+        )
+
+    def append(self, question: str, answer: str, agent: str = "") -> ChatTurn:
+        turn = ChatTurn(question, answer, time.time(), agent)
+        with self._lock:
+            self._recent.append(turn)
+            self.version += 1
+            self._count += 1
+            self.question_chars += len(question)
+            self.answer_chars += len(answer)
+            if len(self._recent) > self.window:
+                old = self._recent.popleft()
+                db = self._db()
+                db.execute(
+                    "INSERT INTO chat_turns VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.session_id, self._spilled, *old),
+                )
+                db.commit()
+                self._spilled += 1
+        return turn
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __bool__(self) -> bool:
+        return self._count > 0
+
+    def last(self) -> Optional[ChatTurn]:
+        return self._recent[-1] if self._recent else None
+
+    def avg_question_length(self) -> float:
+        return self.question_chars / self._count if self._count else 0.0
+
+    def avg_answer_length(self) -> float:
+        return self.answer_chars / self._count if self._count else 0.0
+
+    def _spilled_range(self, start: int, stop: int) -> List[ChatTurn]:
+        if stop <= start:
+            return []
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT question, answer, timestamp, agent FROM chat_turns"
+                " WHERE session_id = ? AND seq >= ? AND seq < ? ORDER BY seq",
+                (self.session_id, start, stop),
+            ).fetchall()
+        return [ChatTurn(*r) for r in rows]
+
+    def slice(self, start: int, stop: int) -> List[ChatTurn]:
+        """
+        Turns with absolute positions [start, stop), oldest first,
+        reading from disk only for positions outside the window.
+        """
+        start, stop = max(0, start), min(self._count, stop)
+        if stop <= start:
+            return []
+        turns = self._spilled_range(start, min(stop, self._spilled))
+        lo = max(start, self._spilled) - self._spilled
+        hi = stop - self._spilled
+        if hi <= 0:
+            return turns
+        return turns + list(self._recent)[lo:hi]
+
+    def recent(self, n: int) -> List[ChatTurn]:
+        """The last `n` turns, oldest first."""
+        return self.slice(self._count - n, self._count)
+
+    def page(self, page: int, page_size: int) -> List[ChatTurn]:
+        """Page 0 is the newest `page_size` turns."""
+        stop = self._count - page * page_size
+        return self.slice(stop - page_size, stop)
+
+    def page_count(self, page_size: int) -> int:
+        return max(1, -(-self._count // page_size))
+
+    def __iter__(self) -> Iterator[ChatTurn]:
+        """All turns, oldest first, streaming spilled turns from disk."""
+        batch = 500
+        for start in range(0, self._spilled, batch):
+            yield from self._spilled_range(start, min(start + batch, self._spilled))
+        yield from list(self._recent)
+
+    def nbytes(self) -> int:
+        """Approximate bytes held in memory (spilled turns excluded)."""
+        size = sys.getsizeof(self._recent)
+        for turn in self._recent:
+            size += sys.getsizeof(turn) + sum(sys.getsizeof(v) for v in turn)
+        return size
+
+    def clear(self) -> None:
+        with self._lock:
+            if self._spilled:
+                self._db().execute("DELETE FROM chat_turns WHERE session_id = ?", (self.session_id,))
+                self._db().commit()
+            self._recent.clear()
+            self.version += 1
+            self._count = self._spilled = 0
+            self.question_chars = self.answer_chars = 0
@@ -0,0 +1,365 @@
+"""
+Interview evaluation.
+
+Answers are scored on five rubric dimensions by the LLM, which replies
+with a JSON object matching ANSWER_SCHEMA. Scores are validated and
+clamped, and cached by (question hash, response hash, model), so
+evaluating the same answer again is free and always gives the same
+numbers. If the reply cannot be parsed, a deterministic local heuristic
+scores the answer instead (and nothing is cached).
+
+A session's answers can be scored together: the transcript is sent as
+one structured call that returns a JSON score object per answer, instead
+of one round-trip per answer. Long transcripts are split into batches,
+which run concurrently. Answers missing from the model's reply come back
+as None so the caller can evaluate them on their own.
+
+InterviewAggregate keeps running totals for a session (count, overall
+and per-dimension sums, best and worst answer), so the session report
+and final recommendation are O(1) however many answers were scored.
+"""
+import contextvars
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from utils.prompts import PROMPTS
+from utils.screening import terms
+from utils.storage import ScoreCache, model_name, storage_path, text_hash
+
+SCORE_DIMENSIONS = ("content", "communication", "problem_solving", "experience", "cultural_fit")
+DIMENSION_LABELS = {
+    "content": "Content",
+    "communication": "Communication",
+    "problem_solving": "Problem Solving",
+    "experience": "Experience",
+    "cultural_fit": "Cultural Fit",
+}
+FEEDBACK_KEYS = ("strengths", "improvements", "follow_up_questions", "red_flags")
+
+ANSWER_SCHEMA = {
+    "scores": {d: "integer 1-10" for d in SCORE_DIMENSIONS},
+    "strengths": ["string"],
+    "improvements": ["string"],
+    "follow_up_questions": ["string"],
+    "red_flags": ["string"],
+    "summary": "string, 2-3 sentences",
+}
+TRANSCRIPT_SCHEMA = {"answers": [{"index": "integer, the answer number", **ANSWER_SCHEMA}]}
+
+TRANSCRIPT_BATCH_SIZE = 10
+
+PROMPTS.register(
+    "interview_evaluation",
+    prefix=(
+        "As a Senior Technical Interviewer and HR Assessment Specialist, evaluate the candidate response "
+        "below.\n\n"
+        "Score it from 1 to 10 on each dimension:\n"
+        "- content: accuracy, depth and completeness of the answer\n"
+        "- communication: clarity, structure and articulation\n"
+        "- problem_solving: logical thinking and methodology\n"
+        "- experience: evidence of real-world application\n"
+        "- cultural_fit: values alignment and team compatibility\n\n"
+        "List strengths, areas for improvement, suggested follow-up questions and any red flags, and "
+        "summarise your overall assessment. Be consistent: the same answer must always receive the "
+        "same scores.\n\n"
+        "Respond with a single JSON object and nothing else, matching this schema:\n"
+        f"{json.dumps(ANSWER_SCHEMA, indent=2)}\n\n"
+    ),
+    body="QUESTION TYPE: {question_type}\nQUESTION: {question}\nCANDIDATE RESPONSE: {response}\n\nJSON:",
+)
+
+PROMPTS.register(
+    "interview_transcript",
+    prefix=(
+        "As a Senior Technical Interviewer and HR Assessment Specialist, evaluate every numbered "
+        "candidate answer in the interview transcript below, each on its own merits.\n\n"
+        "Score each answer from 1 to 10 on: content quality (accuracy, depth, completeness), "
+        "communication (clarity, structure), problem solving (logic, methodology), experience "
+        "(evidence of real-world application) and cultural fit (values, collaboration). Be "
+        "consistent: the same answer must always receive the same scores.\n\n"
+        "Respond with a single JSON object and nothing else, with one entry per answer, matching "
+        "this schema:\n"
+        f"{json.dumps(TRANSCRIPT_SCHEMA, indent=2)}\n\n"
+    ),
+    body="TRANSCRIPT:\n{transcript}\n\nJSON:",
+)
+
+
+class TranscriptItem(NamedTuple):
+    question: str
+    response: str
+    question_type: str = "technical"
+
+
+def format_transcript(items: Sequence[TranscriptItem]) -> str:
+    return "\n\n".join(
+        f"ANSWER {n}\nQUESTION TYPE: {item.question_type.upper()}\nQUESTION: {item.question}\n"
+        f"CANDIDATE RESPONSE: {item.response}"
+        for n, item in enumerate(items, 1)
+    )
+
+
+def _clamp_int(value: Any, low: int, high: int) -> int:
+    return max(low, min(high, int(round(float(value)))))
+
+
+def parse_answer(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Validate one answer's score object. Returns detailed_scores,
+    overall_score, summary and the feedback lists, or None when any
+    dimension score is missing.
+    """
+    try:
+        scores = data["scores"]
+        detailed = {d: _clamp_int(scores[d], 1, 10) for d in SCORE_DIMENSIONS}
+        result: Dict[str, Any] = {
+            "detailed_scores": detailed,
+            "overall_score": round(sum(detailed.values()) / len(detailed), 1),
+            "summary": str(data.get("summary", "")).strip(),
+        }
+        for key in FEEDBACK_KEYS:
+            items = data.get(key) or []
+            result[key] = [str(i) for i in items] if isinstance(items, list) else [str(items)]
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return None
+    return result
+
+
+def parse_evaluation(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse a single-answer reply. Tolerates code fences and surrounding
+    prose; returns None when the JSON or any dimension score is missing.
+    """
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end <= start:
+        return None
+    try:
+        data = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    return parse_answer(data) if isinstance(data, dict) else None
+
+
+def heuristic_scores(question: str, response: str) -> Dict[str, Any]:
+    """
+    Deterministic fallback when the LLM reply is unusable: scores follow
+    answer length and how much of the question's vocabulary it addresses.
+    """
+    words = len(response.split())
+    question_terms = set(terms(question))
+    overlap = len(question_terms & set(terms(response))) / len(question_terms) if question_terms else 0.0
+    depth = 3 if words < 20 else 5 if words < 60 else 6 if words < 150 else 7
+    relevance = round(overlap * 3)
+    detailed = {
+        "content": min(10, depth + relevance),
+        "communication": depth + (1 if 40 <= words <= 250 else 0),
+        "problem_solving": min(10, depth + relevance // 2),
+        "experience": depth,
+        "cultural_fit": 5,
+    }
+    return {
+        "detailed_scores": detailed,
+        "overall_score": round(sum(detailed.values()) / len(detailed), 1),
+        "summary": "Automatic scores based on answer length and relevance; the AI evaluation was unavailable.",
+        **{key: [] for key in FEEDBACK_KEYS},
+    }
+
+
+def parse_transcript_evaluation(text: str, count: int) -> List[Optional[Dict[str, Any]]]:
+    """
+    Parse a transcript reply into `count` answer evaluations, matched by
+    "index" (falling back to position). Unparseable answers are None.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * count
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end <= start:
+        return results
+    try:
+        answers = json.loads(text[start:end + 1])["answers"]
+    except (ValueError, TypeError, KeyError):
+        return results
+    if not isinstance(answers, list):
+        return results
+    for position, data in enumerate(answers):
+        if not isinstance(data, dict):
+            continue
+        try:
+            i = int(data.get("index", position + 1)) - 1
+        except (ValueError, TypeError):
+            i = position
+        if 0 <= i < count and results[i] is None:
+            results[i] = parse_answer(data)
+    return results
+
+
+def response_recommendation(score: float) -> str:
+    if score >= 8:
+        return "EXCELLENT - Strong candidate"
+    if score >= 7:
+        return "GOOD - Proceed to next round"
+    if score >= 6:
+        return "AVERAGE - Consider with reservations"
+    return "BELOW EXPECTATIONS - Not recommended"
+
+
+def final_recommendation(average: float) -> str:
+    if average >= 8:
+        return "STRONG HIRE - Excellent candidate"
+    if average >= 7:
+        return "HIRE - Good candidate with potential"
+    if average >= 6:
+        return "MAYBE - Consider with reservations"
+    return "NO HIRE - Does not meet requirements"
+
+
+def format_feedback(parsed: Dict[str, Any]) -> str:
+    """Markdown feedback for display."""
+    lines = [parsed["summary"]] if parsed.get("summary") else []
+    for key, title in (("strengths", "Strengths"), ("improvements", "Areas for improvement"),
+                       ("follow_up_questions", "Follow-up questions"), ("red_flags", "Red flags")):
+        if parsed.get(key):
+            lines.append(f"**{title}:**\n" + "\n".join(f"- {i}" for i in parsed[key]))
+    return "\n\n".join(lines)
+
+
+def evaluation_record(parsed: Dict[str, Any], item: TranscriptItem, scored_by: str = "llm",
+                      cached: bool = False) -> Dict[str, Any]:
+    """The evaluation dict the Interview Agent stores for an answer."""
+    return {
+        "overall_score": parsed["overall_score"],
+        "detailed_scores": parsed["detailed_scores"],
+        "evaluation": format_feedback(parsed),
+        "recommendation": response_recommendation(parsed["overall_score"]),
+        "question": item.question,
+        "question_type": item.question_type,
+        "scored_by": scored_by,
+        "cached": cached,
+    }
+
+
+_cache: Optional[ScoreCache] = None
+
+
+def get_evaluation_cache() -> ScoreCache:
+    global _cache
+    if _cache is None:
+        _cache = ScoreCache(path=storage_path("interview_cache.db"), table="interview_evaluations",
+                            key_columns=("question_hash", "response_hash", "model"))
+    return _cache
+
+
+def _cache_key(chain, item: TranscriptItem) -> Tuple[str, str, str]:
+    return text_hash(item.question), text_hash(item.response), model_name(chain.llm)
+
+
+def evaluate_response(chain, question: str, response: str, question_type: str = "technical",
+                      cache: Optional[ScoreCache] = None) -> Dict[str, Any]:
+    """
+    Score one answer: from the cache when this (question, response,
+    model) was seen before, else with one structured LLM call, falling
+    back to heuristic_scores() when the reply is unusable or there is no
+    chain (no documents loaded).
+    """
+    item = TranscriptItem(question, response, question_type)
+    if chain is None:
+        return evaluation_record(heuristic_scores(question, response), item, scored_by="heuristic")
+    cache = cache or get_evaluation_cache()
+    key = _cache_key(chain, item)
+    parsed = cache.get(key)
+    if parsed is not None:
+        return evaluation_record(parsed, item, cached=True)
+    try:
+        result = chain.complete("interview_evaluation", question_type=question_type.upper(),
+                                question=question, response=response)
+        parsed = parse_evaluation(result.get("result", ""))
+    except Exception as e:
+        print(f"Interview evaluation failed: {e}")
+    if parsed is None:
+        return evaluation_record(heuristic_scores(question, response), item, scored_by="heuristic")
+    cache.put(key, parsed)
+    return evaluation_record(parsed, item)
+
+
+def _evaluate_batch(chain, items: Sequence[TranscriptItem], cache: ScoreCache) -> List[Optional[Dict[str, Any]]]:
+    """Evaluations for one batch; all None when the call fails, so callers fall back per answer."""
+    try:
+        result = chain.complete("interview_transcript", transcript=format_transcript(items))
+    except Exception as e:
+        print(f"Transcript evaluation failed: {e}")
+        return [None] * len(items)
+    parsed = parse_transcript_evaluation(result.get("result", ""), len(items))
+    evaluations = []
+    for p, item in zip(parsed, items):
+        if p is not None:
+            cache.put(_cache_key(chain, item), p)
+        evaluations.append(evaluation_record(p, item) if p is not None else None)
+    return evaluations
+
+
+def evaluate_transcript(chain, items: Sequence[TranscriptItem], batch_size: int = TRANSCRIPT_BATCH_SIZE,
+                        cache: Optional[ScoreCache] = None) -> List[Optional[Dict[str, Any]]]:
+    """
+    Score every answer: cached answers are served from the cache, the
+    rest with one structured call per `batch_size` answers (batches run
+    concurrently, under the caller's LLM priority). Returns evaluations
+    in input order; None where the reply was unusable, the call failed
+    or there is no chain.
+    """
+    if chain is None:
+        return [None] * len(items)
+    cache = cache or get_evaluation_cache()
+    evaluations: List[Optional[Dict[str, Any]]] = []
+    todo: List[Tuple[int, TranscriptItem]] = []
+    for i, item in enumerate(items):
+        parsed = cache.get(_cache_key(chain, item))
+        evaluations.append(evaluation_record(parsed, item, cached=True) if parsed is not None else None)
+        if parsed is None:
+            todo.append((i, item))
+    batches = [todo[i:i + batch_size] for i in range(0, len(todo), batch_size)]
+    if len(batches) == 1:
+        results = [_evaluate_batch(chain, [item for _, item in batches[0]], cache)]
+    elif batches:
+        # Each worker runs in a copy of this context so llm_priority() applies there too.
+        with ThreadPoolExecutor(max_workers=min(len(batches), 4)) as pool:
+            futures = [pool.submit(contextvars.copy_context().run, _evaluate_batch, chain,
+                                   [item for _, item in batch], cache) for batch in batches]
+            results = [f.result() for f in futures]
+    else:
+        results = []
+    for batch, batch_results in zip(batches, results):
+        for (i, _), evaluation in zip(batch, batch_results):
+            evaluations[i] = evaluation
+    return evaluations
+
+
+class InterviewAggregate:
+    """Running totals over a session's evaluated answers."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.dimension_totals = {d: 0.0 for d in SCORE_DIMENSIONS}
+        self.best: Optional[float] = None
+        self.worst: Optional[float] = None
+
+    def add(self, evaluation: Dict[str, Any]) -> None:
+        score = evaluation["overall_score"]
+        self.count += 1
+        self.total += score
+        for d, value in evaluation.get("detailed_scores", {}).items():
+            if d in self.dimension_totals:
+                self.dimension_totals[d] += value
+        self.best = score if self.best is None else max(self.best, score)
+        self.worst = score if self.worst is None else min(self.worst, score)
+
+    @property
+    def average(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def dimension_averages(self) -> Dict[str, float]:
+        return {d: (v / self.count if self.count else 0.0) for d, v in self.dimension_totals.items()}
+
+    @property
+    def recommendation(self) -> str:
+        return final_recommendation(self.average)
@@ -1,9 +1,18 @@
 import os
+import tempfile
 from typing import List
 from langchain_core.documents import Document
 from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader, TextLoader
+from utils.metrics import METRICS
+from utils.telemetry import traced
 
+@traced("load_documents")
 def load_documents(data_dir: str = "data") -> List[Document]:
+    with METRICS.time("load_documents"):
+        return _load_documents(data_dir)
+
+
+def _load_documents(data_dir: str) -> List[Document]:
     docs: List[Document] = []
 
     if not os.path.exists(data_dir):
@@ -15,19 +24,8 @@ def load_documents(data_dir: str = "data") -> List[Document]:
         if not os.path.isfile(file_path):
             continue
 
-        ext = os.path.splitext(file_name)[1].lower()
-
         try:
-            if ext == ".pdf":
-                loader = PyPDFLoader(file_path)
-            elif ext in [".docx", ".doc"]:
-                loader = Docx2txtLoader(file_path)
-            elif ext in [".txt", ".md"]:
-                loader = TextLoader(file_path, encoding="utf-8")
-            else:
-                continue
-
-            file_docs = loader.load()
+            file_docs = load_file(file_path)
             for d in file_docs:
                 d.metadata["source_file"] = file_name
 
@@ -38,3 +36,36 @@ def load_documents(data_dir: str = "data") -> List[Document]:
 
     return docs
 
+
+def load_file(file_path: str) -> List[Document]:
+    """Load one PDF/DOCX/TXT/MD file; unsupported extensions yield []."""
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == ".pdf":
+        loader = PyPDFLoader(file_path)
+    elif ext in [".docx", ".doc"]:
+        loader = Docx2txtLoader(file_path)
+    elif ext in [".txt", ".md"]:
+        loader = TextLoader(file_path, encoding="utf-8")
+    else:
+        return []
+    return loader.load()
+
+
+def extract_text(file_name: str, data: bytes) -> str:
+    """
+    Plain text of an uploaded file (e.g. a resume) given its name and
+    raw bytes. Returns "" when the file cannot be read.
+    """
+    ext = os.path.splitext(file_name)[1].lower()
+    if ext in [".txt", ".md"]:
+        return data.decode("utf-8", errors="replace")
+    fd, path = tempfile.mkstemp(suffix=ext)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return "\n".join(d.page_content for d in load_file(path))
+    except Exception as e:
+        print(f"Error extracting text from {file_name}: {e}")
+        return ""
+    finally:
+        os.remove(path)
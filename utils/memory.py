@@ -0,0 +1,279 @@
+"""
+Memory accounting for Streamlit sessions and the worker process.
+
+Each session's footprint estimate (index, docstore, chat history and
+other cached state) is sampled at most once per FOOTPRINT_INTERVAL_SECONDS
+(or on demand from the admin panel) so an admin can see which session is
+holding memory without every rerun walking the whole session state.
+Allocation tracing (tracemalloc) runs only between an explicit start and
+stop, since it slows every allocation while on.
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import deque
+from collections.abc import Mapping
+from typing import Any, Dict, List, Optional
+
+# Session state keys accounted separately from "cached_objects".
+INDEX_KEYS = ("vectorstore", "qa_chain")
+HISTORY_KEYS = ("chat_history",)
+
+SESSION_TTL_SECONDS = 3600
+FOOTPRINT_INTERVAL_SECONDS = float(os.getenv("HR_FOOTPRINT_INTERVAL", "60"))
+
+_sessions: Dict[str, Dict[str, Any]] = {}
+# vectorstore -> (documents, bytes); entries go away with the index
+_docstore_cache: "weakref.WeakKeyDictionary[Any, tuple]" = weakref.WeakKeyDictionary()
+# Allocation tracing, between start_tracing() and stop_tracing() only.
+TRACE_FRAMES = 1
+_baseline: Optional[tracemalloc.Snapshot] = None
+_tracing_started = False
+_trace_lock = threading.Lock()
+_lock = threading.Lock()
+
+
+def deep_sizeof(obj: Any, seen: Optional[set] = None, max_depth: int = 12) -> int:
+    """
+    Approximate recursive size of plain Python containers and objects.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or max_depth < 0:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj, 0)
+
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+        return size
+    if isinstance(obj, Mapping):
+        for k, v in obj.items():
+            size += deep_sizeof(k, seen, max_depth - 1) + deep_sizeof(v, seen, max_depth - 1)
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        for item in obj:
+            size += deep_sizeof(item, seen, max_depth - 1)
+    elif hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), seen, max_depth - 1)
+    elif hasattr(obj, "__slots__"):
+        for slot in obj.__slots__:
+            if hasattr(obj, slot):
+                size += deep_sizeof(getattr(obj, slot), seen, max_depth - 1)
+    return size
+
+
+def _vectorstore_of(value: Any):
+    if value is None:
+        return None
+    if hasattr(value, "index") and hasattr(value, "docstore"):
+        return value
+    retriever = getattr(value, "retriever", None)
+    return getattr(retriever, "vectorstore", None)
+
+
+def index_bytes(vectorstore) -> int:
+    """Vector payload held by a FAISS index."""
+    index = getattr(vectorstore, "index", None)
+    if index is None:
+        return 0
+    code_size = getattr(index, "code_size", None) or index.d * 4
+    return int(index.ntotal) * int(code_size)
+
+
+def docstore_bytes(vectorstore) -> int:
+    """
+    Size of the chunk texts and metadata, cached per index size since
+    walking every document on each rerun would be wasteful.
+    """
+    docstore = getattr(vectorstore, "docstore", None)
+    docs = getattr(docstore, "_dict", None)
+    if not docs:
+        return 0
+    try:
+        cached = _docstore_cache.get(vectorstore)
+    except TypeError:  # not weak-referenceable
+        cached = None
+    if cached and cached[0] == len(docs):
+        return cached[1]
+    total = sum(
+        len(d.page_content.encode("utf-8")) + deep_sizeof(getattr(d, "metadata", {}))
+        for d in docs.values()
+    )
+    try:
+        _docstore_cache[vectorstore] = (len(docs), total)
+    except TypeError:
+        pass
+    return total
+
+
+FOOTPRINT_KEYS = ("index_bytes", "docstore_bytes", "history_bytes", "cached_objects_bytes", "total_bytes")
+
+
+def session_footprint(state: Mapping) -> Dict[str, int]:
+    """
+    Estimated bytes held by one session, broken down by category.
+    """
+    seen_stores = set()
+    idx = docs = 0
+    for key in INDEX_KEYS:
+        vs = _vectorstore_of(state.get(key))
+        if vs is not None and id(vs) not in seen_stores:
+            seen_stores.add(id(vs))
+            idx += index_bytes(vs)
+            docs += docstore_bytes(vs)
+
+    history = 0
+    for key in HISTORY_KEYS:
+        value = state.get(key)
+        if value is not None:
+            history += value.nbytes() if hasattr(value, "nbytes") else deep_sizeof(value)
+
+    cached = 0
+    seen: set = set()
+    for key in state.keys():
+        if key in INDEX_KEYS or key in HISTORY_KEYS:
+            continue
+        cached += deep_sizeof(state.get(key), seen)
+
+    return {
+        "index_bytes": idx,
+        "docstore_bytes": docs,
+        "history_bytes": history,
+        "cached_objects_bytes": cached,
+        "total_bytes": idx + docs + history + cached,
+    }
+
+
+def register_session(session_id: str, footprint: Dict[str, int], **info) -> None:
+    """Record the latest footprint for a session and drop stale ones."""
+    now = time.time()
+    with _lock:
+        _sessions[session_id] = {"session_id": session_id, "updated": now, "sampled": now, **info, **footprint}
+        for sid in [s for s, v in _sessions.items() if now - v["updated"] > SESSION_TTL_SECONDS]:
+            del _sessions[sid]
+
+
+def sample_session(session_id: str, state: Mapping, force: bool = False, **info) -> Dict[str, int]:
+    """
+    The session's footprint, recomputed only when the last sample is
+    older than FOOTPRINT_INTERVAL_SECONDS (or `force` is set); otherwise
+    the previous sample is kept and just marked as still live.
+    """
+    now = time.time()
+    with _lock:
+        previous = _sessions.get(session_id)
+        if previous is not None and not force and now - previous["sampled"] < FOOTPRINT_INTERVAL_SECONDS:
+            previous.update(info, updated=now)
+            return {k: previous[k] for k in FOOTPRINT_KEYS}
+        if previous is not None:
+            kept = {k: v for k, v in previous.items() if k not in FOOTPRINT_KEYS + ("session_id", "updated", "sampled")}
+            info = {**kept, **info}
+    footprint = session_footprint(state)
+    register_session(session_id, footprint, **info)
+    return footprint
+
+
+def sessions_report() -> List[Dict[str, Any]]:
+    """All live sessions, largest first."""
+    with _lock:
+        rows = [dict(v) for v in _sessions.values()]
+    return sorted(rows, key=lambda r: r["total_bytes"], reverse=True)
+
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size, when the platform exposes it."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return None
+
+
+def process_footprint() -> Dict[str, Any]:
+    sessions = sessions_report()
+    report = {
+        "rss_bytes": rss_bytes(),
+        "sessions": len(sessions),
+        "sessions_total_bytes": sum(s["total_bytes"] for s in sessions),
+        "tracemalloc": tracemalloc.is_tracing(),
+    }
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        report["traced_current_bytes"] = current
+        report["traced_peak_bytes"] = peak
+    return report
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap>")]
+    )
+
+
+def start_tracing() -> None:
+    """
+    Start tracemalloc (one frame per allocation, the only one reported)
+    and keep a baseline snapshot to diff against until stop_tracing().
+    """
+    global _baseline, _tracing_started
+    with _trace_lock:
+        if _baseline is not None:
+            return
+        _tracing_started = not tracemalloc.is_tracing()
+        if _tracing_started:
+            tracemalloc.start(TRACE_FRAMES)
+        _baseline = _snapshot()
+
+
+def tracing_active() -> bool:
+    return _baseline is not None
+
+
+def take_snapshot(limit: int = 15, stop: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Top allocation sites now and growth since start_tracing(), or None
+    when tracing isn't running. With `stop`, tracing is stopped
+    afterwards and the baseline dropped, so nothing keeps paying for it.
+    """
+    global _baseline, _tracing_started
+    with _trace_lock:
+        if _baseline is None:
+            return None
+        snapshot = _snapshot()
+        top = [
+            {"location": str(stat.traceback[0]), "size_bytes": stat.size, "count": stat.count}
+            for stat in snapshot.statistics("lineno")[:limit]
+        ]
+        growth = [
+            {"location": str(stat.traceback[0]), "size_diff_bytes": stat.size_diff, "count_diff": stat.count_diff}
+            for stat in snapshot.compare_to(_baseline, "lineno")[:limit]
+        ]
+        if stop:
+            _baseline = None
+            if _tracing_started:
+                tracemalloc.stop()
+            _tracing_started = False
+    return {"taken_at": time.time(), "top": top, "growth": growth, "stopped": stop}
+
+
+def stop_tracing(limit: int = 15) -> Optional[Dict[str, Any]]:
+    """Final snapshot and growth since start_tracing(), then stop tracing."""
+    return take_snapshot(limit, stop=True)
+
+
+def format_bytes(n: Optional[float]) -> str:
+    if n is None:
+        return "—"
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
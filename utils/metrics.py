@@ -0,0 +1,131 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterable, List, Optional
+
+
+# Stages recorded by the RAG pipeline, in display order.
+QUERY_STAGES = [
+    "condense_query",
+    "embed_query",
+    "vector_search",
+    "prompt_build",
+    "llm_first_token",
+    "llm_total",
+    "total",
+]
+INDEX_STAGES = [
+    "load_documents",
+    "split_documents",
+    "embed_and_index",
+    "save_index",
+    "handbook_links",
+]
+TOKEN_STAGES = ["tokens_in", "tokens_out", "tokens_cached"]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """
+    Linear-interpolated percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    pos = (len(sorted_values) - 1) * (q / 100.0)
+    lower = int(pos)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    frac = pos - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * frac
+
+
+class LatencyTracker:
+    """
+    Keeps a rolling window of samples per stage and summarises them
+    as p50/p95/p99. Safe to share across Streamlit sessions.
+    """
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._totals: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, value: float) -> None:
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.window)
+            samples.append(value)
+            self._totals[stage] = self._totals.get(stage, 0.0) + value
+
+    def record_many(self, values: Dict[str, float]) -> None:
+        for stage, value in values.items():
+            self.record(stage, value)
+
+    @contextmanager
+    def time(self, stage: str, timings: Optional[Dict[str, float]] = None):
+        """
+        Time the enclosed block and record it under `stage`. When a
+        `timings` dict is given the duration is also written into it.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.record(stage, elapsed)
+            if timings is not None:
+                timings[stage] = elapsed
+
+    def count(self, stage: str) -> int:
+        with self._lock:
+            return len(self._samples.get(stage, ()))
+
+    def total(self, stage: str) -> float:
+        with self._lock:
+            return self._totals.get(stage, 0.0)
+
+    def percentiles(self, stage: str, qs: Iterable[float] = (50, 95, 99)) -> Dict[str, float]:
+        with self._lock:
+            values = sorted(self._samples.get(stage, ()))
+        return {f"p{int(q)}": percentile(values, q) for q in qs}
+
+    def summary(self, stages: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Percentile summary for every stage that has samples.
+        """
+        with self._lock:
+            names = list(stages) if stages is not None else list(self._samples)
+        out = {}
+        for name in names:
+            n = self.count(name)
+            if n:
+                out[name] = {"count": n, **self.percentiles(name)}
+        return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+
+# Process-wide tracker used by the RAG pipeline and the dashboard.
+METRICS = LatencyTracker()
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token estimate (~4 characters per token) used when the
+    provider does not report usage.
+    """
+    return max(1, len(text) // 4) if text else 0
+
+
+def format_seconds(value: Optional[float]) -> str:
+    if value is None:
+        return "—"
+    if value < 1:
+        return f"{value * 1000:.0f}ms"
+    return f"{value:.2f}s"
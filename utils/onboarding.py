@@ -0,0 +1,283 @@
+"""
+Onboarding plans.
+
+Plans are data (resources/onboarding_plans.json): the base stages, with
+title, info text, tasks and resources, plus per-department and per-role
+overrides. Every role and department offered in the UI is listed, with
+an empty object when it has no overrides. An override may replace a
+stage's title, info, tasks or resources, or append tasks with
+"add_tasks". Department overrides apply first, then role overrides.
+
+The file is validated and compiled once per process into a lookup table
+keyed by (role, department, stage) with {role}/{department} already
+filled in, so rendering the onboarding page is a dict lookup. Roles or
+departments the file doesn't mention are compiled on first use.
+
+An LLM-tailored plan for a (role, department) can be generated once and
+cached on disk; it is applied as one more role override. While
+generation fails the configured plan is shown, and generation is retried
+after GENERATION_RETRY_AFTER seconds.
+"""
+import json
+import os
+import string
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from utils.prompts import PROMPTS
+from utils.storage import ScoreCache, model_name, storage_path
+
+ONBOARDING_PLANS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                     "resources", "onboarding_plans.json")
+STAGE_FIELDS = ("title", "info", "tasks", "resources")
+OVERRIDE_FIELDS = STAGE_FIELDS + ("add_tasks",)
+PLACEHOLDERS = ("role", "department")
+MAX_TASKS = 12
+# Seconds before a failed plan generation is attempted again.
+GENERATION_RETRY_AFTER = float(os.getenv("HR_PLAN_RETRY_AFTER", "600"))
+
+
+class StagePlan(NamedTuple):
+    stage: str
+    title: str
+    info: str
+    tasks: Tuple[str, ...]
+    resources: Tuple[str, ...]
+    source: str = "plan"      # "plan" or "generated"
+
+
+def _check_text(value: Any, where: str) -> str:
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f"{where} must be a non-empty string")
+    fields = {f for _, f, _, _ in string.Formatter().parse(value) if f is not None}
+    unknown = fields - set(PLACEHOLDERS)
+    if unknown:
+        raise ValueError(f"{where} uses unknown placeholders: {', '.join(sorted(unknown))}")
+    return value
+
+
+def _check_list(value: Any, where: str) -> List[str]:
+    if not isinstance(value, list) or not value:
+        raise ValueError(f"{where} must be a non-empty list")
+    return [_check_text(v, f"{where}[{i}]") for i, v in enumerate(value)]
+
+
+def validate_overrides(overrides: Any, stages: Tuple[str, ...], where: str) -> Dict[str, Dict[str, Any]]:
+    """Check an override mapping ({stage: {field: value}}) against the known stages and fields."""
+    if not isinstance(overrides, dict):
+        raise ValueError(f"{where} must be an object keyed by stage")
+    for stage, fields in overrides.items():
+        if stage not in stages:
+            raise ValueError(f"{where} refers to unknown stage {stage!r}")
+        if not isinstance(fields, dict):
+            raise ValueError(f"{where}.{stage} must be an object")
+        for field, value in fields.items():
+            if field not in OVERRIDE_FIELDS:
+                raise ValueError(f"{where}.{stage} has unknown field {field!r}")
+            if field in ("title", "info"):
+                _check_text(value, f"{where}.{stage}.{field}")
+            else:
+                _check_list(value, f"{where}.{stage}.{field}")
+    return overrides
+
+
+class OnboardingPlans:
+    def __init__(self, path: str = ONBOARDING_PLANS_PATH):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.stages: Tuple[str, ...] = tuple(s["key"] for s in data["stages"])
+        if len(set(self.stages)) != len(self.stages):
+            raise ValueError(f"Duplicate stage keys in {path}")
+        self.stage_names: Dict[str, str] = {}
+        self._base: Dict[str, Dict[str, Any]] = {}
+        for s in data["stages"]:
+            where = f"stages.{s['key']}"
+            self.stage_names[s["key"]] = _check_text(s.get("name", s["key"]), f"{where}.name")
+            self._base[s["key"]] = {
+                "title": _check_text(s.get("title"), f"{where}.title"),
+                "info": _check_text(s.get("info"), f"{where}.info"),
+                "tasks": _check_list(s.get("tasks"), f"{where}.tasks"),
+                "resources": _check_list(s.get("resources"), f"{where}.resources"),
+            }
+        self.role_overrides = {role: validate_overrides(o, self.stages, f"roles.{role}")
+                               for role, o in (data.get("roles") or {}).items()}
+        self.department_overrides = {dept: validate_overrides(o, self.stages, f"departments.{dept}")
+                                     for dept, o in (data.get("departments") or {}).items()}
+        # Every role and department listed in the file is offered in the UI.
+        self.roles: Tuple[str, ...] = tuple(self.role_overrides)
+        self.departments: Tuple[str, ...] = tuple(self.department_overrides)
+
+        self._lock = threading.Lock()
+        self._plans: Dict[Tuple[str, str, str], StagePlan] = {}
+        for role in self.roles:
+            for department in self.departments:
+                self._compile(role, department)
+
+    def _compile(self, role: str, department: str, extra: Optional[Dict[str, Dict[str, Any]]] = None,
+                 source: str = "plan") -> Dict[str, StagePlan]:
+        values = {"role": role, "department": department}
+        plans = {}
+        for stage in self.stages:
+            fields = dict(self._base[stage])
+            for overrides in (self.department_overrides.get(department), self.role_overrides.get(role), extra):
+                for field, value in ((overrides or {}).get(stage) or {}).items():
+                    if field == "add_tasks":
+                        fields["tasks"] = fields["tasks"] + value
+                    else:
+                        fields[field] = value
+            plans[stage] = StagePlan(
+                stage,
+                fields["title"].format(**values),
+                fields["info"].format(**values),
+                tuple(dict.fromkeys(t.format(**values) for t in fields["tasks"])),
+                tuple(r.format(**values) for r in fields["resources"]),
+                source,
+            )
+        if extra is None:
+            with self._lock:
+                self._plans.update({(role, department, stage): p for stage, p in plans.items()})
+        return plans
+
+    def get(self, role: str, department: str, stage: str) -> StagePlan:
+        """The compiled plan for one stage; unknown stages fall back to the first."""
+        if stage not in self._base:
+            stage = self.stages[0]
+        plan = self._plans.get((role, department, stage))
+        if plan is None:
+            plan = self._compile(role, department)[stage]
+        return plan
+
+    def with_overrides(self, role: str, department: str,
+                       overrides: Dict[str, Dict[str, Any]], source: str = "generated") -> Dict[str, StagePlan]:
+        """All stages with `overrides` applied on top of the configured plan (not stored)."""
+        return self._compile(role, department, validate_overrides(overrides, self.stages, "overrides"), source)
+
+
+PROMPTS.register(
+    "onboarding_plan",
+    prefix=(
+        "You are an HR onboarding specialist. Tailor the onboarding tasks below to the new hire's role "
+        "and department: replace generic tasks with concrete, role-specific ones and keep each stage to "
+        f"at most {MAX_TASKS} short, actionable tasks.\n\n"
+        "Respond with a single JSON object and nothing else, keyed by stage, in this shape:\n"
+        '{"<stage>": {"tasks": ["string"]}}\n\n'
+    ),
+    body="ROLE: {role}\nDEPARTMENT: {department}\n\nCURRENT PLAN:\n{plan}\n\nJSON:",
+)
+
+
+def parse_plan(text: str, stages: Tuple[str, ...]) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Stage task overrides from an LLM reply; stages it gets wrong are dropped, None if nothing usable."""
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end <= start:
+        return None
+    try:
+        data = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    overrides = {}
+    for stage in stages:
+        tasks = (data.get(stage) or {}).get("tasks") if isinstance(data.get(stage), dict) else None
+        if isinstance(tasks, list):
+            # Braces would be read as placeholders when the plan is compiled.
+            tasks = [str(t).strip().replace("{", "(").replace("}", ")") for t in tasks if str(t).strip()]
+            if tasks:
+                overrides[stage] = {"tasks": tasks[:MAX_TASKS]}
+    return overrides or None
+
+
+class _Failed(NamedTuple):
+    """Stands in for a plan whose generation failed, until `retry_at`."""
+    retry_at: float
+    plans: Dict[str, StagePlan]     # the configured plan, shown meanwhile
+
+
+class GeneratedPlans:
+    """
+    LLM-tailored plans per (role, department, model), cached in memory and
+    on disk. A failed or unusable generation is remembered for
+    `retry_after` seconds, during which the configured plan is returned.
+    """
+
+    def __init__(self, plans: OnboardingPlans, cache: Optional[ScoreCache] = None,
+                 max_entries: int = 128, retry_after: float = GENERATION_RETRY_AFTER):
+        self.plans = plans
+        self.cache = cache or ScoreCache(path=storage_path("onboarding_cache.db"), max_entries=128,
+                                         table="generated_plans", key_columns=("role", "department", "model"))
+        self.max_entries = max_entries
+        self.retry_after = retry_after
+        self._compiled: "OrderedDict[Tuple[str, str, str], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, key: Tuple[str, str, str]) -> Optional[Dict[str, StagePlan]]:
+        with self._lock:
+            compiled = self._compiled.get(key)
+            if compiled is None:
+                return None
+            if isinstance(compiled, _Failed):
+                if compiled.retry_at <= time.time():
+                    del self._compiled[key]
+                    return None
+                compiled = compiled.plans
+            self._compiled.move_to_end(key)
+            return compiled
+
+    def _remember(self, key: Tuple[str, str, str], compiled: Any) -> None:
+        with self._lock:
+            self._compiled[key] = compiled
+            self._compiled.move_to_end(key)
+            while len(self._compiled) > self.max_entries:
+                self._compiled.popitem(last=False)
+
+    def get(self, chain, role: str, department: str) -> Dict[str, StagePlan]:
+        """
+        Compiled stages of the tailored plan, generating it on first use.
+        Stages come from the configured plan (source "plan") while
+        generation is failing.
+        """
+        key = (role, department, model_name(chain.llm))
+        compiled = self._lookup(key)
+        if compiled is not None:
+            return compiled
+        overrides = self.cache.get(key)
+        if overrides is None:
+            current = "\n".join(
+                f"{stage}: " + "; ".join(self.plans.get(role, department, stage).tasks) for stage in self.plans.stages
+            )
+            try:
+                result = chain.complete("onboarding_plan", role=role, department=department, plan=current)
+                overrides = parse_plan(result.get("result", ""), self.plans.stages)
+                if overrides is None:
+                    print(f"Onboarding plan generation for {role} / {department} returned no usable plan")
+            except Exception as e:
+                print(f"Onboarding plan generation failed: {e}")
+            if overrides is None:
+                default = {stage: self.plans.get(role, department, stage) for stage in self.plans.stages}
+                self._remember(key, _Failed(time.time() + self.retry_after, default))
+                return default
+            self.cache.put(key, overrides)
+        compiled = self.plans.with_overrides(role, department, overrides)
+        self._remember(key, compiled)
+        return compiled
+
+
+_plans: Optional[OnboardingPlans] = None
+_generated: Optional[GeneratedPlans] = None
+
+
+def get_onboarding_plans() -> OnboardingPlans:
+    global _plans
+    if _plans is None:
+        _plans = OnboardingPlans()
+    return _plans
+
+
+def get_generated_plans() -> GeneratedPlans:
+    global _generated
+    if _generated is None:
+        _generated = GeneratedPlans(get_onboarding_plans())
+    return _generated
@@ -0,0 +1,168 @@
+"""
+Local pre-screening that shortlists resumes before any LLM call.
+
+The whole pool is ranked in one pass: resumes are tokenised once into a
+sparse (resume, term, count) triple list, and TF-IDF cosine similarity
+to the job description is computed with NumPy bincount reductions over
+those arrays. Must-have keywords are matched as whole terms or phrases
+against a separately normalised text that keeps short terms ("R", "C")
+and screening stopwords ("senior", "master"). When an embedding model is
+given, semantic similarity to the job profile's embedding is blended in
+(one batched embedding call and one matrix-vector product). Only the
+top-N by relevance, plus anyone whose local pre-score already clears the
+threshold, go on to the LLM.
+"""
+import re
+from collections import Counter
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from utils.screening import JobProfile, extract_features, feature_scores, job_profile, tokenize
+
+# Every term is kept for must-have matching, including single characters and stopwords.
+_KEYWORD_RE = re.compile(r"[a-z0-9][a-z0-9+#.\-]*[a-z0-9+#]|[a-z0-9]")
+
+
+class PrefilterResult(NamedTuple):
+    index: int           # position in the input list
+    rank: int            # 0 = most relevant
+    similarity: float    # cosine similarity to the job description (TF-IDF, blended with embeddings)
+    coverage: float      # share of must-have keywords present (1.0 when none given)
+    pre_score: int       # deterministic feature score, 0-100
+    shortlisted: bool    # should get an LLM assessment
+    features: Dict[str, Any]
+
+
+def _sparse_counts(token_lists: Sequence[List[str]], vocab: Dict[str, int]):
+    rows, cols, counts = [], [], []
+    for i, tokens in enumerate(token_lists):
+        for term, n in Counter(tokens).items():
+            rows.append(i)
+            cols.append(vocab.setdefault(term, len(vocab)))
+            counts.append(n)
+    return (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64),
+            np.asarray(counts, dtype=np.float64))
+
+
+def tfidf_similarity(query: Union[str, List[str]], documents: Sequence[str],
+                     token_lists: Optional[Sequence[List[str]]] = None) -> np.ndarray:
+    """
+    Cosine similarity between `query` (text or tokens) and each document
+    under sublinear TF-IDF weighting (idf fitted on the documents).
+    Returns shape (n,).
+    """
+    n = len(documents)
+    if n == 0:
+        return np.zeros(0)
+    if token_lists is None:
+        token_lists = [tokenize(d) for d in documents]
+    query_tokens = tokenize(query) if isinstance(query, str) else query
+    vocab: Dict[str, int] = {}
+    rows, cols, counts = _sparse_counts(token_lists, vocab)
+    q_rows, q_cols, q_counts = _sparse_counts([query_tokens], vocab)
+
+    df = np.bincount(cols, minlength=len(vocab))
+    idf = np.log((1 + n) / (1 + df)) + 1.0
+
+    weights = (1.0 + np.log(counts)) * idf[cols]
+    q = np.zeros(len(vocab))
+    q[q_cols] = (1.0 + np.log(q_counts)) * idf[q_cols]
+    q_norm = np.linalg.norm(q)
+
+    norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=n))
+    dots = np.bincount(rows, weights=weights * q[cols], minlength=n)
+    denom = norms * q_norm
+    return np.divide(dots, denom, out=np.zeros(n), where=denom > 0)
+
+
+def embedding_similarity(query_embedding: Sequence[float], documents: Sequence[str], embeddings) -> np.ndarray:
+    """Cosine similarity of each document's embedding to `query_embedding`."""
+    if not documents:
+        return np.zeros(0)
+    matrix = np.asarray(embeddings.embed_documents(list(documents)), dtype=np.float64)
+    q = np.asarray(query_embedding, dtype=np.float64)
+    denom = np.linalg.norm(matrix, axis=1) * np.linalg.norm(q)
+    return np.divide(matrix @ q, denom, out=np.zeros(len(documents)), where=denom > 0)
+
+
+def keyword_text(text: str) -> str:
+    """`text` as space-separated lowercase terms, padded so " term " matches whole terms only."""
+    terms = (t.strip(".-") for t in _KEYWORD_RE.findall(text.lower()))
+    return " " + " ".join(t for t in terms if t) + " "
+
+
+def parse_keywords(required: Sequence[str]) -> Tuple[List[str], List[str]]:
+    """(normalised must-have keywords, keywords with no matchable term in them)."""
+    keywords, unmatched = [], []
+    for raw in required:
+        if not raw.strip():
+            continue
+        normalised = keyword_text(raw).strip()
+        if normalised:
+            keywords.append(normalised)
+        else:
+            unmatched.append(raw.strip())
+    return list(dict.fromkeys(keywords)), unmatched
+
+
+def keyword_coverage(texts: Sequence[str], required: Sequence[str]) -> np.ndarray:
+    """
+    Share of `required` keywords (terms or phrases) present in each
+    text. Returns shape (n,); all ones when no keyword can be matched.
+    """
+    n = len(texts)
+    keywords, unmatched = parse_keywords(required)
+    if unmatched:
+        print(f"Ignoring must-have keywords with nothing to match: {', '.join(unmatched)}")
+    if not keywords:
+        return np.ones(n)
+    present = np.zeros((n, len(keywords)), dtype=bool)
+    for i, text in enumerate(texts):
+        normalised = keyword_text(text)
+        present[i] = [f" {k} " in normalised for k in keywords]
+    return present.mean(axis=1)
+
+
+def prefilter(
+    job: Union[str, JobProfile],
+    resumes: Sequence[str],
+    required_keywords: Sequence[str] = (),
+    top_n: Optional[int] = None,
+    min_score: Optional[int] = None,
+    weights: Optional[Dict[str, float]] = None,
+    embeddings=None,
+) -> List[PrefilterResult]:
+    """
+    Rank `resumes` against the job, most relevant first.
+
+    Relevance is TF-IDF similarity (averaged with embedding similarity
+    when `embeddings` is given) scaled by must-have coverage. A resume
+    is shortlisted when it ranks within `top_n` or its feature pre-score
+    is at least `min_score`; with neither limit set, all are shortlisted.
+    """
+    profile = job if isinstance(job, JobProfile) else job_profile(job, embeddings=embeddings)
+    token_lists = [tokenize(r) for r in resumes]
+    similarity = tfidf_similarity(profile.skills or profile.terms, resumes, token_lists)
+    if embeddings is not None and profile.embedding is not None:
+        try:
+            similarity = 0.5 * similarity + 0.5 * embedding_similarity(profile.embedding, resumes, embeddings)
+        except Exception as e:
+            print(f"Embedding pre-filter failed, using TF-IDF only: {e}")
+    coverage = keyword_coverage(resumes, required_keywords)
+    relevance = similarity * (0.5 + 0.5 * coverage) if required_keywords else similarity
+    order = np.argsort(-relevance, kind="stable")
+
+    features = [extract_features(profile, r) for r in resumes]
+    pre_scores = [feature_scores(f, weights)[0] for f in features]
+
+    results = []
+    for rank, i in enumerate(order):
+        i = int(i)
+        if top_n is None and min_score is None:
+            keep = True
+        else:
+            keep = (top_n is not None and rank < top_n) or (min_score is not None and pre_scores[i] >= min_score)
+        results.append(PrefilterResult(i, rank, float(similarity[i]), float(coverage[i]),
+                                       pre_scores[i], keep, features[i]))
+    return results
@@ -0,0 +1,244 @@
+"""
+Persistent onboarding progress.
+
+Task completion is stored in SQLite keyed by (employee, role, stage,
+task id), so each new hire has their own checklist and progress survives
+the session. Task ids are hashes of the task text, which stay stable
+when a plan's task order changes.
+
+An employee is only put on file by an explicit start_onboarding() (the
+UI's start button), never by typing a name. Checkbox changes are
+buffered (last write per task wins) and written in one transaction by
+flush(), normally once per page run; reads see buffered changes. The
+first time a started employee opens a stage its tasks are registered as
+open, so completion rates per stage, role or department are indexed
+aggregate queries over complete checklists.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from utils.storage import connect, storage_path, text_hash
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS onboardings (
+    employee TEXT NOT NULL,
+    role TEXT NOT NULL,
+    name TEXT NOT NULL,
+    department TEXT,
+    started_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (employee, role)
+);
+CREATE TABLE IF NOT EXISTS task_progress (
+    employee TEXT NOT NULL,
+    role TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    task TEXT NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    completed_at REAL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (employee, role, stage, task_id)
+);
+CREATE INDEX IF NOT EXISTS idx_onboardings_department ON onboardings (department);
+CREATE INDEX IF NOT EXISTS idx_onboardings_updated ON onboardings (updated_at);
+CREATE INDEX IF NOT EXISTS idx_progress_role_stage ON task_progress (role, stage, completed);
+CREATE INDEX IF NOT EXISTS idx_progress_stage ON task_progress (stage, completed);
+"""
+
+_Key = Tuple[str, str, str, str]
+# Stages already registered this process, remembered so reruns skip the write; oldest forgotten first.
+REGISTERED_MAX = 1024
+
+
+def employee_id(name: str) -> str:
+    """Case- and whitespace-insensitive key for an employee name."""
+    return " ".join(name.lower().split())
+
+
+def task_id(task: str) -> str:
+    return text_hash(task)[:16]
+
+
+class ProgressStore:
+    def __init__(self, path: Optional[str] = None, batch_size: int = 200):
+        self.path = path or storage_path("onboarding.db")
+        self.batch_size = batch_size
+        self._conn = connect(self.path)
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+        # (employee, role, stage, task id) -> (task, completed, ts), not yet written
+        self._pending: Dict[_Key, Tuple[str, bool, float]] = {}
+        self._registered: "OrderedDict[tuple, None]" = OrderedDict()
+        self.version = 0
+
+    # -- writes ------------------------------------------------------------
+
+    def start_onboarding(self, name: str, role: str, department: str) -> None:
+        """Put the employee on file for `role` (updating the department if already there)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO onboardings VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (employee, role) DO UPDATE SET department = excluded.department",
+                (employee_id(name), role, name.strip(), department, now, now),
+            )
+            self._conn.commit()
+            self.version += 1
+
+    def start_stage(self, name: str, role: str, stage: str, tasks: Sequence[str]) -> bool:
+        """
+        Register the stage's tasks (as open) for a started onboarding if
+        not already on file. Returns False when the employee was never started.
+        """
+        employee = employee_id(name)
+        key = (employee, role, stage, tuple(tasks))
+        if key in self._registered:
+            self._registered.move_to_end(key)
+            return True
+        now = time.time()
+        with self._lock:
+            if not self._has_onboarding(employee, role):
+                return False
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO task_progress (employee, role, stage, task_id, task, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [(employee, role, stage, task_id(t), t, now) for t in tasks],
+            )
+            self._conn.commit()
+            self._registered[key] = None
+            while len(self._registered) > REGISTERED_MAX:
+                self._registered.popitem(last=False)
+            self.version += 1
+        return True
+
+    def set_task(self, name: str, role: str, stage: str, task: str, completed: bool) -> None:
+        """Buffer a completion change; written on flush() or once `batch_size` changes are pending."""
+        with self._lock:
+            self._pending[(employee_id(name), role, stage, task_id(task))] = (task, completed, time.time())
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write buffered changes in one transaction. Returns the number written."""
+        with self._lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+            rows = [(employee, role, stage, tid, task, int(done), ts if done else None, ts)
+                    for (employee, role, stage, tid), (task, done, ts) in pending.items()]
+            self._conn.executemany(
+                "INSERT INTO task_progress (employee, role, stage, task_id, task, completed, completed_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (employee, role, stage, task_id) DO UPDATE SET"
+                " completed = excluded.completed, completed_at = excluded.completed_at,"
+                " updated_at = excluded.updated_at",
+                rows,
+            )
+            touched = {(employee, role, ts) for employee, role, _, _, _, _, _, ts in rows}
+            self._conn.executemany("UPDATE onboardings SET updated_at = ? WHERE employee = ? AND role = ?",
+                                   [(ts, employee, role) for employee, role, ts in touched])
+            self._conn.commit()
+            self.version += 1
+        return len(rows)
+
+    # -- reads -------------------------------------------------------------
+
+    def _has_onboarding(self, employee: str, role: str) -> bool:
+        return self._conn.execute("SELECT 1 FROM onboardings WHERE employee = ? AND role = ?",
+                                  (employee, role)).fetchone() is not None
+
+    def has_onboarding(self, name: str, role: str) -> bool:
+        with self._lock:
+            return self._has_onboarding(employee_id(name), role)
+
+    def stage_progress(self, name: str, role: str, stage: str) -> Dict[str, bool]:
+        """task id -> completed for one employee's stage, including buffered changes."""
+        employee = employee_id(name)
+        with self._lock:
+            done = {tid: bool(c) for tid, c in self._conn.execute(
+                "SELECT task_id, completed FROM task_progress WHERE employee = ? AND role = ? AND stage = ?",
+                (employee, role, stage),
+            )}
+            for (e, r, s, tid), (_, completed, _) in self._pending.items():
+                if (e, r, s) == (employee, role, stage):
+                    done[tid] = completed
+        return done
+
+    def employee_summary(self, name: str, role: str) -> Dict[str, Tuple[int, int]]:
+        """stage -> (completed, total) for one employee (flushed changes only)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage, SUM(completed), COUNT(*) FROM task_progress"
+                " WHERE employee = ? AND role = ? GROUP BY stage",
+                (employee_id(name), role),
+            ).fetchall()
+        return {stage: (done, total) for stage, done, total in rows}
+
+    def completion_rates(self, role: Optional[str] = None, department: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Per stage: employees onboarding, tasks completed/tracked, completion rate, fully completed."""
+        join, where, params = "", [], []
+        if department is not None:
+            join = " JOIN onboardings o ON o.employee = p.employee AND o.role = p.role"
+            where.append("o.department = ?")
+            params.append(department)
+        if role is not None:
+            where.append("p.role = ?")
+            params.append(role)
+        source = f" FROM task_progress p{join}" + (" WHERE " + " AND ".join(where) if where else "")
+        sql = f"SELECT p.stage, COUNT(DISTINCT p.employee || '|' || p.role), SUM(p.completed), COUNT(*){source}" \
+              " GROUP BY p.stage"
+        done_sql = (f"SELECT stage, COUNT(*) FROM (SELECT p.stage AS stage{source}"
+                    " GROUP BY p.employee, p.role, p.stage HAVING MIN(p.completed) = 1) GROUP BY stage")
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+            finished = dict(self._conn.execute(done_sql, params).fetchall())
+        return [
+            {"stage": stage, "employees": employees, "tasks_completed": done or 0, "tasks_tracked": total,
+             "completion_rate": (done or 0) / total if total else 0.0, "stage_completed": finished.get(stage, 0)}
+            for stage, employees, done, total in rows
+        ]
+
+    def onboardings(self, limit: int = 50, department: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Most recently active onboardings with overall completion."""
+        sql = ("SELECT o.name, o.role, o.department, o.started_at, o.updated_at,"
+               " (SELECT SUM(completed) FROM task_progress p WHERE p.employee = o.employee AND p.role = o.role),"
+               " (SELECT COUNT(*) FROM task_progress p WHERE p.employee = o.employee AND p.role = o.role)"
+               " FROM onboardings o")
+        params: list = []
+        if department is not None:
+            sql += " WHERE o.department = ?"
+            params.append(department)
+        sql += " ORDER BY o.updated_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {"name": name, "role": role, "department": dept, "started_at": started, "updated_at": updated,
+             "tasks_completed": done or 0, "tasks_tracked": total,
+             "completion_rate": (done or 0) / total if total else 0.0}
+            for name, role, dept, started, updated, done, total in rows
+        ]
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+
+_store: Optional[ProgressStore] = None
+_store_lock = threading.Lock()
+
+
+def get_progress_store() -> ProgressStore:
+    """Process-wide store shared by all Streamlit sessions."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ProgressStore()
+    return _store
@@ -0,0 +1,167 @@
+"""
+Prompt template registry.
+
+Templates are compiled once at import and split into three parts, always
+sent in this order:
+
+* prefix - static instructions, identical on every call (no fields, so
+  literal braces such as a JSON schema need no escaping);
+* shared - content shared by a batch of calls: an agent persona, a job's
+  requirements, an evaluation rubric;
+* body   - per-call content.
+
+Keeping the stable text first and byte-identical lets provider-side
+context caching reuse it. The registry counts renders and estimated
+tokens per part for each template.
+
+Templates owned by a module (resume scoring, interview evaluation, query
+condensation, the RAG answer) are registered there; agent prompts without a home module live
+at the bottom of this file.
+"""
+import string
+import threading
+from typing import Dict, List, NamedTuple, Tuple
+
+from utils.metrics import estimate_tokens
+from utils import telemetry
+
+
+class RenderedPrompt(NamedTuple):
+    name: str
+    prefix: str
+    shared: str
+    body: str
+
+    @property
+    def cacheable(self) -> str:
+        """The part that repeats across a batch of calls (prefix + shared)."""
+        return self.prefix + self.shared
+
+    @property
+    def text(self) -> str:
+        return self.prefix + self.shared + self.body
+
+
+def _fields(template: str) -> Tuple[str, ...]:
+    return tuple(dict.fromkeys(f for _, f, _, _ in string.Formatter().parse(template) if f))
+
+
+class PromptTemplate:
+    def __init__(self, name: str, prefix: str, body: str, shared: str = ""):
+        self.name = name
+        self.prefix = prefix
+        self.shared = shared
+        self.body = body
+        self.shared_fields = _fields(shared)
+        self.body_fields = _fields(body)
+        self.prefix_tokens = estimate_tokens(prefix)
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        return self.shared_fields + self.body_fields
+
+    def render(self, **values) -> RenderedPrompt:
+        missing = [f for f in self.fields if f not in values]
+        if missing:
+            raise KeyError(f"Prompt {self.name!r} is missing values for: {', '.join(missing)}")
+        return RenderedPrompt(self.name, self.prefix, self.shared.format(**values), self.body.format(**values))
+
+
+class PromptRegistry:
+    def __init__(self):
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._stats: Dict[str, List[int]] = {}   # name -> [renders, shared tokens, body tokens]
+        self._lock = threading.Lock()
+
+    def register(self, name: str, prefix: str, body: str, shared: str = "") -> PromptTemplate:
+        template = PromptTemplate(name, prefix, body, shared)
+        with self._lock:
+            self._templates[name] = template
+            self._stats.setdefault(name, [0, 0, 0])
+        return template
+
+    def get(self, name: str) -> PromptTemplate:
+        return self._templates[name]
+
+    def names(self) -> List[str]:
+        return sorted(self._templates)
+
+    def render(self, name: str, **values) -> RenderedPrompt:
+        template = self._templates[name]
+        rendered = template.render(**values)
+        shared_tokens = estimate_tokens(rendered.shared)
+        body_tokens = estimate_tokens(rendered.body)
+        with self._lock:
+            stats = self._stats[name]
+            stats[0] += 1
+            stats[1] += shared_tokens
+            stats[2] += body_tokens
+        telemetry.inc("hr_prompt_tokens_total", template.prefix_tokens, template=name, part="prefix")
+        telemetry.inc("hr_prompt_tokens_total", shared_tokens, template=name, part="shared")
+        telemetry.inc("hr_prompt_tokens_total", body_tokens, template=name, part="body")
+        return rendered
+
+    def stats(self) -> List[Dict[str, float]]:
+        """Per-template render counts and average estimated tokens per part."""
+        rows = []
+        with self._lock:
+            for name in sorted(self._templates):
+                renders, shared, body = self._stats[name]
+                prefix = self._templates[name].prefix_tokens
+                n = renders or 1
+                rows.append({
+                    "template": name,
+                    "renders": renders,
+                    "prefix_tokens": prefix,
+                    "avg_shared_tokens": shared / n,
+                    "avg_body_tokens": body / n,
+                    "avg_total_tokens": prefix + (shared + body) / n,
+                })
+        return rows
+
+
+PROMPTS = PromptRegistry()
+
+
+# -- agent prompts -----------------------------------------------------------
+
+_HR_PERSONAS = {
+    "policy": "As a Senior HR Assistant with 10+ years experience, provide comprehensive policy information. "
+              "Include relevant policy sections, exceptions, and next steps.",
+    "leave": "As an HR Leave Specialist, explain leave policies with specific procedures, approval workflows, "
+             "and important deadlines.",
+    "benefits": "As an HR Benefits Coordinator, provide detailed benefits information including eligibility, "
+                "enrollment periods, and contact information for follow-up.",
+    "compliance": "As an HR Compliance Officer, address legal and regulatory questions with current guidelines "
+                  "and required documentation.",
+    "general": "As an experienced HR Generalist, provide helpful guidance and direct to appropriate resources.",
+}
+_URGENCY_NOTE = {
+    True: " This query is URGENT: lead with the immediate next steps and who to contact.",
+    False: "",
+}
+
+# (category, urgent) -> persona instructions; built once so each variant is byte-stable.
+HR_PERSONAS: Dict[Tuple[str, bool], str] = {
+    (category, urgent): persona + note
+    for category, persona in _HR_PERSONAS.items()
+    for urgent, note in _URGENCY_NOTE.items()
+}
+
+
+def hr_persona(category: str, urgent: bool = False) -> str:
+    return HR_PERSONAS.get((category, urgent)) or HR_PERSONAS[("general", urgent)]
+
+
+PROMPTS.register(
+    "chat_summary",
+    prefix=(
+        "Based on the following conversation history, create a comprehensive summary report.\n"
+        "Please provide:\n"
+        "1. Key topics discussed\n"
+        "2. Main insights discovered\n"
+        "3. Important information extracted\n"
+        "4. Recommendations for further exploration\n\n"
+    ),
+    body="CONVERSATION:\n{conversation}\n",
+)
@@ -0,0 +1,239 @@
+"""
+Interview question bank.
+
+Questions live in resources/question_banks.json, one record per question
+with its type, level, roles ("any" for role-agnostic) and tags. The file
+is loaded once per process into precomputed pools keyed by (type, level,
+role), holding role-specific questions followed by role-agnostic ones,
+so picking a question is a dict lookup plus a cursor step.
+
+Each interview session gets a QuestionSampler that walks a shuffled copy
+of each pool, never handing out the same question twice. When a pool
+runs dry (or the interviewer asks for them), LLM-generated questions are
+drawn instead; those are generated once per (type, level, role, model)
+and cached on disk.
+"""
+import json
+import os
+import random
+import re
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from utils.prompts import PROMPTS
+from utils.storage import ScoreCache, model_name, storage_path, text_hash
+
+QUESTION_BANK_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  "resources", "question_banks.json")
+ANY_ROLE = "any"
+
+
+class Question(NamedTuple):
+    id: str
+    text: str
+    type: str
+    level: str
+    roles: Tuple[str, ...]
+    tags: Tuple[str, ...]
+    source: str = "bank"      # "bank" or "generated"
+
+
+def normalize_type(question_type: str) -> str:
+    """UI label ("Cultural Fit") to bank key ("cultural_fit")."""
+    return question_type.strip().lower().replace(" ", "_").replace("-", "_")
+
+
+def normalize_level(level: str) -> str:
+    """UI label ("Mid-level (3-5 years)") to bank key ("mid")."""
+    return re.split(r"[\s\-(]", level.strip().lower(), maxsplit=1)[0]
+
+
+class QuestionBank:
+    def __init__(self, path: str = QUESTION_BANK_PATH):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.types: Tuple[str, ...] = tuple(data["types"])
+        self.levels: Tuple[str, ...] = tuple(data["levels"])
+        self.roles: Tuple[str, ...] = tuple(data["roles"])
+        self.questions: Dict[str, Question] = {}
+        self._by_tag: Dict[str, List[str]] = {}
+
+        by_type_level: Dict[Tuple[str, str], List[Question]] = {}
+        for record in data["questions"]:
+            q = Question(record["id"], record["text"], record["type"], record["level"],
+                         tuple(record.get("roles") or (ANY_ROLE,)), tuple(record.get("tags") or ()))
+            if q.id in self.questions:
+                raise ValueError(f"Duplicate question id in {path}: {q.id}")
+            if q.type not in self.types or q.level not in self.levels:
+                raise ValueError(f"Question {q.id} has unknown type/level: {q.type}/{q.level}")
+            unknown = set(q.roles) - set(self.roles) - {ANY_ROLE}
+            if unknown:
+                raise ValueError(f"Question {q.id} has unknown roles: {', '.join(sorted(unknown))}")
+            self.questions[q.id] = q
+            by_type_level.setdefault((q.type, q.level), []).append(q)
+            for tag in q.tags:
+                self._by_tag.setdefault(tag, []).append(q.id)
+
+        # (type, level, role) -> question ids, role-specific first. Role ANY_ROLE
+        # (and any role not in the bank) gets every question of that type and level.
+        self._pools: Dict[Tuple[str, str, str], Tuple[str, ...]] = {}
+        for (qtype, level), qs in by_type_level.items():
+            self._pools[(qtype, level, ANY_ROLE)] = tuple(q.id for q in qs)
+            for role in self.roles:
+                specific = [q.id for q in qs if role in q.roles]
+                generic = [q.id for q in qs if ANY_ROLE in q.roles]
+                pool = tuple(specific + generic)
+                if pool:
+                    self._pools[(qtype, level, role)] = pool
+
+    def pool_key(self, question_type: str, level: str, role: str) -> Tuple[str, str, str]:
+        """
+        Resolve UI selections to an existing pool: unknown types fall back
+        to technical, missing levels to the nearest level that has
+        questions, unknown roles to the role-agnostic pool.
+        """
+        qtype = normalize_type(question_type)
+        if qtype not in self.types:
+            qtype = "technical"
+        level = normalize_level(level)
+        if level not in self.levels:
+            level = "mid"
+        role = role if role in self.roles else ANY_ROLE
+        rank = self.levels.index(level)
+        for candidate in sorted(self.levels, key=lambda l: abs(self.levels.index(l) - rank)):
+            if (qtype, candidate, role) in self._pools:
+                return qtype, candidate, role
+            if (qtype, candidate, ANY_ROLE) in self._pools:
+                return qtype, candidate, ANY_ROLE
+        raise KeyError(f"No questions for type {qtype}")
+
+    def pool(self, question_type: str, level: str, role: str) -> Tuple[str, ...]:
+        return self._pools[self.pool_key(question_type, level, role)]
+
+    def by_tag(self, tag: str) -> List[Question]:
+        return [self.questions[i] for i in self._by_tag.get(tag, ())]
+
+    def tags(self) -> List[str]:
+        return sorted(self._by_tag)
+
+
+Generator = Callable[[str, str, str], Sequence[Question]]
+
+
+class QuestionSampler:
+    """
+    Per-session question picker: draws without replacement from each
+    pool in a shuffled order, falling back to `generate(type, level,
+    role)` when the bank has nothing new. Returns None once both are
+    exhausted.
+    """
+
+    def __init__(self, bank: "QuestionBank", seed: Optional[int] = None):
+        self.bank = bank
+        self._rng = random.Random(seed)
+        self._orders: Dict[Tuple[str, str, str], List[str]] = {}
+        self._cursors: Dict[Tuple[str, str, str], int] = {}
+        self.asked: Set[str] = set()
+        self.history: List[Question] = []
+
+    def _draw(self, key: Tuple[str, str, str]) -> Optional[Question]:
+        order = self._orders.get(key)
+        if order is None:
+            order = self._orders[key] = self._rng.sample(self.bank.pool(*key), len(self.bank.pool(*key)))
+            self._cursors[key] = 0
+        i = self._cursors[key]
+        # Questions shared between pools may already have been asked under another role.
+        while i < len(order) and order[i] in self.asked:
+            i += 1
+        self._cursors[key] = i + 1
+        return self.bank.questions[order[i]] if i < len(order) else None
+
+    def _draw_generated(self, key: Tuple[str, str, str], generate: Optional[Generator]) -> Optional[Question]:
+        if generate is None:
+            return None
+        try:
+            generated = generate(*key)
+        except Exception as e:
+            print(f"Question generation failed: {e}")
+            return None
+        fresh = [q for q in generated if q.id not in self.asked]
+        return self._rng.choice(fresh) if fresh else None
+
+    def next(self, question_type: str, level: str, role: str,
+             generate: Optional[Generator] = None, prefer_generated: bool = False) -> Optional[Question]:
+        key = self.bank.pool_key(question_type, level, role)
+        if prefer_generated:
+            question = self._draw_generated(key, generate) or self._draw(key)
+        else:
+            question = self._draw(key) or self._draw_generated(key, generate)
+        if question is not None:
+            self.asked.add(question.id)
+            self.history.append(question)
+        return question
+
+    def remaining(self, question_type: str, level: str, role: str) -> int:
+        """Bank questions not yet asked for this selection."""
+        return sum(1 for i in self.bank.pool(question_type, level, role) if i not in self.asked)
+
+
+PROMPTS.register(
+    "interview_questions",
+    prefix=(
+        "You are an experienced interviewer. Write new, specific interview questions for the role, "
+        "interview type and seniority below. Each question must stand on its own and be answerable "
+        "in a few minutes. Return one question per line, with no numbering or commentary.\n\n"
+    ),
+    body="ROLE: {role}\nINTERVIEW TYPE: {question_type}\nSENIORITY: {level}\nNUMBER OF QUESTIONS: {count}\n",
+)
+
+_LIST_PREFIX_RE = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+
+
+def parse_questions(text: str, limit: int) -> List[str]:
+    """Question lines from an LLM reply, list markers removed, duplicates dropped."""
+    lines = (_LIST_PREFIX_RE.sub("", line).strip() for line in text.splitlines())
+    return list(dict.fromkeys(line for line in lines if len(line) > 10 and line.endswith("?")))[:limit]
+
+
+class GeneratedQuestions:
+    """LLM-generated questions per (type, level, role, model), cached in memory and on disk."""
+
+    def __init__(self, cache: Optional[ScoreCache] = None, count: int = 8):
+        self.cache = cache or ScoreCache(path=storage_path("interview_cache.db"), max_entries=256,
+                                         table="generated_questions",
+                                         key_columns=("question_type", "level", "role", "model"))
+        self.count = count
+
+    def get(self, chain, question_type: str, level: str, role: str) -> List[Question]:
+        """`chain` is the SimpleQAChain used to call the model."""
+        key = (question_type, level, role, model_name(chain.llm))
+        cached = self.cache.get(key)
+        if cached is None:
+            result = chain.complete("interview_questions", role=role if role != ANY_ROLE else "any role",
+                                    question_type=question_type.replace("_", " "), level=level,
+                                    count=self.count)
+            texts = parse_questions(result.get("result", ""), self.count)
+            cached = {"questions": texts}
+            if texts:
+                self.cache.put(key, cached)
+        return [
+            Question(f"gen-{text_hash(t)[:12]}", t, question_type, level, (role,), (), "generated")
+            for t in cached["questions"]
+        ]
+
+
+_bank: Optional[QuestionBank] = None
+_generated: Optional[GeneratedQuestions] = None
+
+
+def get_question_bank() -> QuestionBank:
+    global _bank
+    if _bank is None:
+        _bank = QuestionBank()
+    return _bank
+
+
+def get_generated_questions() -> GeneratedQuestions:
+    global _generated
+    if _generated is None:
+        _generated = GeneratedQuestions()
+    return _generated
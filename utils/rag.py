@@ -1,20 +1,351 @@
-from typing import List, Optional
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import contextvars
+import hashlib
 import os
+import threading
+import time
+from contextlib import contextmanager
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
 from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
+from utils.metrics import METRICS, estimate_tokens
+from utils.conversation import QueryCondenser, format_history, trim_history
+from utils.scheduler import LLMScheduler, ScheduledLLM
+from utils.prompts import PROMPTS, RenderedPrompt
+from utils import telemetry
+
+
+PROMPTS.register(
+    "rag_answer",
+    prefix=(
+        "You are an AI assistant that answers questions using ONLY the context provided.\n"
+        "If the answer is not in the context, say you don't know.\n\n"
+    ),
+    shared="{instructions}",
+    body="Context:\n{context}\n\n{conversation}Question: {question}\n\nAnswer clearly and concisely:",
+)
+
+
+# Explicit context caching. Gemini rejects cached contents below a
+# model-specific minimum size, checked against the whole cacheable part
+# (static prefix plus shared content); shorter ones are sent inline
+# (where the provider's implicit prefix caching may still apply).
+CONTEXT_CACHE_ENABLED = os.getenv("HR_CONTEXT_CACHE", "1") != "0"
+CONTEXT_CACHE_TTL = float(os.getenv("HR_CONTEXT_CACHE_TTL", "900"))
+# Seconds to send prompts in full after a failed creation before trying again.
+CONTEXT_CACHE_RETRY_AFTER = float(os.getenv("HR_CONTEXT_CACHE_RETRY_AFTER", "300"))
+# Overrides the per-model minimum when set.
+CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("HR_CONTEXT_CACHE_MIN_TOKENS", "0")) or None
+# Model name prefix -> minimum cached-content size in tokens, most specific first.
+MODEL_CACHE_MIN_TOKENS = (
+    ("gemini-2.5-flash", 1024),
+    ("gemini-2.5-pro", 4096),
+    ("gemini-2.0-flash", 4096),
+)
+DEFAULT_CACHE_MIN_TOKENS = 4096
+
+
+def cache_min_tokens(model: str) -> int:
+    """Smallest cached content `model` accepts, in tokens."""
+    name = model.rsplit("/", 1)[-1]
+    for prefix, tokens in MODEL_CACHE_MIN_TOKENS:
+        if name.startswith(prefix):
+            return tokens
+    return DEFAULT_CACHE_MIN_TOKENS
+
+_cache_run: contextvars.ContextVar = contextvars.ContextVar("context_cache_run", default=None)
+
+
+class CachedContext(NamedTuple):
+    name: str           # provider handle, passed to the model as `cached_content`
+    model: str
+    tokens: int         # estimated tokens the handle stands for
+    expires_at: float
+
+
+class GeminiContextCache:
+    """Creates and deletes cached contents through a google-genai client."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def create(self, model: str, content: str, ttl: float) -> str:
+        from google.genai import types
+
+        cache = self.client.caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                contents=[types.Content(role="user", parts=[types.Part(text=content)])],
+                ttl=f"{int(ttl)}s",
+            ),
+        )
+        return cache.name
+
+    def delete(self, name: str) -> None:
+        self.client.caches.delete(name=name)
+
+
+class ContextCache:
+    """
+    Reuses a provider-side cache handle for the shared part of rendered
+    prompts (RenderedPrompt.cacheable: static prefix plus job
+    requirements, rubric, ...), so a batch of calls sends that text once.
+
+    `backend` creates and deletes handles (GeminiContextCache, or
+    utils.fakes.FakeContextCache offline); with no backend every prompt
+    is sent in full. `min_tokens` defaults to the model's own minimum.
+
+    Handles are recreated shortly before their TTL runs out. Those first
+    used inside `run()` are deleted when the run ends unless another run
+    still uses them; the rest are swept once their TTL is (nearly) up.
+    After a failed creation that content is sent in full for
+    `retry_after` seconds.
+    "hits" counts requests that reused an existing handle, "cached_calls"
+    every request sent with one.
+    """
+
+    def __init__(self, backend=None, ttl: float = CONTEXT_CACHE_TTL,
+                 min_tokens: Optional[int] = CONTEXT_CACHE_MIN_TOKENS, metrics=METRICS,
+                 retry_after: float = CONTEXT_CACHE_RETRY_AFTER):
+        self.backend = backend
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self.metrics = metrics
+        self.retry_after = retry_after
+        self._entries: Dict[Tuple[str, str], CachedContext] = {}
+        self._users: Dict[Tuple[str, str], int] = {}
+        # key -> Event set once the creating thread is done; other callers wait on it.
+        self._creating: Dict[Tuple[str, str], threading.Event] = {}
+        # key -> time before which creation is not retried.
+        self._failed: Dict[Tuple[str, str], float] = {}
+        self._stats = {"created": 0, "hits": 0, "cached_calls": 0, "tokens_cached": 0, "expired": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._next_sweep = 0.0
+
+    def _margin(self) -> float:
+        # Leave a margin so a handle never expires mid-request.
+        return min(60.0, self.ttl / 10)
+
+    def _sweep(self, now: float) -> List[str]:
+        """
+        Drop handles outside any run whose TTL is (nearly) up and return
+        the names to delete. Caller holds the lock.
+        """
+        if now < self._next_sweep:
+            return []
+        self._next_sweep = now + self._margin()
+        for key in [k for k, until in self._failed.items() if until <= now]:
+            del self._failed[key]
+        names = []
+        for key in [k for k, e in self._entries.items() if k not in self._users and e.expires_at - now < self._margin()]:
+            entry = self._entries.pop(key)
+            if entry.expires_at > now:   # already-expired handles are gone provider-side
+                names.append(entry.name)
+            self._stats["expired"] += 1
+        return names
+
+    def _use(self, key: Tuple[str, str], entry: CachedContext) -> None:
+        """Count a request sent with `entry` and tie it to the current run. Caller holds the lock."""
+        self._stats["cached_calls"] += 1
+        self._stats["tokens_cached"] += entry.tokens
+        run = _cache_run.get()
+        if run is not None and key not in run:
+            run.add(key)
+            self._users[key] = self._users.get(key, 0) + 1
+
+    def _handle(self, content: str, model: str) -> Optional[CachedContext]:
+        """
+        The handle for `content`, created if needed. Backend calls run
+        outside the lock: one thread creates a missing handle while
+        others asking for the same content wait for it. A failed creation
+        is not retried for `retry_after` seconds.
+        """
+        key = (model, hashlib.sha256(content.encode("utf-8")).hexdigest())
+        while True:
+            with self._lock:
+                now = time.time()
+                stale = self._sweep(now)
+                entry = self._entries.get(key)
+                if entry is not None and entry.expires_at - now < self._margin():
+                    del self._entries[key]
+                    stale.append(entry.name)
+                    entry = None
+                elif entry is not None:
+                    self._stats["hits"] += 1
+                    self._use(key, entry)
+                pending = creating = None
+                if entry is None and self._failed.get(key, 0.0) <= now:
+                    pending = self._creating.get(key)
+                    if pending is None:
+                        creating = self._creating[key] = threading.Event()
+            for name in stale:
+                self._delete(name)
+            if entry is not None:
+                break
+            if pending is not None:
+                pending.wait()
+                continue
+            if creating is None:   # creation failed recently
+                return None
+            try:
+                with self.metrics.time("context_cache_create"):
+                    name = self.backend.create(model, content, self.ttl)
+            except Exception as e:
+                name, error = None, e
+            with self._lock:
+                del self._creating[key]
+                if name is None:
+                    self._stats["errors"] += 1
+                    self._failed[key] = time.time() + self.retry_after
+                else:
+                    entry = CachedContext(name, model, estimate_tokens(content), time.time() + self.ttl)
+                    self._entries[key] = entry
+                    self._stats["created"] += 1
+                    self._use(key, entry)
+            creating.set()
+            if entry is None:
+                print(f"Context cache creation failed, sending prompt in full: {error}")
+                return None
+            break
+        telemetry.inc("hr_context_cache_tokens_total", entry.tokens)
+        return entry
+
+    def request(self, prompt: RenderedPrompt, model: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        Text to send for `prompt` and extra model kwargs: the body plus a
+        `cached_content` handle when the shared part is cacheable,
+        otherwise the full prompt.
+        """
+        if self.backend is None or not model or not prompt.body:
+            return prompt.text, {}
+        cacheable = prompt.cacheable
+        if estimate_tokens(cacheable) < (self.min_tokens or cache_min_tokens(model)):
+            return prompt.text, {}
+        entry = self._handle(cacheable, model)
+        if entry is None:
+            return prompt.text, {}
+        return prompt.body, {"cached_content": entry.name}
+
+    @contextmanager
+    def run(self):
+        """Scope a batch (e.g. one screening run); its handles are released on exit."""
+        keys: set = set()
+        token = _cache_run.set(keys)
+        try:
+            yield self
+        finally:
+            _cache_run.reset(token)
+            names = []
+            with self._lock:
+                for key in keys:
+                    self._users[key] -= 1
+                    if self._users[key] <= 0:
+                        del self._users[key]
+                        entry = self._entries.pop(key, None)
+                        if entry is not None:
+                            names.append(entry.name)
+            for name in names:
+                self._delete(name)
+
+    def expire(self) -> None:
+        """Delete every handle not held by an active run, whatever its TTL."""
+        with self._lock:
+            names = [self._entries.pop(k).name for k in [k for k in self._entries if k not in self._users]]
+        for name in names:
+            self._delete(name)
+
+    def _delete(self, name: str) -> None:
+        try:
+            self.backend.delete(name)
+        except Exception as e:
+            print(f"Context cache deletion failed: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "active": len(self._entries)}
+
+
+def default_context_cache(llm) -> ContextCache:
+    """A Gemini-backed cache for Google chat models; a pass-through otherwise."""
+    if CONTEXT_CACHE_ENABLED and isinstance(llm, ChatGoogleGenerativeAI) and llm.client is not None:
+        return ContextCache(GeminiContextCache(llm.client))
+    return ContextCache()
+
+
+def model_id(llm) -> str:
+    return str(getattr(llm, "model", None) or getattr(llm, "model_name", None) or "")
 
 
 class SimpleQAChain:
     """
     Minimal QA chain that mimics LangChain's RetrievalQA .invoke() API
     so the rest of the app code works without langchain.chains.
+
+    When a `condenser` is set and the inputs carry "chat_history", the
+    question is condensed into a standalone retrieval query and the
+    (budget-trimmed) conversation is included in the prompt. Agent
+    "instructions" go right after the chain's static prefix, ahead of
+    the retrieved context, so the leading part of the prompt is stable.
     """
 
-    def __init__(self, retriever, llm):
+    def __init__(self, retriever, llm, metrics=METRICS, condenser=None, history_tokens=600, context_cache=None):
         self.retriever = retriever
         self.llm = llm
+        self.metrics = metrics
+        self.condenser = condenser
+        self.history_tokens = history_tokens
+        self.context_cache = context_cache or ContextCache()
+
+    def retrieve(self, question, timings=None):
+        """
+        Retrieve documents for `question`, timing query embedding and
+        vector search separately when the retriever exposes its vector
+        store. Stage durations are written into `timings` if given.
+        """
+        if timings is None:
+            timings = {}
+        with telemetry.span("retrieval") as span:
+            docs = self._search(question, timings)
+            span.set_attribute("retrieval.documents", len(docs))
+        return docs
+
+    def _search(self, question, timings):
+        vectorstore = getattr(self.retriever, "vectorstore", None)
+        search_type = getattr(self.retriever, "search_type", "similarity")
+        if vectorstore is None or search_type != "similarity" or not hasattr(vectorstore, "_embed_query"):
+            with self.metrics.time("vector_search", timings):
+                return self.retriever.invoke(question)
+
+        search_kwargs = dict(getattr(self.retriever, "search_kwargs", {}) or {})
+        with self.metrics.time("embed_query", timings):
+            embedding = vectorstore._embed_query(question)
+        with self.metrics.time("vector_search", timings):
+            return vectorstore.similarity_search_by_vector(embedding, **search_kwargs)
+
+    def _generate(self, prompt, timings, **kwargs):
+        """
+        Call the LLM, streaming when possible so time-to-first-token
+        can be measured. Returns (answer, usage_metadata).
+        """
+        start = time.perf_counter()
+        if not hasattr(self.llm, "stream"):
+            resp = self.llm.invoke(prompt, **kwargs)
+            timings["llm_first_token"] = timings["llm_total"] = time.perf_counter() - start
+            return getattr(resp, "content", str(resp)), getattr(resp, "usage_metadata", None)
+
+        full = None
+        for chunk in self.llm.stream(prompt, **kwargs):
+            if full is None:
+                timings["llm_first_token"] = time.perf_counter() - start
+                full = chunk
+            else:
+                full = full + chunk
+        timings["llm_total"] = time.perf_counter() - start
+        timings.setdefault("llm_first_token", timings["llm_total"])
+        if full is None:
+            return "", None
+        return getattr(full, "content", str(full)), getattr(full, "usage_metadata", None)
 
     def invoke(self, inputs):
         # Support both {"query": "..."} and plain string
@@ -25,59 +356,156 @@ class SimpleQAChain:
 
         question = question.strip()
         if not question:
-            return {"result": "", "source_documents": []}
+            return {"result": "", "source_documents": [], "timings": {}}
+
+        timings = {}
+        start = time.perf_counter()
+
+        # Callers may pass a bare retrieval query separate from an
+        # instruction-heavy prompt, plus the conversation so far.
+        retrieval_query = question
+        history = None
+        if isinstance(inputs, dict):
+            retrieval_query = (inputs.get("retrieval_query") or question).strip()
+            history = inputs.get("chat_history")
+        if history and self.condenser is not None:
+            with self.metrics.time("condense_query", timings):
+                retrieval_query = self.condenser.condense(retrieval_query, history)
 
         # 1. Retrieve relevant documents
-        docs = self.retriever.get_relevant_documents(question)
-
-        # 2. Build a simple prompt using the retrieved context
-        context = "\n\n".join(d.page_content for d in docs)
-        prompt = (
-            "You are an AI assistant that answers questions using ONLY the context provided.\n"
-            "If the answer is not in the context, say you don't know.\n\n"
-            f"Context:\n{context}\n\n"
-            f"Question: {question}\n\n"
-            "Answer clearly and concisely:"
-        )
+        docs = self.retrieve(retrieval_query, timings)
 
-        # 3. Call the LLM
-        resp = self.llm.invoke(prompt)
-        answer = getattr(resp, "content", str(resp))
+        # 2. Build the prompt using the retrieved context
+        with self.metrics.time("prompt_build", timings):
+            conversation = ""
+            if history:
+                pairs = trim_history(history, self.history_tokens)
+                if pairs:
+                    conversation = f"Conversation so far:\n{format_history(pairs)}\n\n"
+            instructions = inputs.get("instructions", "") if isinstance(inputs, dict) else ""
+            prompt = PROMPTS.render(
+                "rag_answer",
+                instructions=f"{instructions}\n\n" if instructions else "",
+                context="\n\n".join(d.page_content for d in docs),
+                conversation=conversation,
+                question=question,
+            )
 
+        # 3. Call the LLM
+        answer = self._call_llm(prompt, timings, start)
         return {
             "result": answer,
             "source_documents": docs,
+            "retrieval_query": retrieval_query,
+            "timings": timings,
         }
 
+    def complete(self, template, **values):
+        """
+        Render a registered prompt template and send it straight to the
+        LLM, without retrieval, for agent tasks that don't need the HR
+        documents (evaluations, summaries). Returns the same shape as
+        invoke() minus the sources.
+        """
+        timings = {}
+        start = time.perf_counter()
+        with self.metrics.time("prompt_build", timings):
+            prompt = PROMPTS.render(template, **values)
+        answer = self._call_llm(prompt, timings, start)
+        return {"result": answer, "timings": timings}
 
+    def _call_llm(self, prompt, timings, start):
+        text, kwargs = self.context_cache.request(prompt, model_id(self.llm))
+        with telemetry.span("llm.generate") as span:
+            answer, usage = self._generate(text, timings, **kwargs)
+            usage = usage or {}
+            timings["tokens_in"] = usage.get("input_tokens") or estimate_tokens(prompt.text)
+            timings["tokens_out"] = usage.get("output_tokens") or estimate_tokens(answer)
+            if kwargs.get("cached_content"):
+                details = usage.get("input_token_details") or {}
+                timings["tokens_cached"] = details.get("cache_read") or estimate_tokens(prompt.cacheable)
+            span.set_attribute("llm.tokens_in", timings["tokens_in"])
+            span.set_attribute("llm.tokens_out", timings["tokens_out"])
+        timings["total"] = time.perf_counter() - start
+
+        telemetry.observe("hr_llm_duration_seconds", timings["llm_total"])
+        telemetry.observe("hr_llm_first_token_seconds", timings["llm_first_token"])
+        telemetry.inc("hr_llm_tokens_total", timings["tokens_in"], direction="in")
+        telemetry.inc("hr_llm_tokens_total", timings["tokens_out"], direction="out")
+        self.metrics.record_many(
+            {k: v for k, v in timings.items()
+             if k not in ("condense_query", "embed_query", "vector_search", "prompt_build")}
+        )
+        return answer
+
+
+EMBEDDING_MODEL = "models/text-embedding-004"
+LLM_MODEL = "gemini-2.5-pro"
+
+
+def default_embeddings():
+    return GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL)
+
+
+def default_llm():
+    return ChatGoogleGenerativeAI(
+        model=LLM_MODEL,
+        temperature=0.2,
+    )
+
+
+def split_documents(
+    docs: List[Document],
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+) -> List[Document]:
+    """
+    Split documents into overlapping chunks for indexing.
+    """
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=["\n\n", "\n", ".", "!", "?"],
+    )
+    with METRICS.time("split_documents"):
+        return splitter.split_documents(docs)
+
+
+@telemetry.traced("build_vectorstore")
 def build_vectorstore(
     docs: List[Document],
-    persist_dir: str = "vectorstore",
+    persist_dir: Optional[str] = "vectorstore",
+    embeddings=None,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
 ) -> Optional[FAISS]:
     """
     Build a FAISS vector store from documents.
+
+    `embeddings` defaults to Google Generative AI embeddings; pass a
+    local stand-in (see utils.fakes) to build offline. A `persist_dir`
+    of None skips saving to disk.
     """
     if not docs:
         return None
 
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
-        separators=["\n\n", "\n", ".", "!", "?"],
-    )
-    chunks = splitter.split_documents(docs)
+    chunks = split_documents(docs, chunk_size, chunk_overlap)
 
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/text-embedding-004")
+    if embeddings is None:
+        embeddings = default_embeddings()
 
-    vectorstore = FAISS.from_documents(chunks, embeddings)
+    with METRICS.time("embed_and_index"):
+        vectorstore = FAISS.from_documents(chunks, embeddings)
 
-    os.makedirs(persist_dir, exist_ok=True)
-    vectorstore.save_local(persist_dir)
+    if persist_dir:
+        with METRICS.time("save_index"):
+            os.makedirs(persist_dir, exist_ok=True)
+            vectorstore.save_local(persist_dir)
 
     return vectorstore
 
 
-def load_vectorstore(persist_dir: str = "vectorstore") -> Optional[FAISS]:
+def load_vectorstore(persist_dir: str = "vectorstore", embeddings=None) -> Optional[FAISS]:
     """
     Load an existing FAISS vectorstore from disk, if it exists.
     """
@@ -85,7 +513,8 @@ def load_vectorstore(persist_dir: str = "vectorstore") -> Optional[FAISS]:
         return None
 
     try:
-        embeddings = GoogleGenerativeAIEmbeddings(model="models/text-embedding-004")
+        if embeddings is None:
+            embeddings = default_embeddings()
         vs = FAISS.load_local(
             persist_dir,
             embeddings,
@@ -97,15 +526,32 @@ def load_vectorstore(persist_dir: str = "vectorstore") -> Optional[FAISS]:
         return None
 
 
-def build_qa_chain(vectorstore: FAISS) -> SimpleQAChain:
+def build_qa_chain(
+    vectorstore: FAISS,
+    llm=None,
+    k: int = 4,
+    metrics=METRICS,
+    condense_mode: Optional[str] = "heuristic",
+    scheduler: Optional[LLMScheduler] = None,
+    context_cache: Optional[ContextCache] = None,
+) -> SimpleQAChain:
     """
     Build our custom QA chain that exposes .invoke()
     just like LangChain's RetrievalQA.
+
+    `condense_mode` ("heuristic", "llm" or None) controls how follow-up
+    questions are rewritten for retrieval when chat history is passed.
+    With a `scheduler`, every model call (answers, condensation, and
+    anything else using chain.llm) is admitted by priority class.
+    `context_cache` defaults to explicit Gemini caching for Google models.
     """
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.5-pro",
-        temperature=0.2,
-    )
+    if llm is None:
+        llm = default_llm()
+    if context_cache is None:
+        context_cache = default_context_cache(llm)
+    if scheduler is not None:
+        llm = ScheduledLLM(llm, scheduler)
 
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 4})
-    return SimpleQAChain(retriever, llm)
+    condenser = QueryCondenser(llm=llm, mode=condense_mode) if condense_mode else None
+    retriever = vectorstore.as_retriever(search_kwargs={"k": k})
+    return SimpleQAChain(retriever, llm, metrics=metrics, condenser=condenser, context_cache=context_cache)
@@ -0,0 +1,158 @@
+"""
+Priority-aware admission control for LLM calls.
+
+Every agent shares one model quota. Calls are admitted through a
+process-wide LLMScheduler with three priority classes:
+
+* "urgent"       interactive questions flagged urgent by the categorizer
+* "interactive"  everything a user is waiting on (the default)
+* "batch"        bulk work: resume screening, report generation
+
+At most `max_concurrency` calls run at once, and each class has its own
+limit; batch is always capped at least one slot below the total (so the
+total is never less than two), so a recruiter screening 200 resumes
+always leaves headroom for employees' questions. When a slot
+frees up, the highest priority class with waiters (and room under its
+limit) goes next. Within a class, sessions are served round-robin so one
+session's bulk job cannot starve another's.
+
+Callers don't pass priorities down the stack: they wrap a block in
+`llm_priority("batch", session_id)`, and ScheduledLLM (the wrapper
+build_qa_chain puts around the model) reads it from a context variable.
+"""
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from utils.metrics import METRICS
+from utils import telemetry
+
+PRIORITIES = ("urgent", "interactive", "batch")
+QUEUE_STAGES = [f"queue_{p}" for p in PRIORITIES]
+
+DEFAULT_CONCURRENCY = int(os.getenv("HR_LLM_CONCURRENCY", "8"))
+DEFAULT_BATCH_CONCURRENCY = int(os.getenv("HR_LLM_BATCH_CONCURRENCY", "3"))
+
+_priority: contextvars.ContextVar = contextvars.ContextVar("llm_priority", default=("interactive", None))
+
+
+@contextmanager
+def llm_priority(priority: str, session_id: Optional[str] = None):
+    """Run LLM calls made inside the block under `priority`."""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown LLM priority: {priority}")
+    token = _priority.set((priority, session_id))
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> Tuple[str, Optional[str]]:
+    return _priority.get()
+
+
+class LLMScheduler:
+    def __init__(self, max_concurrency: int = DEFAULT_CONCURRENCY,
+                 limits: Optional[Dict[str, int]] = None, metrics=METRICS):
+        # One slot is always reserved for urgent/interactive calls, so batch needs a second.
+        self.max_concurrency = max(2, max_concurrency)
+        self.limits = {
+            "urgent": self.max_concurrency,
+            "interactive": self.max_concurrency,
+            "batch": DEFAULT_BATCH_CONCURRENCY,
+        }
+        self.limits.update(limits or {})
+        self.limits["batch"] = max(1, min(self.limits["batch"], self.max_concurrency - 1))
+        self.metrics = metrics
+        self._cond = threading.Condition()
+        self._running = {p: 0 for p in PRIORITIES}
+        # priority -> session -> FIFO of waiting tickets, sessions in round-robin order
+        self._waiting: Dict[str, "OrderedDict[Any, deque]"] = {p: OrderedDict() for p in PRIORITIES}
+        self._admitted: set = set()
+
+    def _total_running(self) -> int:
+        return sum(self._running.values())
+
+    def _admit_next(self) -> None:
+        """Admit waiters while there is capacity. Caller holds the lock."""
+        admitted = False
+        while self._total_running() < self.max_concurrency:
+            for priority in PRIORITIES:
+                queues = self._waiting[priority]
+                if queues and self._running[priority] < self.limits[priority]:
+                    session, tickets = next(iter(queues.items()))
+                    ticket = tickets.popleft()
+                    # Rotate: this session goes to the back of its class.
+                    del queues[session]
+                    if tickets:
+                        queues[session] = tickets
+                    self._running[priority] += 1
+                    self._admitted.add(ticket)
+                    admitted = True
+                    break
+            else:
+                break
+        if admitted:
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority: Optional[str] = None, session_id: Optional[str] = None):
+        """Block until a call of `priority` may run, and hold the slot for the block."""
+        if priority is None:
+            priority, session_id = current_priority()
+        ticket = object()
+        start = time.perf_counter()
+        with self._cond:
+            self._waiting[priority].setdefault(session_id, deque()).append(ticket)
+            self._admit_next()
+            while ticket not in self._admitted:
+                self._cond.wait()
+            self._admitted.discard(ticket)
+        waited = time.perf_counter() - start
+        self.metrics.record(f"queue_{priority}", waited)
+        telemetry.observe("hr_llm_queue_seconds", waited, priority=priority)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._running[priority] -= 1
+                self._admit_next()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._cond:
+            return {
+                p: {"running": self._running[p], "waiting": sum(len(q) for q in self._waiting[p].values()),
+                    "limit": self.limits[p]}
+                for p in PRIORITIES
+            }
+
+
+class ScheduledLLM:
+    """
+    Wraps a chat model so invoke()/stream() go through the scheduler at
+    the caller's current priority. Other attributes (model name, ...)
+    are forwarded to the wrapped model.
+    """
+
+    def __init__(self, llm, scheduler: LLMScheduler):
+        self.llm = llm
+        self.scheduler = scheduler
+
+    def invoke(self, *args, **kwargs):
+        with self.scheduler.slot():
+            return self.llm.invoke(*args, **kwargs)
+
+    def stream(self, *args, **kwargs) -> Iterator[Any]:
+        with self.scheduler.slot():
+            yield from self.llm.stream(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.llm, name)
+
+
+SCHEDULER = LLMScheduler()
@@ -0,0 +1,444 @@
+"""
+Deterministic, cached resume scoring.
+
+A resume is scored in two parts:
+
+* a local feature score (skill overlap with the job description, years
+  of experience, education level, seniority) that is instant and always
+  available as a pre-score;
+* an LLM assessment returned as JSON, validated against SCORE_SCHEMA,
+  and cached by (job description hash, resume hash, model). Re-ranking a
+  pool, or screening it again with different weights, makes no LLM calls.
+
+The final score blends the two. If the LLM output cannot be parsed, the
+feature score is used on its own.
+
+The job description is parsed once per requisition into a JobProfile
+(skills from its requirement sections, all of its terms, years,
+seniority, education, optional embedding and condensed requirements
+text), cached by content hash, and shared by every candidate evaluation.
+"""
+import json
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from utils.prompts import PROMPTS
+from utils.storage import ScoreCache, model_name, storage_path, text_hash
+
+CATEGORIES = ("technical", "experience", "education", "soft_skills")
+RECOMMENDATIONS = ("STRONG HIRE", "INTERVIEW", "CONSIDER", "REJECT")
+
+# Share of the final score taken from the LLM match score.
+LLM_WEIGHT = 0.7
+
+# Job descriptions longer than this are condensed once by the LLM before
+# being sent with every candidate; shorter ones are sent verbatim.
+CONDENSE_OVER_CHARS = 1500
+
+DEFAULT_WEIGHTS = {"skills": 0.4, "experience": 0.3, "education": 0.3}
+
+EDUCATION_LEVELS = [
+    (4, ("phd", "ph.d", "doctorate", "doctoral")),
+    (3, ("master", "msc", "m.sc", "mba", "m.s.")),
+    (2, ("bachelor", "bsc", "b.sc", "b.s.", "undergraduate", "degree")),
+    (1, ("associate", "diploma", "certificate", "certification")),
+]
+SENIORITY_LEVELS = [
+    (3, ("principal", "staff", "lead", "head of", "director", "architect")),
+    (2, ("senior", "sr.", "sr ")),
+    (1, ("mid-level", "mid level", "intermediate")),
+    (0, ("junior", "jr.", "graduate", "entry level", "entry-level", "intern")),
+]
+SOFT_SKILLS = (
+    "leadership", "communication", "teamwork", "collaboration", "mentoring", "mentored",
+    "stakeholder", "presentation", "negotiation", "led ", "managed", "coached",
+)
+STOPWORDS = {
+    "and", "the", "for", "with", "you", "our", "are", "will", "have", "has", "from", "that", "this",
+    "your", "who", "can", "able", "must", "should", "into", "within", "across", "about", "their",
+    "they", "all", "any", "job", "role", "team", "work", "working", "experience", "years", "year",
+    "required", "requirements", "preferred", "plus", "strong", "skills", "knowledge", "ability",
+    "including", "such", "other", "well", "using", "use", "new", "etc", "per", "we", "looking",
+    "candidate", "candidates", "responsibilities", "qualifications", "senior", "junior", "degree",
+    "bachelor", "master", "equivalent", "related", "field", "excellent", "good", "great", "minimum",
+    "of", "an", "in", "on", "to", "as", "at", "by", "or", "be", "is", "if", "so", "do", "up", "us", "via",
+}
+
+# Headings whose section lists what the job requires; skills are read from these sections.
+REQUIREMENT_HEADINGS = (
+    "requirement", "qualification", "skill", "must have", "must-have", "nice to have", "what you bring",
+    "what you'll need", "what you need", "you have", "tech stack", "technologies", "experience",
+)
+# Terms a job description uses that are never skills (kept out of JobProfile.skills only).
+NON_SKILL_TERMS = {
+    "company", "office", "offices", "benefits", "salary", "compensation", "opportunity", "opportunities",
+    "culture", "join", "offer", "environment", "apply", "location", "remote", "hybrid", "onsite", "competitive",
+    "position", "ideal", "passionate", "mission", "growth", "employees", "employee", "customers", "world",
+    "help", "people", "day", "days", "time", "full-time", "part-time", "based", "paid", "health", "insurance",
+    "vacation", "leave", "equal", "employer", "diverse", "diversity", "inclusive", "perks", "bonus", "hiring",
+    "we're", "you'll", "what", "how", "why", "fast-paced", "dynamic", "exciting",
+}
+
+_HEADING_RE = re.compile(r"^#*\s*([a-z][a-z' /&-]{1,40}?)\s*:\s*(.*)$")
+_TERM_RE = re.compile(r"[a-z][a-z0-9+#.\-]*[a-z0-9+#]|[a-z]")
+_YEARS_RE = re.compile(r"(\d{1,2})\s*\+?\s*(?:-\s*\d{1,2}\s*)?(?:years?|yrs?)\b")
+
+SCORE_SCHEMA = {
+    "match_score": "integer 0-100",
+    "categories": {c: "integer 0-10" for c in CATEGORIES},
+    "recommendation": " | ".join(RECOMMENDATIONS),
+    "summary": "string, 2-3 sentences",
+    "strengths": ["string"],
+    "concerns": ["string"],
+    "interview_focus": ["string"],
+}
+
+# Instructions and schema first, then the job (shared by every candidate
+# in a run), then the resume.
+PROMPTS.register(
+    "resume_scoring",
+    prefix=(
+        "You are an expert talent acquisition specialist. Evaluate the candidate's resume "
+        "against the job requirements. Be consistent: the same resume and job must always "
+        "receive the same scores.\n\n"
+        "Respond with a single JSON object and nothing else, matching this schema:\n"
+        f"{json.dumps(SCORE_SCHEMA, indent=2)}\n\n"
+    ),
+    shared="JOB REQUIREMENTS:\n{requirements}\n\n",
+    body="CANDIDATE: {candidate_name}\n\nRESUME CONTENT:\n{resume_text}\n\nJSON:",
+)
+
+PROMPTS.register(
+    "job_requirements",
+    prefix=(
+        "Condense this job description into the requirements a recruiter screens for: "
+        "required and preferred skills, years of experience, seniority, education, "
+        "certifications and key responsibilities. Use short bullet points, no preamble.\n\n"
+    ),
+    body="JOB DESCRIPTION:\n{job_description}\n\nREQUIREMENTS:",
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Skill-like terms in `text` (lowercased, stopwords dropped), with repeats."""
+    out = []
+    for t in _TERM_RE.findall(text.lower()):
+        t = t.strip(".-")
+        if len(t) > 1 and t not in STOPWORDS and not t.isdigit():
+            out.append(t)
+    return out
+
+
+def terms(text: str) -> List[str]:
+    """Distinct candidate skill terms in `text`, in order of appearance."""
+    return list(dict.fromkeys(tokenize(text)))
+
+
+def _heading(line: str) -> Optional[Tuple[str, str]]:
+    """(heading, text after it) for "# Heading", "Heading:" or "Heading: text" lines, else None."""
+    line = line.strip().strip("*_").strip().lower()
+    if line.startswith("#"):
+        return line.lstrip("#").strip().rstrip(":").strip(), ""
+    m = _HEADING_RE.match(line)
+    return (m.group(1), m.group(2)) if m else None
+
+
+def requirement_text(job_description: str) -> str:
+    """
+    The requirement/qualification/skills sections of a job description,
+    or the whole description when it has no such section.
+    """
+    kept, inside, found = [], False, False
+    for line in job_description.splitlines():
+        heading = _heading(line)
+        if heading is None:
+            if inside:
+                kept.append(line)
+            continue
+        inside = any(h in heading[0] for h in REQUIREMENT_HEADINGS)
+        found = found or inside
+        if inside and heading[1]:
+            kept.append(heading[1])
+    return "\n".join(kept) if found else job_description
+
+
+def _level(text: str, levels) -> Optional[int]:
+    for level, words in levels:
+        if any(w in text for w in words):
+            return level
+    return None
+
+
+def years_of_experience(text: str) -> int:
+    """Largest "N years" figure mentioned, capped at 40."""
+    found = [int(m) for m in _YEARS_RE.findall(text.lower())]
+    return min(40, max(found)) if found else 0
+
+
+class JobProfile(NamedTuple):
+    job_hash: str
+    skills: List[str]                         # terms from the requirement sections, generic words dropped
+    terms: List[str]                          # every distinct term in the description (relevance ranking)
+    required_years: int
+    education: Optional[int]
+    seniority: Optional[int]
+    requirements: str                         # text sent with each candidate
+    embedding: Optional[List[float]] = None
+
+
+@lru_cache(maxsize=128)
+def _local_profile(job_description: str) -> JobProfile:
+    jd = job_description.lower()
+    return JobProfile(
+        job_hash=text_hash(job_description),
+        skills=[t for t in terms(requirement_text(jd)) if t not in NON_SKILL_TERMS],
+        terms=terms(jd),
+        required_years=years_of_experience(jd),
+        education=_level(jd, EDUCATION_LEVELS),
+        seniority=_level(jd, SENIORITY_LEVELS),
+        requirements=" ".join(job_description.split()),
+    )
+
+
+def job_profile(job_description: str, llm=None, embeddings=None, cache: Optional[ScoreCache] = None) -> JobProfile:
+    """
+    Parse a job description once. The local fields are always filled;
+    with `llm`, long descriptions are condensed into `requirements`, and
+    with `embeddings` the requirements are embedded. Profiles built with
+    a model are cached on disk by (job hash, llm, embedder).
+    """
+    profile = _local_profile(job_description)
+    if llm is None and embeddings is None:
+        return profile
+
+    cache = cache or get_profile_cache()
+    key = (profile.job_hash, model_name(llm) if llm else "", model_name(embeddings) if embeddings else "")
+    cached = cache.get(key)
+    if cached is not None:
+        # Only the model-derived fields come from the cache; local fields are always re-parsed.
+        return profile._replace(requirements=cached["requirements"], embedding=cached["embedding"])
+
+    requirements = profile.requirements
+    if llm is not None and len(requirements) > CONDENSE_OVER_CHARS:
+        try:
+            resp = llm.invoke(PROMPTS.render("job_requirements", job_description=requirements).text)
+            requirements = getattr(resp, "content", str(resp)).strip() or requirements
+        except Exception as e:
+            print(f"Requirement extraction failed, sending full job description: {e}")
+    embedding = None
+    if embeddings is not None:
+        try:
+            embedding = [float(v) for v in embeddings.embed_query(requirements)]
+        except Exception as e:
+            print(f"Job description embedding failed: {e}")
+
+    cache.put(key, {"requirements": requirements, "embedding": embedding})
+    return profile._replace(requirements=requirements, embedding=embedding)
+
+
+def _as_profile(job: Union[str, JobProfile]) -> JobProfile:
+    return job if isinstance(job, JobProfile) else _local_profile(job)
+
+
+def extract_features(job: Union[str, JobProfile], resume_text: str) -> Dict[str, Any]:
+    profile = _as_profile(job)
+    cv = resume_text.lower()
+    required = profile.skills
+    resume_terms = set(terms(cv))
+    matched = [t for t in required if t in resume_terms]
+    return {
+        "required_skills": required,
+        "matched_skills": matched,
+        "missing_skills": [t for t in required if t not in resume_terms],
+        "skill_overlap": len(matched) / len(required) if required else 0.0,
+        "required_years": profile.required_years,
+        "candidate_years": years_of_experience(cv),
+        "required_education": profile.education,
+        "candidate_education": _level(cv, EDUCATION_LEVELS),
+        "required_seniority": profile.seniority,
+        "candidate_seniority": _level(cv, SENIORITY_LEVELS),
+        "soft_skill_mentions": sum(1 for w in SOFT_SKILLS if w in cv),
+    }
+
+
+def _ratio(have: Optional[int], need: Optional[int], default: float = 0.5) -> float:
+    if not need:
+        return 1.0 if have else default
+    return min(1.0, (have or 0) / need)
+
+
+def feature_scores(features: Dict[str, Any], weights: Optional[Dict[str, float]] = None) -> Tuple[int, Dict[str, int]]:
+    """
+    Deterministic 0-100 pre-score and 0-10 category scores from
+    extract_features() output. `weights` uses the keys of DEFAULT_WEIGHTS.
+    """
+    w = dict(DEFAULT_WEIGHTS, **(weights or {}))
+    skills = features["skill_overlap"]
+    experience = _ratio(features["candidate_years"], features["required_years"])
+    if features["required_seniority"] is not None:
+        experience = 0.5 * experience + 0.5 * _ratio(
+            features["candidate_seniority"], features["required_seniority"] or 1, default=0.0)
+    education = _ratio(features["candidate_education"], features["required_education"])
+    soft = min(1.0, features["soft_skill_mentions"] / 4)
+
+    total = w["skills"] + w["experience"] + w["education"]
+    if total <= 0:
+        score = (skills + experience + education) / 3
+    else:
+        score = (w["skills"] * skills + w["experience"] * experience + w["education"] * education) / total
+    categories = {
+        "technical": round(10 * skills),
+        "experience": round(10 * experience),
+        "education": round(10 * education),
+        "soft_skills": round(10 * soft),
+    }
+    return round(100 * score), categories
+
+
+def _clamp_int(value: Any, lo: int, hi: int) -> int:
+    return max(lo, min(hi, int(round(float(value)))))
+
+
+def parse_assessment(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse and validate the LLM's JSON reply. Tolerates code fences and
+    surrounding prose; returns None when the required fields are missing.
+    """
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end <= start:
+        return None
+    try:
+        data = json.loads(text[start:end + 1])
+        cats = data.get("categories") or {}
+        result = {
+            "match_score": _clamp_int(data["match_score"], 0, 100),
+            "categories": {c: _clamp_int(cats[c], 0, 10) for c in CATEGORIES if c in cats},
+            "summary": str(data.get("summary", "")).strip(),
+        }
+        for key in ("strengths", "concerns", "interview_focus"):
+            items = data.get(key) or []
+            result[key] = [str(i) for i in items] if isinstance(items, list) else [str(items)]
+        rec = str(data.get("recommendation", "")).strip().upper()
+        result["recommendation"] = rec if rec in RECOMMENDATIONS else None
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return None
+    return result
+
+
+def recommend(score: int) -> Tuple[str, str]:
+    """(recommendation, priority) for a final 0-100 score."""
+    if score >= 85:
+        return "STRONG HIRE", "High"
+    if score >= 75:
+        return "INTERVIEW", "Medium"
+    if score >= 65:
+        return "CONSIDER", "Low"
+    return "REJECT", "None"
+
+
+def format_analysis(assessment: Optional[Dict[str, Any]], features: Dict[str, Any]) -> str:
+    lines = []
+    if assessment:
+        if assessment["summary"]:
+            lines.append(assessment["summary"])
+        for key, title in (("strengths", "Strengths"), ("concerns", "Concerns"),
+                           ("interview_focus", "Interview focus")):
+            if assessment[key]:
+                lines.append(f"**{title}:** " + "; ".join(assessment[key]))
+    if features["matched_skills"]:
+        lines.append("**Matched requirements:** " + ", ".join(features["matched_skills"][:15]))
+    if features["missing_skills"]:
+        lines.append("**Not found in resume:** " + ", ".join(features["missing_skills"][:15]))
+    return "\n\n".join(lines)
+
+
+_cache: Optional[ScoreCache] = None
+_profile_cache: Optional[ScoreCache] = None
+
+
+def get_score_cache() -> ScoreCache:
+    global _cache
+    if _cache is None:
+        _cache = ScoreCache(path=storage_path("screening_cache.db"), table="screening_scores",
+                            key_columns=("job_hash", "resume_hash", "model"))
+    return _cache
+
+
+def get_profile_cache() -> ScoreCache:
+    global _profile_cache
+    if _profile_cache is None:
+        _profile_cache = ScoreCache(path=storage_path("screening_cache.db"), table="job_profiles",
+                                    key_columns=("job_hash", "llm", "embedder"), max_entries=128)
+    return _profile_cache
+
+
+def score_resume(
+    job: Union[str, JobProfile],
+    resume_text: str,
+    candidate_name: str,
+    llm=None,
+    weights: Optional[Dict[str, float]] = None,
+    cache: Optional[ScoreCache] = None,
+    features: Optional[Dict[str, Any]] = None,
+    context_cache=None,
+) -> Dict[str, Any]:
+    """
+    Score one resume. With `llm=None` only the local feature score is
+    used (quick scan). The LLM is called at most once per
+    (job description, resume, model), ever. Pass `features` when they
+    were already extracted (e.g. by the pre-filter), and a
+    utils.rag.ContextCache to send the shared instructions and job
+    requirements as a cached context handle.
+    """
+    profile = _as_profile(job)
+    if features is None:
+        features = extract_features(profile, resume_text)
+    pre_score, categories = feature_scores(features, weights)
+
+    assessment = None
+    cached = False
+    if llm is not None:
+        cache = cache or get_score_cache()
+        # The requirements text stands in for the job description: it is
+        # the normalised description itself unless it was condensed.
+        key = (text_hash(profile.requirements), text_hash(resume_text), model_name(llm))
+        assessment = cache.get(key)
+        cached = assessment is not None
+        if assessment is None:
+            prompt = PROMPTS.render("resume_scoring", requirements=profile.requirements,
+                                    candidate_name=candidate_name, resume_text=resume_text)
+            try:
+                if context_cache is not None:
+                    text, kwargs = context_cache.request(prompt, model_name(llm))
+                else:
+                    text, kwargs = prompt.text, {}
+                resp = llm.invoke(text, **kwargs)
+                assessment = parse_assessment(getattr(resp, "content", str(resp)))
+            except Exception as e:
+                print(f"Resume scoring failed for {candidate_name}: {e}")
+            if assessment is not None:
+                cache.put(key, assessment)
+
+    if assessment is not None:
+        score = round(LLM_WEIGHT * assessment["match_score"] + (1 - LLM_WEIGHT) * pre_score)
+        categories = {c: assessment["categories"].get(c, v) for c, v in categories.items()}
+    else:
+        score = pre_score
+
+    recommendation, priority = recommend(score)
+    return {
+        "candidate_name": candidate_name,
+        "resume_hash": text_hash(resume_text),
+        "score": score,
+        "pre_score": pre_score,
+        "llm_score": assessment["match_score"] if assessment else None,
+        "analysis": format_analysis(assessment, features),
+        "recommendation": recommendation,
+        "llm_recommendation": assessment["recommendation"] if assessment else None,
+        "priority": priority,
+        "categories": categories,
+        "matched_skills": features["matched_skills"],
+        "missing_skills": features["missing_skills"],
+        "cached": cached,
+    }
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence
+
+# Local state (chat spill, analytics, pipelines, ...) lives here.
+STORAGE_DIR = os.getenv("HR_STORAGE_DIR", "storage")
+
+
+def storage_path(filename: str) -> str:
+    os.makedirs(STORAGE_DIR, exist_ok=True)
+    return os.path.join(STORAGE_DIR, filename)
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """
+    Open a SQLite database in WAL mode, usable from Streamlit's script
+    threads (callers serialise access with their own lock).
+    """
+    if path != ":memory:":
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def text_hash(text: str) -> str:
+    """Content hash of `text`, insensitive to whitespace differences."""
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+def model_name(llm) -> str:
+    """Model identifier used in cache keys."""
+    return str(getattr(llm, "model", None) or getattr(llm, "model_name", None) or type(llm).__name__)
+
+
+class ScoreCache:
+    """
+    JSON values (LLM assessments, job profiles, generated plans, ...)
+    keyed by a tuple of strings: an in-memory LRU in front of a SQLite
+    table, so results survive restarts.
+    """
+
+    def __init__(self, path: str, table: str, key_columns: Sequence[str], max_entries: int = 2048):
+        self.path = path
+        self.max_entries = max_entries
+        self.table = table
+        self.key_columns = tuple(key_columns)
+        self._mem: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = 0
+        self.misses = 0
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = connect(self.path)
+            cols = "".join(f" {c} TEXT NOT NULL," for c in self.key_columns)
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ({cols}"
+                " value TEXT NOT NULL, created_at REAL NOT NULL,"
+                f" PRIMARY KEY ({', '.join(self.key_columns)}))"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key: tuple) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                self.hits += 1
+                return self._mem[key]
+            where = " AND ".join(f"{c} = ?" for c in self.key_columns)
+            row = self._db().execute(f"SELECT value FROM {self.table} WHERE {where}", key).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            value = json.loads(row[0])
+            self._remember(key, value)
+            return value
+
+    def put(self, key: tuple, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._remember(key, value)
+            marks = ", ".join("?" * (len(self.key_columns) + 2))
+            self._db().execute(
+                f"INSERT OR REPLACE INTO {self.table} VALUES ({marks})",
+                (*key, json.dumps(value), time.time()),
+            )
+            self._db().commit()
+
+    def _remember(self, key: tuple, value: Dict[str, Any]) -> None:
+        self._mem[key] = value
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
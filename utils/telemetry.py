@@ -0,0 +1,368 @@
+"""
+Optional tracing spans and metrics export for the HR suite.
+
+Telemetry is off by default and every entry point short-circuits on a
+single module flag, so instrumented code pays nothing when disabled.
+Enable it with the HR_TELEMETRY environment variable (comma separated):
+
+    memory      keep finished spans in an in-memory exporter (tests)
+    otlp        export spans and metrics via OpenTelemetry OTLP
+    prometheus  serve metrics as Prometheus text on HR_PROMETHEUS_PORT
+"""
+import functools
+import os
+import threading
+import time
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+_ENABLED = False
+_backend = None
+_exporter = None
+_otel_meter = None
+_prometheus_server = None
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+# ---------------------------------------------------------------------------
+# Spans
+# ---------------------------------------------------------------------------
+
+class FinishedSpan:
+    """A completed span as stored by the in-memory exporter."""
+
+    def __init__(self, name, attributes, start, end, parent, error):
+        self.name = name
+        self.attributes = attributes
+        self.start = start
+        self.end = end
+        self.parent = parent
+        self.error = error
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+    def __repr__(self):
+        return f"FinishedSpan({self.name!r}, {self.duration:.4f}s)"
+
+
+class InMemorySpanExporter:
+    """Collects finished spans in a list; mirrors OpenTelemetry's API."""
+
+    def __init__(self):
+        self._spans: List[FinishedSpan] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: FinishedSpan) -> None:
+        with self._lock:
+            self._spans.append(span)
+
+    def get_finished_spans(self) -> List[FinishedSpan]:
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+
+_current_span: ContextVar[Optional[str]] = ContextVar("hr_current_span", default=None)
+
+
+class _LocalSpan:
+    def __init__(self, exporter, name, attributes):
+        self.exporter = exporter
+        self.name = name
+        self.attributes = dict(attributes)
+        self.error = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self.parent = _current_span.get()
+        self._token = _current_span.set(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        _current_span.reset(self._token)
+        if exc is not None:
+            self.error = repr(exc)
+        self.exporter.export(
+            FinishedSpan(self.name, self.attributes, self.start, end, self.parent, self.error)
+        )
+        return False
+
+
+class _LocalBackend:
+    def __init__(self, exporter):
+        self.exporter = exporter
+
+    def start(self, name, attributes):
+        return _LocalSpan(self.exporter, name, attributes)
+
+
+class _OtelBackend:
+    def __init__(self, tracer):
+        self.tracer = tracer
+
+    def start(self, name, attributes):
+        return self.tracer.start_as_current_span(name, attributes=attributes)
+
+
+def span(name: str, **attributes):
+    """
+    Context manager for a tracing span. Returns a shared no-op object
+    when telemetry is disabled.
+    """
+    if not _ENABLED or _backend is None:
+        return _NOOP_SPAN
+    return _backend.start(name, attributes)
+
+
+def traced(name: Optional[str] = None):
+    """
+    Decorator wrapping a function in a span and recording its duration
+    in the `hr_operation_duration_seconds` histogram.
+    """
+
+    def decorator(fn):
+        op_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _ENABLED:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            status = "ok"
+            try:
+                with span(op_name):
+                    return fn(*args, **kwargs)
+            except Exception:
+                status = "error"
+                raise
+            finally:
+                observe("hr_operation_duration_seconds", time.perf_counter() - start, operation=op_name)
+                inc("hr_operations_total", operation=op_name, status=status)
+
+        return wrapper
+
+    return decorator
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class MetricsRegistry:
+    """Minimal counter/histogram store with Prometheus text rendering."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, list]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, amount: float = 1.0, **labels) -> None:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            # [bucket counts..., sum, count]
+            state = series.get(key)
+            if state is None:
+                state = series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def counter_value(self, name: str, **labels) -> float:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            return self._counters.get(name, {}).get(key, 0.0)
+
+    def histogram_count(self, name: str, **labels) -> int:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            state = self._histograms.get(name, {}).get(key)
+            return state[-1] if state else 0
+
+    def render_prometheus(self) -> str:
+        def fmt(key, extra=()):
+            pairs = list(key) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{fmt(key)} {value}")
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, state in series.items():
+                    for i, bound in enumerate(self.buckets):
+                        lines.append(f"{name}_bucket{fmt(key, [('le', str(bound))])} {state[i]}")
+                    lines.append(f"{name}_bucket{fmt(key, [('le', '+Inf')])} {state[-1]}")
+                    lines.append(f"{name}_sum{fmt(key)} {state[-2]}")
+                    lines.append(f"{name}_count{fmt(key)} {state[-1]}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+REGISTRY = MetricsRegistry()
+_otel_instruments: Dict[str, object] = {}
+
+
+def inc(name: str, amount: float = 1.0, **labels) -> None:
+    if not _ENABLED:
+        return
+    REGISTRY.inc(name, amount, **labels)
+    if _otel_meter is not None:
+        counter = _otel_instruments.get(name)
+        if counter is None:
+            counter = _otel_instruments[name] = _otel_meter.create_counter(name)
+        counter.add(amount, attributes=labels)
+
+
+def observe(name: str, value: float, **labels) -> None:
+    if not _ENABLED:
+        return
+    REGISTRY.observe(name, value, **labels)
+    if _otel_meter is not None:
+        histogram = _otel_instruments.get(name)
+        if histogram is None:
+            histogram = _otel_instruments[name] = _otel_meter.create_histogram(name, unit="s")
+        histogram.record(value, attributes=labels)
+
+
+class _PrometheusHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = REGISTRY.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_prometheus_server(port: int = 9464, host: str = "0.0.0.0"):
+    """
+    Serve REGISTRY on /metrics from a daemon thread. Idempotent.
+    """
+    global _prometheus_server
+    if _prometheus_server is None:
+        _prometheus_server = ThreadingHTTPServer((host, port), _PrometheusHandler)
+        threading.Thread(target=_prometheus_server.serve_forever, daemon=True).start()
+    return _prometheus_server
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+def _setup_otlp(service_name: str):
+    from opentelemetry import metrics, trace
+    from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    from opentelemetry.sdk.metrics import MeterProvider
+    from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    resource = Resource.create({"service.name": service_name})
+    provider = TracerProvider(resource=resource)
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+
+    reader = PeriodicExportingMetricReader(OTLPMetricExporter())
+    metrics.set_meter_provider(MeterProvider(resource=resource, metric_readers=[reader]))
+
+    return trace.get_tracer(service_name), metrics.get_meter(service_name)
+
+
+def configure(modes: Optional[str] = None, service_name: str = "enterprise-hr-suite"):
+    """
+    (Re)configure telemetry. `modes` defaults to $HR_TELEMETRY; an empty
+    value disables everything. Returns the in-memory exporter when the
+    "memory" mode is active, else None.
+    """
+    global _ENABLED, _backend, _exporter, _otel_meter
+
+    if modes is None:
+        modes = os.getenv("HR_TELEMETRY", "")
+    selected = {m.strip().lower() for m in modes.split(",") if m.strip()}
+    selected.discard("off")
+
+    _backend = None
+    _exporter = None
+    _otel_meter = None
+    _otel_instruments.clear()
+
+    if "otlp" in selected:
+        try:
+            tracer, _otel_meter = _setup_otlp(service_name)
+            _backend = _OtelBackend(tracer)
+        except ImportError as e:
+            print(f"OTLP telemetry unavailable: {e}")
+            selected.discard("otlp")
+
+    if "memory" in selected:
+        _exporter = InMemorySpanExporter()
+        _backend = _LocalBackend(_exporter)
+
+    if "prometheus" in selected:
+        start_prometheus_server(int(os.getenv("HR_PROMETHEUS_PORT", "9464")))
+
+    _ENABLED = bool(selected)
+    return _exporter
+
+
+def is_enabled() -> bool:
+    return _ENABLED
+
+
+configure()